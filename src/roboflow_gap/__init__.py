@@ -1,4 +1,21 @@
 """Roboflow Gather Analyze Process (GAP) package."""
-from . import analyze, gather, process
+import importlib
+import typing as t
 
-__all__ = ["gather", "analyze", "process"]
+if t.TYPE_CHECKING:
+    from . import analyze, gather, metrics, pipeline, process
+
+__all__ = ["gather", "analyze", "process", "pipeline", "metrics"]
+
+
+def __getattr__(name: str) -> t.Any:
+    # submodules are imported on first access, so importing the package stays cheap
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> t.List[str]:
+    return sorted([*globals(), *__all__])
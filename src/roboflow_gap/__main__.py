@@ -0,0 +1,180 @@
+import argparse
+import sys
+import typing as t
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line parser for python -m roboflow_gap."""
+    parser = argparse.ArgumentParser(prog="roboflow_gap")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("bench", help="Run benchmarks against a stand-in model.")
+    bench.add_argument(
+        "--scenario",
+        action="append",
+        dest="scenarios",
+        help="Scenario to run, may be repeated, defaults to all.",
+    )
+    bench.add_argument("--images", type=int, default=200, help="Number of synthetic images.")
+    bench.add_argument("--width", type=int, default=640, help="Width of synthetic images.")
+    bench.add_argument("--height", type=int, default=480, help="Height of synthetic images.")
+    bench.add_argument(
+        "--latency-ms", type=float, default=5.0, help="Fixed latency per inference call."
+    )
+    bench.add_argument(
+        "--per-image-latency-ms", type=float, default=2.0, help="Extra latency per image."
+    )
+    bench.add_argument("--batch-size", type=int, default=8, help="Batch size of batched runs.")
+    bench.add_argument("--seed", type=int, default=0, help="Seed for synthetic images.")
+    bench.add_argument(
+        "--shard-workers", type=int, default=4, help="Worker processes of sharded runs."
+    )
+    bench.add_argument(
+        "--import-budget-ms",
+        type=float,
+        default=1000.0,
+        help="Fail if importing the package takes longer than this, at p95.",
+    )
+    bench.add_argument("--output", help="Write JSON results to this file.")
+    bench.add_argument("--baseline", help="Compare against JSON results in this file.")
+    bench.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed fraction of slowdown against the baseline before failing.",
+    )
+
+    frame_store = commands.add_parser(
+        "frame-store", help="Decode the images in directories into a memory mapped frame store."
+    )
+    frame_store.add_argument("store", help="Frame store directory, created if missing.")
+    frame_store.add_argument("directories", nargs="+", help="Directories of images to pack.")
+    frame_store.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        help="Glob pattern of files to pack, may be repeated, defaults to common image types.",
+    )
+    frame_store.add_argument(
+        "--no-recursive", action="store_true", help="Do not scan subdirectories."
+    )
+    frame_store.add_argument(
+        "--decode-scale", type=int, default=1, help="Decode at 1/scale of full size, 1, 2, 4 or 8."
+    )
+    frame_store.add_argument(
+        "--workers", type=int, help="Number of decode threads, defaults to the number of CPUs."
+    )
+
+    detections = commands.add_parser("detections", help="Query a detection store.")
+    detections.add_argument("store", help="Detection store database file.")
+    detections.add_argument(
+        "--source", action="append", dest="sources", help="Source to match, may be repeated."
+    )
+    detections.add_argument(
+        "--class-id", action="append", type=int, dest="class_ids", help="Class id to match."
+    )
+    detections.add_argument(
+        "--class-name", action="append", dest="class_names", help="Class name to match."
+    )
+    detections.add_argument("--min-confidence", type=float, help="Minimum confidence.")
+    detections.add_argument(
+        "--since", help="Start time: a timestamp, an ISO datetime, or a duration ago such as 7d."
+    )
+    detections.add_argument("--until", help="End time, in the same forms as --since.")
+    detections.add_argument(
+        "--limit", type=int, default=100, help="Maximum number of detections, 0 for all."
+    )
+    detections.add_argument("--newest-first", action="store_true", help="Newest detections first.")
+    detections.add_argument(
+        "--count", action="store_true", help="Print the number of matching detections only."
+    )
+    detections.add_argument(
+        "--list", choices=["sources", "classes"], help="List stored sources or classes instead."
+    )
+    return parser
+
+
+def main(argv: t.Optional[t.Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    args = build_parser().parse_args(argv)
+
+    if args.command == "bench":
+        from roboflow_gap import bench
+
+        config = bench.BenchConfig(
+            images=args.images,
+            width=args.width,
+            height=args.height,
+            latency_ms=args.latency_ms,
+            per_image_latency_ms=args.per_image_latency_ms,
+            batch_size=args.batch_size,
+            seed=args.seed,
+            shard_workers=args.shard_workers,
+            import_budget_ms=args.import_budget_ms,
+        )
+        return bench.main(
+            config=config,
+            scenarios=args.scenarios,
+            output=args.output,
+            baseline=args.baseline,
+            tolerance=args.tolerance,
+        )
+
+    if args.command == "frame-store":
+        from roboflow_gap.gather import FrameStore
+        from roboflow_gap.gather.gather_from_directory import IMAGE_PATTERNS, scan_paths
+        from roboflow_gap.utils.paths import pathify
+
+        store = FrameStore(args.store)
+        for directory in args.directories:
+            added = store.pack(
+                scan_paths(
+                    directory=pathify(directory),
+                    patterns=args.patterns or IMAGE_PATTERNS,
+                    recursive=not args.no_recursive,
+                ),
+                decode_scale=args.decode_scale,
+                workers=args.workers,
+            )
+            print(f"Packed {added} new frames from {directory}")
+        size = store.data_path.stat().st_size if store.data_path.exists() else 0
+        print(f"{store!r}, {size} bytes")
+        return 0
+
+    if args.command == "detections":
+        import json
+
+        from roboflow_gap.process import DetectionStore
+        from roboflow_gap.utils.dates import parse_time
+
+        store = DetectionStore(args.store, readonly=True)
+        try:
+            if args.list == "sources":
+                print("\n".join(store.sources()))
+                return 0
+            if args.list == "classes":
+                print("\n".join(f"{x}\t{y}" for x, y in store.classes().items()))
+                return 0
+            filters = {
+                "sources": args.sources,
+                "class_ids": args.class_ids,
+                "class_names": args.class_names,
+                "min_confidence": args.min_confidence,
+                "since": parse_time(args.since) if args.since else None,
+                "until": parse_time(args.until) if args.until else None,
+            }
+            if args.count:
+                print(store.count(**filters))
+                return 0
+            for row in store.query(
+                limit=args.limit or None, newest_first=args.newest_first, **filters
+            ):
+                print(json.dumps(row._asdict()))
+        finally:
+            store.close()
+        return 0
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,41 @@
+import asyncio
 import logging
 import typing as t
 from pathlib import Path
 
-import supervision as sv
-from inference import get_model
-from inference.core.models.base import Model as InferenceModel
+from roboflow_gap.metrics.registry import Counter, Registry
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.batches import batch_stream
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.executors import StageExecutor
 
-from roboflow_gap.models import ImageData
+from .cache import ResultCache, cache_key, image_digest
+from .dedup import NearDuplicateIndex
+from .model_pool import ModelPool, get_model_pool, load_stub_model, set_model_pool
+from .motion_gate import MotionGate
+from .preprocess import Preprocess, to_source
+from .sharded import ShardedAnalyze
+from .stub_model import StubModel
+from .tiling import Tiler
+
+if t.TYPE_CHECKING:
+    import cv2
+    from inference.core.models.base import Model as InferenceModel
+
+__all__ = [
+    "Analyze",
+    "ModelPool",
+    "NearDuplicateIndex",
+    "MotionGate",
+    "Preprocess",
+    "ResultCache",
+    "ShardedAnalyze",
+    "StubModel",
+    "Tiler",
+    "get_model_pool",
+    "load_stub_model",
+    "set_model_pool",
+]
 
 
 class Analyze:
@@ -17,68 +46,313 @@ class Analyze:
         confidence: float = 0.5,
         iou_threshold: float = 0.5,
         lazy_load: bool = False,
+        model: t.Optional["InferenceModel"] = None,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        executor: t.Optional[StageExecutor] = None,
+        inference_workers: t.Optional[int] = None,
+        inference_max_in_flight: t.Optional[int] = None,
+        cache: t.Optional[ResultCache] = None,
+        metrics: t.Optional[Registry] = None,
+        pool: t.Optional[ModelPool] = None,
+        motion_gate: t.Optional[MotionGate] = None,
+        tiler: t.Optional[Tiler] = None,
+        dedup: t.Optional[NearDuplicateIndex] = None,
     ):
         self.api_key = api_key
         self.model_id = model_id
         self.confidence = confidence
         self.iou_threshold = iou_threshold
-        self.model: t.Optional[InferenceModel] = None
+        self.model: t.Optional["InferenceModel"] = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.pool: ModelPool = pool if pool is not None else get_model_pool()
+        if inference_workers is None:
+            # one thread per pool replica, so every replica can run at once
+            inference_workers = 1 if model is not None else self.pool.replicas
+        self.executor: StageExecutor = executor or StageExecutor(
+            name="inference",
+            kind="thread",
+            workers=inference_workers,
+            max_in_flight=inference_max_in_flight,
+        )
+        self.cache = cache
+        self.motion_gate = motion_gate
+        self.tiler = tiler
+        self.dedup = dedup
+        self.metrics = metrics
+        self._cache_requests: t.Optional[Counter] = (
+            metrics.counter("gap_cache_requests", "Result cache lookups.", ("result",))
+            if metrics is not None
+            else None
+        )
+        self._dedup_lookups: t.Optional[Counter] = (
+            metrics.counter("gap_dedup_lookups", "Near duplicate lookups.", ("result",))
+            if metrics is not None and dedup is not None
+            else None
+        )
+        self._motion_frames: t.Optional[Counter] = (
+            metrics.counter("gap_motion_frames", "Motion gated frames.", ("result",))
+            if metrics is not None and motion_gate is not None
+            else None
+        )
         self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
 
-        if not lazy_load:
-            self.load_model()
-
-    async def load_model(self) -> InferenceModel:
-        """Loads the Roboflow model."""
-        self.model: InferenceModel = get_model(model_id=self.model_id, api_key=self.api_key)
-        self.logger.debug("Loaded model: %s", self.model)
-        return self.model
-
-    async def run_inference(self, image_path: Path) -> t.Dict[str, t.Any]:
-        """Runs inference on an image using the loaded model."""
-        if not self.model:
-            await self.load_model()
-        results = self.model.infer(
-            image=str(image_path), confidence=self.confidence, iou_threshold=self.iou_threshold
-        )
-        # NOTE1:
+        if not lazy_load and self.model is None:
+            self.pool.load(self.model_id, api_key=self.api_key)
+
+    async def load_model(self) -> "InferenceModel":
+        """Loads the Roboflow model into the model pool, returning one of its replicas.
+
+        Models are shared through the pool, so analyzers of the same model_id load it once.
+        """
+        pooled = await self.pool.aload(self.model_id, api_key=self.api_key)
+        self.logger.debug("Loaded model: %s", pooled)
+        return pooled.replicas[0]
+
+    async def run_inference(
+        self, image: t.Union[Path, "cv2.typing.MatLike", t.List["cv2.typing.MatLike"]]
+    ) -> t.List[t.Any]:
+        """Runs inference on an image, or a list of images in one call, using the loaded model.
+
+        The model call runs on the inference executor so the event loop stays free for gathering
+        and other stages while the model is busy. Unless a model was given, a replica is checked
+        out of the model pool for the call, so concurrent calls run on separate replicas.
+        """
+        if isinstance(image, Path):
+            image = str(image)
+        # NOTE:
         # there are a lot of other arguments that can be passed to infer, and
         # the args seem to change based on the model type
+        kwargs = {
+            "image": image,
+            "confidence": self.confidence,
+            "iou_threshold": self.iou_threshold,
+        }
+        if self.model is not None:
+            return await self.executor.run(self.model.infer, **kwargs)
+        async with self.pool.checkout(self.model_id, api_key=self.api_key) as model:
+            return await self.executor.run(model.infer, **kwargs)
 
-        # NOTE2:
-        # image can be a path or a cv2 image, but the type hinting is not clear on this
+    async def run_tiled_inference(
+        self, images: t.List["cv2.typing.MatLike"], items: t.Sequence[ImageData]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """Runs inference on overlapping tiles of each image, merging detections per image.
 
-        # NOTE3:
-        # we already have loaded the image in image_data.original, so we should pass that to
-        # the model.infer instead of the path
-
-        return results
+        The slicing, inference and merge times of the batch are recorded in each item's context
+        under tiling.
+        """
+        detections, timings = await self.tiler.run(
+            images,
+            infer=self.run_inference,
+            to_detections=lambda x: self.build_detections(x)["detections"],
+        )
+        for image_data in items:
+            image_data.context["tiling"] = timings
+        return [{"detections": x} for x in detections]
 
     async def analyze_image(self, image_data: ImageData) -> ImageData:
         """Analyzes an image and updates the ImageData instance with analysis results."""
-        if not image_data.original:
-            return image_data  # Skip if there's no image to analyze
+        await self.analyze_batch([image_data])
+        return image_data
+
+    async def analyze_batch(self, images: t.Sequence[ImageData]) -> t.List[ImageData]:
+        """Analyzes a batch of images with a single inference call."""
+        images = list(images)
+        if self.motion_gate is None:
+            await self._analyze_batch(images)
+        else:
+            await self._analyze_gated(images)
+        date_done, done = get_now(), get_monotonic()
+        for image_data in images:
+            image_data.date_analyze_done = date_done
+            image_data.mark("analyze", at=done)
+        return images
+
+    async def _analyze_gated(self, images: t.List[ImageData]) -> t.List[ImageData]:
+        """Analyzes the images of a batch that moved enough, carrying detections to the rest."""
+        if all(x.is_decoded or not x.has_original for x in images):
+            analyze, skipped = self.motion_gate.split(images)
+        else:
+            analyze, skipped = await self.executor.run(self.motion_gate.split, images)
+        if self._motion_frames is not None:
+            self._motion_frames.inc(len(images) - len(skipped), result="analyzed")
+            self._motion_frames.inc(len(skipped), result="skipped")
+        await self._analyze_batch(analyze)
+        self.motion_gate.update(analyze)
+        self.motion_gate.carry(skipped)
+        return images
+
+    async def _analyze_batch(self, images: t.List[ImageData]) -> t.List[ImageData]:
+        """Analyzes the images of a batch that have an original image and no cached result."""
+        # Skip items there's no image to analyze for
+        ready = [x for x in images if x.has_original]
+        if not ready:
+            return images
+
+        keys: t.Dict[int, str] = {}
+        if self.cache is not None:
+            # hashing frames and the disk tier would stall the event loop, look up off it
+            misses, keys = await asyncio.to_thread(self.lookup_cache, ready)
+            if self._cache_requests is not None:
+                self._cache_requests.inc(len(ready) - len(misses), result="hit")
+                self._cache_requests.inc(len(misses), result="miss")
+            ready = misses
+            if not ready:
+                return images
 
         try:
-            image_path = image_data.context["path"]  # Assuming context contains the image path
-            results = await self.run_inference(image_path)
-            if results:
-                detections = sv.Detections.from_inference(results[0])
-                image_data.analysis = {
-                    "detections": detections.to_dict()
-                }  # Convert detections to a serializable format
-                # Update date_analyze_done if necessary
+            await self._analyze_misses(ready, keys)
+        finally:
+            if self.cache is not None:
+                # near duplicates only carry an approximate result, never cache it as exact
+                stored = {
+                    keys[id(x)]: x.analysis
+                    for x in ready
+                    if x.error is None
+                    and x.analysis
+                    and id(x) in keys
+                    and not x.context.get("duplicate")
+                }
+                if stored:
+                    await asyncio.to_thread(self.cache.set_many, stored)
+        return images
+
+    def lookup_cache(
+        self, images: t.Sequence[ImageData]
+    ) -> t.Tuple[t.List[ImageData], t.Dict[int, str]]:
+        """Give images their cached analysis in one batch lookup.
+
+        Returns the images that missed and the cache key of each, by id.
+        """
+        keys = {id(x): self.get_cache_key(x) for x in images}
+        found = self.cache.get_many(list(keys.values()))
+        misses = []
+        for image_data in images:
+            cached = found.get(keys[id(image_data)])
+            if cached is None:
+                misses.append(image_data)
             else:
-                image_data.error = "No results from inference."
+                image_data.analysis = cached
+                image_data.context["cached"] = True
+        return misses, keys
+
+    async def _analyze_misses(self, ready: t.List[ImageData], keys: t.Dict[int, str]) -> None:
+        """Analyzes images that missed the cache, skipping near duplicates if enabled."""
+
+        if self.dedup is None:
+            await self._infer_batch(ready)
+            return
+
+        if all(x.is_decoded for x in ready):
+            ready, duplicates = self.dedup.split(ready)
+        else:
+            ready, duplicates = await self.executor.run(self.dedup.split, ready)
+        if self._dedup_lookups is not None:
+            self._dedup_lookups.inc(len(duplicates), result="hit")
+            self._dedup_lookups.inc(len(ready), result="miss")
+        try:
+            if ready:
+                await self._infer_batch(ready)
+        finally:
+            self.dedup.update(ready)
+            self.dedup.apply(duplicates)
+
+    async def _infer_batch(self, ready: t.List[ImageData]) -> None:
+        """Runs inference on images and stores their analysis, or the error, on each."""
+        try:
+            if all(x.is_decoded for x in ready):
+                originals = [x.original for x in ready]
+            else:
+                # lazily decoded or shared frames are mapped off the event loop
+                originals = await self.executor.run(lambda: [x.get_original() for x in ready])
+            if self.tiler is None:
+                results = await self.run_inference(originals)
+            else:
+                results = await self.run_tiled_inference(originals, ready)
         except Exception as e:
-            image_data.error = str(e)
-            # Optionally log the error or handle it as needed
+            self.logger.exception("Inference failed for batch of %d images", len(ready))
+            for image_data in ready:
+                image_data.error = str(e)
+                image_data.error_exc = e
+            return
 
-        return image_data
+        results = list(results or [])
+        if len(results) != len(ready):
+            error = f"Expected {len(ready)} results from inference, got {len(results)}."
+            for image_data in ready:
+                image_data.error = error
+            return
+
+        for image_data, result in zip(ready, results):
+            if result:
+                try:
+                    image_data.analysis = (
+                        result if self.tiler is not None else self.build_detections(result)
+                    )
+                    self.map_to_source(image_data)
+                except Exception as e:
+                    image_data.error = str(e)
+                    image_data.error_exc = e
+            else:
+                image_data.error = "No results from inference."
+
+    def get_cache_key(self, image_data: ImageData) -> str:
+        """Build the result cache key for an image and this analyzer's parameters.
+
+        Preprocessing, reduced decoding and tiling change what the model sees, and the coordinate
+        space of the detections, so their settings are part of the key.
+        """
+        context = image_data.context
+        settings = []
+        if context.get("preprocess"):
+            settings.append(str(context["preprocess"]))
+        if context.get("decode_scale", 1) != 1:
+            settings.append(f"decode_scale={context['decode_scale']}")
+        if self.tiler is not None:
+            settings.append(self.tiler.settings)
+        return cache_key(
+            digest=image_digest(image_data),
+            model_id=self.model_id,
+            confidence=self.confidence,
+            iou_threshold=self.iou_threshold,
+            settings=",".join(settings),
+        )
+
+    async def analyze_stream(
+        self,
+        images: t.AsyncIterable[ImageData],
+        max_batch_size: t.Optional[int] = None,
+        max_wait_ms: t.Optional[float] = None,
+    ) -> t.AsyncIterator[ImageData]:
+        """Analyzes a stream of images in micro-batches, yielding them in arrival order."""
+        async for batch in batch_stream(
+            images,
+            max_batch_size=max_batch_size or self.max_batch_size,
+            max_wait_ms=self.max_wait_ms if max_wait_ms is None else max_wait_ms,
+        ):
+            for image_data in await self.analyze_batch(batch):
+                yield image_data
+
+    @staticmethod
+    def map_to_source(image_data: ImageData) -> None:
+        """Map detections of a preprocessed or reduced decode frame back to the source image."""
+        detections = (image_data.analysis or {}).get("detections")
+        if detections is None or not len(detections):
+            return
+        context = image_data.context
+        if "scale" in context or context.get("decode_scale", 1) != 1:
+            detections.xyxy = to_source(detections.xyxy, context)
 
     @staticmethod
-    def build_detections(inference_results: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
-        """Processes inference results into a standardized format."""
+    def build_detections(inference_result: t.Any) -> t.Dict[str, t.Any]:
+        """Processes a single inference result into a standardized format.
+
+        Detections are kept as sv.Detections so later stages can read the numpy arrays
+        (xyxy, confidence, class_id) directly instead of per-object Python structures.
+        """
+        import supervision as sv
+
         # Placeholder for custom processing logic
-        detections: sv.Detections = sv.Detections.from_inference(inference_results[0])
-        return {"detections": detections.to_dict()}
+        detections: "sv.Detections" = sv.Detections.from_inference(inference_result)
+        return {"detections": detections}
@@ -0,0 +1,313 @@
+import collections
+import copy
+import hashlib
+import logging
+import pathlib
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.utils.paths import pathify
+
+if t.TYPE_CHECKING:
+    from roboflow_gap.models.image_data import ImageData
+
+
+def image_digest(image_data: "ImageData") -> str:
+    """Get a content hash for an image.
+
+    Uses the hash of the encoded bytes recorded by the gatherer when there is one, which is
+    much cheaper than hashing the decoded frame.
+    """
+    digest = (image_data.context or {}).get("digest")
+    if digest:
+        return str(digest)
+    if image_data.encoded is not None:
+        return hashlib.blake2b(image_data.encoded, digest_size=16).hexdigest()
+    frame = np.ascontiguousarray(image_data.get_original())
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{frame.shape}:{frame.dtype}".encode())
+    hasher.update(memoryview(frame).cast("B"))
+    return hasher.hexdigest()
+
+
+def estimate_size(value: t.Any, depth: int = 4) -> int:
+    """Rough size in bytes of a cached value, counting numpy arrays by their buffers.
+
+    Much cheaper than pickling a value just to measure it; objects such as sv.Detections are
+    walked through their attributes.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if depth <= 0:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(x, depth - 1) for x in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(x, depth - 1) for x in value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes:
+        return sys.getsizeof(value) + estimate_size(attributes, depth - 1)
+    return sys.getsizeof(value)
+
+
+def cache_key(
+    digest: str, model_id: str, confidence: float, iou_threshold: float, settings: str = ""
+) -> str:
+    """Build a cache key from an image hash and the inference parameters.
+
+    settings describes anything else the result depends on, such as preprocessing, reduced
+    decoding or tiling, so results of differently prepared frames never share a key.
+    """
+    key = f"{model_id}:{confidence:g}:{iou_threshold:g}:{digest}"
+    return f"{key}:{settings}" if settings else key
+
+
+class CacheStats:
+    """Hit and miss counters for a ResultCache."""
+
+    def __init__(self):
+        self.hits: int = 0
+        self.misses: int = 0
+        self.memory_hits: int = 0
+        self.disk_hits: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()})"
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were hits."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """Snapshot of the counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class MemoryCache:
+    """In-memory LRU tier, bounded by item count, pickled size and age."""
+
+    def __init__(
+        self,
+        max_items: int = 10_000,
+        max_bytes: t.Optional[int] = 256 * 1024 * 1024,
+        ttl: t.Optional[float] = None,
+        stats: t.Optional[CacheStats] = None,
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = stats or CacheStats()
+        self.size_bytes: int = 0
+        self._items: t.OrderedDict[str, t.Tuple[float, int, t.Any]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> t.Optional[t.Any]:
+        """Get a value and mark it as recently used, or None if missing or expired."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            created, size, value = item
+            if self.ttl is not None and time.monotonic() - created > self.ttl:
+                del self._items[key]
+                self.size_bytes -= size
+                self.stats.expirations += 1
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: t.Any, size: t.Optional[int] = None) -> None:
+        """Store a value, evicting least recently used values to stay within bounds."""
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._items[key] = (time.monotonic(), size, value)
+            self.size_bytes += size
+            while self._items and (
+                len(self._items) > self.max_items
+                or (self.max_bytes is not None and self.size_bytes > self.max_bytes)
+            ):
+                _, (_, evicted, _) = self._items.popitem(last=False)
+                self.size_bytes -= evicted
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every value."""
+        with self._lock:
+            self._items.clear()
+            self.size_bytes = 0
+
+
+class SqliteCache:
+    """Persistent tier storing pickled values in a SQLite database."""
+
+    def __init__(self, path: PathLike, ttl: t.Optional[float] = None):
+        self.path: pathlib.Path = pathify(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> t.Optional[t.Tuple[t.Any, int]]:
+        """Get a value and its pickled size, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and time.time() - created > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return pickle.loads(value), len(value)  # noqa: S301
+
+    def set(self, key: str, value: t.Any) -> int:
+        """Store a value, returning its pickled size."""
+        return self.set_many({key: value})[key]
+
+    def get_many(self, keys: t.Sequence[str]) -> t.Dict[str, t.Tuple[t.Any, int]]:
+        """Get the values and pickled sizes of the keys found, in one query per 500 keys."""
+        rows = []
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start : start + 500])
+                marks = ",".join("?" * len(chunk))
+                sql = f"SELECT key, value, created FROM results WHERE key IN ({marks})"
+                rows.extend(self._conn.execute(sql, chunk).fetchall())
+            expired = [
+                (key,)
+                for key, _, created in rows
+                if self.ttl is not None and time.time() - created > self.ttl
+            ]
+            if expired:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM results WHERE key = ?", expired)
+        expired_keys = {x for (x,) in expired}
+        return {
+            key: (pickle.loads(value), len(value))  # noqa: S301
+            for key, value, _ in rows
+            if key not in expired_keys
+        }
+
+    def set_many(self, items: t.Dict[str, t.Any]) -> t.Dict[str, int]:
+        """Store values in one transaction, returning their pickled sizes."""
+        now = time.time()
+        rows = [
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now)
+            for key, value in items.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)", rows
+            )
+        return {key: len(data) for key, data, _ in rows}
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class ResultCache:
+    """Content-addressed inference result cache with a memory tier and optional SQLite tier."""
+
+    def __init__(
+        self,
+        max_items: int = 10_000,
+        max_bytes: t.Optional[int] = 256 * 1024 * 1024,
+        ttl: t.Optional[float] = None,
+        path: t.Optional[PathLike] = None,
+        disk_ttl: t.Optional[float] = None,
+    ):
+        self.stats = CacheStats()
+        self.memory = MemoryCache(
+            max_items=max_items, max_bytes=max_bytes, ttl=ttl, stats=self.stats
+        )
+        self.disk: t.Optional[SqliteCache] = (
+            SqliteCache(path=path, ttl=disk_ttl) if path is not None else None
+        )
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(items={len(self.memory)}, stats={self.stats.to_dict()})"
+
+    def get(self, key: str) -> t.Optional[t.Any]:
+        """Look a key up in memory, then on disk, promoting disk hits to memory."""
+        return self.get_many([key]).get(key)
+
+    def set(self, key: str, value: t.Any) -> None:
+        """Store a value in every tier."""
+        self.set_many({key: value})
+
+    def get_many(self, keys: t.Sequence[str]) -> t.Dict[str, t.Any]:
+        """Look keys up in memory, then the rest on disk in one query, returning those found.
+
+        Values are private copies, so callers may modify them without touching the cache.
+        """
+        found: t.Dict[str, t.Any] = {}
+        missing = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                self.stats.memory_hits += 1
+                found[key] = copy.deepcopy(value)
+
+        if missing and self.disk is not None:
+            for key, (value, size) in self.disk.get_many(missing).items():
+                # the unpickled value is already private, keep a copy of it in memory
+                self.memory.set(key, copy.deepcopy(value), size=size)
+                self.stats.disk_hits += 1
+                found[key] = value
+
+        self.stats.hits += len(found)
+        self.stats.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: t.Dict[str, t.Any]) -> None:
+        """Store copies of values in every tier, on disk in one transaction."""
+        if not items:
+            return
+        sizes = self.disk.set_many(items) if self.disk is not None else {}
+        for key, value in items.items():
+            self.memory.set(key, copy.deepcopy(value), size=sizes.get(key))
+
+    def close(self) -> None:
+        """Close the persistent tier."""
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,244 @@
+import copy
+import itertools
+import threading
+import time
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.models.image_data import ImageData
+
+HashMethod = t.Literal["dhash", "phash"]
+
+# set bits of every byte value, for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(x).count("1") for x in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits of each uint64 value."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def _gray(image: np.ndarray, size: t.Tuple[int, int]) -> np.ndarray:
+    """Downsample a frame to a grayscale float32 array of size (width, height)."""
+    import cv2
+
+    small = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3 and small.shape[2] == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    elif small.ndim == 3:
+        small = small[:, :, 0]
+    return small.astype(np.float32)
+
+
+def _pack(bits: np.ndarray) -> int:
+    """Pack 64 booleans into an integer."""
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), "big")
+
+
+def dhash(image: np.ndarray) -> int:
+    """64 bit difference hash: whether each pixel of a 9x8 thumbnail is brighter than the next."""
+    small = _gray(image, (9, 8))
+    return _pack(small[:, 1:] > small[:, :-1])
+
+
+def phash(image: np.ndarray) -> int:
+    """64 bit perceptual hash: low DCT frequencies of a 32x32 thumbnail against their median."""
+    import cv2
+
+    low = cv2.dct(_gray(image, (32, 32)))[:8, :8]
+    return _pack(low > np.median(low.reshape(-1)[1:]))
+
+
+HASHERS: t.Dict[str, t.Callable[[np.ndarray], int]] = {"dhash": dhash, "phash": phash}
+
+
+def source_shape(image_data: ImageData, image: np.ndarray) -> t.Tuple[int, int]:
+    """(height, width) of the source image a frame was decoded and preprocessed from."""
+    size = image_data.context.get("source_size")
+    if size is not None:
+        width, height = size
+        return int(height), int(width)
+    decode_scale = image_data.context.get("decode_scale", 1)
+    return image.shape[0] * decode_scale, image.shape[1] * decode_scale
+
+
+class DedupStats:
+    """Lookup counters for a NearDuplicateIndex."""
+
+    def __init__(self):
+        self.lookups: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()})"
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups whose inference was skipped."""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """Snapshot of the counters."""
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class NearDuplicateIndex:
+    """Reuse the analysis of a recent near-identical image instead of running inference again.
+
+    Each image gets a 64 bit dhash or phash of a downsampled grayscale frame, and is compared
+    against the hashes of the last window analyzed images by Hamming distance, all at once with
+    numpy. If the closest one is within max_distance bits and comes from a source image of the
+    same size, its analysis is reused; analyses are in source image coordinates, so the size of
+    the preprocessed or reduced decode frame is not enough. Entries older than max_age seconds
+    are not matched, if given. Hits within a batch are resolved once the image they matched has
+    been analyzed, and each duplicate gets its own copy of the analysis.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 4,
+        window: int = 256,
+        method: HashMethod = "dhash",
+        max_age: t.Optional[float] = None,
+    ):
+        if method not in HASHERS:
+            raise ValueError(f"Invalid method: {method}, valids: {list(HASHERS)}")
+        self.max_distance = max_distance
+        self.window = max(int(window), 1)
+        self.method = method
+        self.max_age = max_age
+        self.stats = DedupStats()
+        self._hasher = HASHERS[method]
+        self._lock = threading.Lock()
+        self._hashes = np.zeros(self.window, dtype=np.uint64)
+        self._shapes = np.zeros((self.window, 2), dtype=np.int64)
+        self._added = np.full(self.window, -np.inf, dtype=np.float64)
+        self._valid = np.zeros(self.window, dtype=bool)
+        # batch that owns a pending entry, 0 once its analysis is stored
+        self._owners = np.zeros(self.window, dtype=np.int64)
+        self._batches = itertools.count(1)
+        # analysis dict, or the ImageData whose analysis is still pending
+        self._entries: t.List[t.Any] = [None] * self.window
+        self._next: int = 0
+        self._size: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(method={self.method!r}, max_distance={self.max_distance}, "
+            f"window={self.window}, size={self._size})"
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    def hash_image(self, image: np.ndarray) -> int:
+        """Perceptual hash of a frame."""
+        return self._hasher(image)
+
+    def lookup(self, value: int, shape: t.Tuple[int, int], batch: int = 0) -> t.Any:
+        """Entry of the closest recent hash within max_distance for a source size, if any.
+
+        Entries still pending are only matched by the batch that added them.
+        """
+        with self._lock:
+            if not self._size:
+                return None
+            distances = popcount(self._hashes[: self._size] ^ np.uint64(value)).astype(np.int64)
+            valid = self._valid[: self._size] & (self._shapes[: self._size] == shape).all(axis=1)
+            owners = self._owners[: self._size]
+            valid &= (owners == 0) | (owners == batch)
+            if self.max_age is not None:
+                valid &= self._added[: self._size] >= time.monotonic() - self.max_age
+            distances[~valid] = 64 + 1
+            slot = int(np.argmin(distances))
+            if distances[slot] > self.max_distance:
+                return None
+            return self._entries[slot]
+
+    def add(self, value: int, shape: t.Tuple[int, int], entry: t.Any, batch: int = 0) -> int:
+        """Store a hash with its analysis or pending ImageData, evicting the oldest if full."""
+        with self._lock:
+            slot = self._next
+            if self._size == self.window:
+                self.stats.evictions += 1
+            self._hashes[slot] = np.uint64(value)
+            self._shapes[slot] = shape
+            self._added[slot] = time.monotonic()
+            self._entries[slot] = entry
+            self._valid[slot] = True
+            self._owners[slot] = batch if isinstance(entry, ImageData) else 0
+            self._next = (slot + 1) % self.window
+            self._size = min(self._size + 1, self.window)
+            return slot
+
+    def split(
+        self, images: t.Sequence[ImageData]
+    ) -> t.Tuple[t.List[ImageData], t.List[t.Tuple[ImageData, t.Any]]]:
+        """Split images into those to analyze and near duplicates paired with what they matched.
+
+        A match is either an analysis dict or an ImageData of this batch still to be analyzed.
+        Images still being analyzed by another batch are not matched, since that batch may not
+        be done by the time this one applies its duplicates.
+        """
+        analyze: t.List[ImageData] = []
+        duplicates: t.List[t.Tuple[ImageData, t.Any]] = []
+        batch = next(self._batches)
+        for image_data in images:
+            image = image_data.get_original()
+            value = self.hash_image(image)
+            shape = source_shape(image_data, image)
+            image_data.context["perceptual_hash"] = f"{value:016x}"
+            self.stats.lookups += 1
+            entry = self.lookup(value, shape, batch=batch)
+            if entry is not None:
+                self.stats.hits += 1
+                duplicates.append((image_data, entry))
+                continue
+            self.stats.misses += 1
+            self.add(value, shape, image_data, batch=batch)
+            analyze.append(image_data)
+        return analyze, duplicates
+
+    def update(self, images: t.Sequence[ImageData]) -> None:
+        """Replace pending entries of analyzed images by their analysis, dropping failed ones."""
+        pending = {id(x): x for x in images}
+        with self._lock:
+            for slot, entry in enumerate(self._entries[: self._size]):
+                if isinstance(entry, ImageData) and id(entry) in pending:
+                    ok = entry.error is None and bool(entry.analysis)
+                    self._entries[slot] = dict(entry.analysis) if ok else None
+                    self._valid[slot] = ok
+                    self._owners[slot] = 0
+
+    def apply(self, duplicates: t.Sequence[t.Tuple[ImageData, t.Any]]) -> None:
+        """Give near duplicates the analysis, or the error, of the image they matched."""
+        for image_data, entry in duplicates:
+            if isinstance(entry, ImageData):
+                if entry.error is not None or not entry.analysis:
+                    image_data.error = entry.error or "No results from inference."
+                    image_data.error_exc = entry.error_exc
+                    continue
+                entry = entry.analysis
+            # a copy, so processors changing one image's detections leave the others alone
+            image_data.analysis = copy.deepcopy(entry)
+            image_data.context["duplicate"] = True
+
+    def clear(self) -> None:
+        """Forget every stored hash."""
+        with self._lock:
+            self._entries = [None] * self.window
+            self._valid[:] = False
+            self._owners[:] = 0
+            self._next = 0
+            self._size = 0
@@ -0,0 +1,315 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import os
+import threading
+import time
+import typing as t
+
+import numpy as np
+
+from .stub_model import StubModel
+
+# loader(model_id, **params) -> model with an infer(image=..., ...) method
+ModelLoader = t.Callable[..., t.Any]
+ModelKey = t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]]
+
+# Parameters passed to the loader that do not change which model is loaded.
+UNKEYED_PARAMS: t.Tuple[str, ...] = ("api_key",)
+
+
+def load_inference_model(model_id: str, api_key: t.Optional[str] = None, **params: t.Any) -> t.Any:
+    """Load a model with the inference package."""
+    from inference import get_model
+
+    return get_model(model_id=model_id, api_key=api_key, **params)
+
+
+def load_stub_model(model_id: str, **params: t.Any) -> StubModel:
+    """Load a StubModel, params are passed to its constructor."""
+    params.pop("api_key", None)
+    return StubModel(**params)
+
+
+def resident_bytes() -> int:
+    """Resident memory of this process in bytes, 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def model_key(model_id: str, params: t.Dict[str, t.Any]) -> ModelKey:
+    """Registry key for a model id and the loader parameters that select the model."""
+    return model_id, tuple(
+        sorted((k, repr(v)) for k, v in params.items() if k not in UNKEYED_PARAMS)
+    )
+
+
+class PooledModel:
+    """Loaded replicas of one model, checked out one caller at a time."""
+
+    def __init__(self, key: ModelKey, replicas: t.List[t.Any], nbytes: int):
+        self.key = key
+        self.replicas = replicas
+        self.nbytes = nbytes
+        self.last_used: float = time.monotonic()
+        self.checkouts: int = 0
+        self.waits: int = 0
+        self._lock = threading.Lock()
+        self._idle: t.Deque[t.Any] = collections.deque(replicas)
+        self._waiters: t.Deque[asyncio.Future] = collections.deque()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(model_id={self.model_id!r}, "
+            f"replicas={len(self.replicas)}, in_use={self.in_use}, nbytes={self.nbytes})"
+        )
+
+    @property
+    def model_id(self) -> str:
+        """Model id the replicas were loaded for."""
+        return self.key[0]
+
+    @property
+    def in_use(self) -> int:
+        """Number of replicas currently checked out."""
+        return len(self.replicas) - len(self._idle)
+
+    @property
+    def busy(self) -> bool:
+        """If any replica is checked out or waited for."""
+        return self.in_use > 0 or bool(self._waiters)
+
+    async def acquire(self) -> t.Any:
+        """Check out a replica, waiting for one to be released if all are in use."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            self.checkouts += 1
+            if self._idle:
+                return self._idle.popleft()
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.waits += 1
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            raise
+
+    def release(self, model: t.Any) -> None:
+        """Return a replica, handing it straight to the longest waiting caller if any."""
+        with self._lock:
+            self.last_used = time.monotonic()
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    # waiters may belong to another thread's event loop
+                    waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter, model)
+                    return
+            self._idle.append(model)
+
+    def _hand_over(self, waiter: asyncio.Future, model: t.Any) -> None:
+        """Resolve a waiter with a replica, on the waiter's event loop."""
+        if waiter.done():
+            self.release(model)
+        else:
+            waiter.set_result(model)
+
+
+class ModelPool:
+    """Process-wide registry of loaded models, keyed by model id and loader parameters.
+
+    Each model is loaded once as replicas instances, warmed up with an inference on a blank
+    frame, and then checked out like a pool connection, so concurrent inference calls each get
+    their own replica and several pipelines share one set of weights. With a memory_budget,
+    models nobody has checked out are evicted least recently used first once loading another
+    would exceed it. Model size comes from sizer if given, otherwise from the growth of resident
+    memory while loading, which is only an estimate.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        loader: ModelLoader = load_inference_model,
+        replicas: int = 1,
+        memory_budget: t.Optional[int] = None,
+        warmup: bool = True,
+        warmup_shape: t.Tuple[int, int, int] = (640, 640, 3),
+        sizer: t.Optional[t.Callable[[t.Any], int]] = None,
+    ):
+        self.loader = loader
+        self.replicas = max(int(replicas), 1)
+        self.memory_budget = memory_budget
+        self.warmup = warmup
+        self.warmup_shape = warmup_shape
+        self.sizer = sizer
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self.evictions: int = 0
+        self._lock = threading.Lock()
+        self._load_locks: t.Dict[ModelKey, threading.Lock] = {}
+        self._models: "collections.OrderedDict[ModelKey, PooledModel]" = (
+            collections.OrderedDict()
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(models={len(self._models)}, nbytes={self.nbytes}, "
+            f"memory_budget={self.memory_budget})"
+        )
+
+    def __contains__(self, model_id: str) -> bool:
+        return any(key[0] == model_id for key in self._models)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated memory held by every loaded model."""
+        return sum(x.nbytes for x in list(self._models.values()))
+
+    def get(self, model_id: str, **params: t.Any) -> t.Optional[PooledModel]:
+        """A loaded model, without loading it."""
+        return self._models.get(model_key(model_id, params))
+
+    def load(self, model_id: str, replicas: t.Optional[int] = None, **params: t.Any) -> PooledModel:
+        """Load and warm up a model if it is not loaded yet, blocking until it is ready.
+
+        Concurrent loads of the same model wait for the first one instead of loading it again.
+        """
+        key = model_key(model_id, params)
+        with self._lock:
+            pooled = self._models.get(key)
+            if pooled is not None:
+                self._models.move_to_end(key)
+                return pooled
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            pooled = self._models.get(key)
+            if pooled is not None:
+                return pooled
+
+            count = max(int(replicas or self.replicas), 1)
+            started = time.monotonic()
+            before = resident_bytes()
+            models = []
+            for _ in range(count):
+                model = self.loader(model_id, **params)
+                if self.warmup:
+                    self.warm_up(model)
+                models.append(model)
+            if self.sizer is not None:
+                nbytes = sum(self.sizer(x) for x in models)
+            else:
+                nbytes = max(resident_bytes() - before, 0)
+            pooled = PooledModel(key=key, replicas=models, nbytes=nbytes)
+
+            with self._lock:
+                self._models[key] = pooled
+                self._load_locks.pop(key, None)
+            self.logger.debug(
+                "Loaded %d replicas of model_id=%s in %.3fs, nbytes=%d",
+                count,
+                model_id,
+                time.monotonic() - started,
+                nbytes,
+            )
+            self.enforce_budget(keep=key)
+            return pooled
+
+    async def aload(
+        self, model_id: str, replicas: t.Optional[int] = None, **params: t.Any
+    ) -> PooledModel:
+        """Load and warm up a model on a thread, keeping the event loop free."""
+        pooled = self.get(model_id, **params)
+        if pooled is not None:
+            return pooled
+        return await asyncio.to_thread(self.load, model_id, replicas, **params)
+
+    def warm_up(self, model: t.Any) -> None:
+        """Run one inference on a blank frame so lazy initialization happens now."""
+        try:
+            model.infer(image=np.zeros(self.warmup_shape, dtype=np.uint8))
+        except Exception:
+            self.logger.warning("Warmup inference failed for model=%r", model, exc_info=True)
+
+    @contextlib.asynccontextmanager
+    async def checkout(self, model_id: str, **params: t.Any) -> t.AsyncIterator[t.Any]:
+        """Check out a replica of a model for the duration of the block, loading it if needed."""
+        pooled = await self.aload(model_id, **params)
+        with self._lock:
+            if pooled.key in self._models:
+                self._models.move_to_end(pooled.key)
+        model = await pooled.acquire()
+        try:
+            yield model
+        finally:
+            pooled.release(model)
+
+    def enforce_budget(self, keep: t.Optional[ModelKey] = None) -> int:
+        """Evict idle models, least recently used first, until within the memory budget."""
+        if self.memory_budget is None:
+            return 0
+        evicted = 0
+        with self._lock:
+            for key, pooled in list(self._models.items()):
+                if self.nbytes <= self.memory_budget:
+                    break
+                if key == keep or pooled.busy:
+                    continue
+                del self._models[key]
+                self.evictions += 1
+                evicted += 1
+                self.logger.debug("Evicted model %r to stay within memory budget", pooled)
+        return evicted
+
+    def evict(self, model_id: str, **params: t.Any) -> bool:
+        """Drop a model from the pool; replicas checked out stay usable until released."""
+        with self._lock:
+            return self._models.pop(model_key(model_id, params), None) is not None
+
+    def clear(self) -> None:
+        """Drop every model from the pool."""
+        with self._lock:
+            self._models.clear()
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        """Snapshot of the loaded models and their usage."""
+        return {
+            "nbytes": self.nbytes,
+            "memory_budget": self.memory_budget,
+            "evictions": self.evictions,
+            "models": [
+                {
+                    "model_id": x.model_id,
+                    "replicas": len(x.replicas),
+                    "in_use": x.in_use,
+                    "checkouts": x.checkouts,
+                    "waits": x.waits,
+                    "nbytes": x.nbytes,
+                }
+                for x in list(self._models.values())
+            ],
+        }
+
+
+_POOL: t.Optional[ModelPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """The process-wide model pool, created on first use with the inference loader."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ModelPool()
+        return _POOL
+
+
+def set_model_pool(pool: t.Optional[ModelPool]) -> None:
+    """Replace the process-wide model pool, e.g. with one using a stub loader."""
+    global _POOL
+    with _POOL_LOCK:
+        _POOL = pool
@@ -0,0 +1,211 @@
+import copy
+import threading
+import time
+import typing as t
+import warnings
+
+import numpy as np
+
+from roboflow_gap.models.image_data import ImageData
+
+if t.TYPE_CHECKING:
+    import supervision as sv
+
+
+def thumbnail(image: np.ndarray, width: int = 64) -> np.ndarray:
+    """Downsample a frame to a small grayscale thumbnail for motion scoring."""
+    import cv2
+
+    height = max(int(round(image.shape[0] * width / image.shape[1])), 1)
+    small = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3 and small.shape[2] == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    elif small.ndim == 3:
+        small = small[:, :, 0]
+    return small
+
+
+def motion_score(previous: np.ndarray, current: np.ndarray, pixel_threshold: int = 25) -> float:
+    """Fraction of thumbnail pixels that changed by more than pixel_threshold."""
+    import cv2
+
+    if previous.shape != current.shape:
+        return 1.0
+    changed = cv2.absdiff(previous, current) > pixel_threshold
+    return float(np.count_nonzero(changed)) / changed.size
+
+
+def default_tracker() -> t.Any:
+    """A ByteTrack tracker, supervision's while it has one, otherwise the trackers package's.
+
+    supervision deprecated its ByteTrack in favour of the trackers package, whose ByteTrack only
+    assigns ids after minimum_consecutive_frames, so supervision's is kept while it exists and
+    its FutureWarning is silenced.
+    """
+    import supervision as sv
+
+    if hasattr(sv, "ByteTrack"):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            return sv.ByteTrack()
+    from trackers import ByteTrackTracker
+
+    return ByteTrackTracker(minimum_consecutive_frames=1)
+
+
+class GateState:
+    """Motion gate state of one source."""
+
+    def __init__(self):
+        self.reference: t.Optional[np.ndarray] = None
+        self.pending: t.Optional[ImageData] = None
+        self.detections: t.Optional["sv.Detections"] = None
+        self.tracker: t.Any = None
+        self.skipped: int = 0
+        self.refreshed: float = 0.0
+
+
+class MotionGate:
+    """Skip inference on frames that barely differ from the last analyzed frame of a source.
+
+    Each frame is downsampled to a grayscale thumbnail and compared to the thumbnail of the last
+    frame that was analyzed; if the fraction of changed pixels is below threshold, inference is
+    skipped and the previous detections are carried forward. With track, analyzed detections are
+    also run through a ByteTrack tracker per source and stored as analysis["tracked"], and those
+    are carried instead, so carried detections keep stable tracker ids. A frame is analyzed
+    anyway after max_skip skipped frames or refresh_seconds since the last analyzed one, so slow
+    changes are not missed forever. Carried detections are copies and are not run through the
+    tracker on gated frames, so its state only advances on analyzed frames. tracker_factory builds
+    a tracker per source, anything with an update_with_detections or update method taking
+    detections, and defaults to ByteTrack.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        threshold: float = 0.01,
+        pixel_threshold: int = 25,
+        max_skip: int = 30,
+        refresh_seconds: t.Optional[float] = 10.0,
+        sample_width: int = 64,
+        track: bool = True,
+        tracker_factory: t.Optional[t.Callable[[], t.Any]] = None,
+    ):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.max_skip = max_skip
+        self.refresh_seconds = refresh_seconds
+        self.sample_width = sample_width
+        self.track = track
+        self.tracker_factory = tracker_factory
+        self.analyzed: int = 0
+        self.skipped: int = 0
+        self._lock = threading.Lock()
+        self._states: t.Dict[str, GateState] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(threshold={self.threshold}, max_skip={self.max_skip}, "
+            f"analyzed={self.analyzed}, skipped={self.skipped})"
+        )
+
+    @property
+    def skip_rate(self) -> float:
+        """Fraction of gated frames whose inference was skipped."""
+        total = self.analyzed + self.skipped
+        return self.skipped / total if total else 0.0
+
+    def get_state(self, source: str) -> GateState:
+        """State of a source, created on first use."""
+        with self._lock:
+            return self._states.setdefault(source, GateState())
+
+    def split(
+        self, images: t.Sequence[ImageData]
+    ) -> t.Tuple[t.List[ImageData], t.List[t.Tuple[ImageData, t.Optional[ImageData]]]]:
+        """Split images into those to analyze and those to skip, in order.
+
+        Skipped images are paired with the analyzed image of the same batch they follow, if
+        any, so carry can copy its detections once it is analyzed.
+        """
+        analyze: t.List[ImageData] = []
+        skipped: t.List[t.Tuple[ImageData, t.Optional[ImageData]]] = []
+        now = time.monotonic()
+        for image_data in images:
+            if not image_data.has_original or image_data.error is not None:
+                analyze.append(image_data)
+                continue
+            state = self.get_state(image_data.source)
+            current = thumbnail(image_data.get_original(), width=self.sample_width)
+            score = (
+                1.0
+                if state.reference is None
+                else motion_score(state.reference, current, self.pixel_threshold)
+            )
+            image_data.context["motion_score"] = round(score, 6)
+            refresh = state.skipped >= self.max_skip or (
+                self.refresh_seconds is not None and now - state.refreshed >= self.refresh_seconds
+            )
+            if score < self.threshold and not refresh:
+                state.skipped += 1
+                self.skipped += 1
+                skipped.append((image_data, state.pending))
+                continue
+            state.reference = current
+            state.pending = image_data
+            state.skipped = 0
+            state.refreshed = now
+            self.analyzed += 1
+            analyze.append(image_data)
+        return analyze, skipped
+
+    def update(self, images: t.Sequence[ImageData]) -> None:
+        """Record the detections of analyzed images as the ones to carry forward."""
+        for image_data in images:
+            state = self.get_state(image_data.source)
+            if state.pending is image_data:
+                state.pending = None
+            detections = (image_data.analysis or {}).get("detections")
+            if image_data.error is not None or detections is None:
+                continue
+            if self.track:
+                detections = self.track_detections(state, detections)
+            state.detections = detections
+            image_data.analysis["tracked"] = detections
+
+    def track_detections(self, state: GateState, detections: "sv.Detections") -> "sv.Detections":
+        """Run detections through the source's tracker, assigning tracker ids."""
+        if state.tracker is None:
+            state.tracker = (self.tracker_factory or default_tracker)()
+        if detections.confidence is None:
+            return detections
+        update = getattr(state.tracker, "update_with_detections", None) or state.tracker.update
+        return update(detections)
+
+    def carry(self, skipped: t.Sequence[t.Tuple[ImageData, t.Optional[ImageData]]]) -> None:
+        """Give skipped images the detections of the analyzed frame they follow."""
+        for image_data, reference in skipped:
+            detections = None
+            if reference is not None:
+                detections = (reference.analysis or {}).get("tracked")
+            if detections is None:
+                detections = self.get_state(image_data.source).detections
+            image_data.context["motion_skipped"] = True
+            if detections is not None:
+                image_data.analysis = {"detections": copy.deepcopy(detections)}
+
+    def reset(self, source: t.Optional[str] = None) -> None:
+        """Forget the state of one source, or of every source."""
+        with self._lock:
+            if source is None:
+                self._states.clear()
+            else:
+                self._states.pop(source, None)
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        """Counts of analyzed and skipped frames."""
+        return {
+            "analyzed": self.analyzed,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skip_rate, 4),
+            "sources": len(self._states),
+        }
@@ -0,0 +1,229 @@
+import logging
+import threading
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.buffer_pools import BufferPool
+from roboflow_gap.utils.executors import StageExecutor
+
+ResizeMode = t.Literal["letterbox", "resize", "fit"]
+
+
+class ResizePlan(t.NamedTuple):
+    """How a frame of one resolution maps onto the model input.
+
+    A source point (x, y) lands at (x * scale_x + offset_x, y * scale_y + offset_y).
+    """
+
+    width: int
+    height: int
+    resized_width: int
+    resized_height: int
+    scale_x: float
+    scale_y: float
+    offset_x: int
+    offset_y: int
+    interpolation: int
+
+
+def build_plan(  # noqa: PLR0913
+    width: int,
+    height: int,
+    size: t.Tuple[int, int],
+    mode: ResizeMode = "letterbox",
+    upscale: bool = False,
+) -> ResizePlan:
+    """Work out the resize and padding that maps a width x height frame onto size."""
+    import cv2
+
+    target_width, target_height = size
+    if mode == "resize":
+        scale_x, scale_y = target_width / width, target_height / height
+        if not upscale:
+            scale_x, scale_y = min(scale_x, 1.0), min(scale_y, 1.0)
+    else:
+        scale_x = scale_y = min(target_width / width, target_height / height)
+        if not upscale:
+            scale_x = scale_y = min(scale_x, 1.0)
+    resized_width = max(int(round(width * scale_x)), 1)
+    resized_height = max(int(round(height * scale_y)), 1)
+
+    offset_x = offset_y = 0
+    if mode == "letterbox":
+        offset_x = (target_width - resized_width) // 2
+        offset_y = (target_height - resized_height) // 2
+    else:
+        target_width, target_height = resized_width, resized_height
+
+    shrinking = resized_width * resized_height < width * height
+    return ResizePlan(
+        width=target_width,
+        height=target_height,
+        resized_width=resized_width,
+        resized_height=resized_height,
+        scale_x=resized_width / width,
+        scale_y=resized_height / height,
+        offset_x=offset_x,
+        offset_y=offset_y,
+        interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR,
+    )
+
+
+def to_source(xyxy: np.ndarray, context: t.Dict[str, t.Any]) -> np.ndarray:
+    """Map boxes from preprocessed frame coordinates back to source image coordinates.
+
+    Undoes the scale and offset recorded by Preprocess and the reduced decode recorded by the
+    gatherers, if any.
+    """
+    scale_x, scale_y = context.get("scale", (1.0, 1.0))
+    offset_x, offset_y = context.get("offset", (0, 0))
+    decode_scale = context.get("decode_scale", 1)
+    xyxy = np.asarray(xyxy, dtype=np.float32)
+    if (scale_x, scale_y, offset_x, offset_y, decode_scale) == (1.0, 1.0, 0, 0, 1):
+        return xyxy
+    factor = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+    offset = np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+    source = (xyxy - offset) / factor * decode_scale
+    size = context.get("source_size")
+    if size is not None:
+        width, height = size
+        np.clip(source, 0, [width, height, width, height], out=source)
+    return source
+
+
+def to_frame(xyxy: np.ndarray, context: t.Dict[str, t.Any]) -> np.ndarray:
+    """Map boxes from source image coordinates onto the preprocessed or reduced decode frame.
+
+    The inverse of to_source, for drawing source coordinate detections onto the frame.
+    """
+    scale_x, scale_y = context.get("scale", (1.0, 1.0))
+    offset_x, offset_y = context.get("offset", (0, 0))
+    decode_scale = context.get("decode_scale", 1)
+    xyxy = np.asarray(xyxy, dtype=np.float32)
+    if (scale_x, scale_y, offset_x, offset_y, decode_scale) == (1.0, 1.0, 0, 0, 1):
+        return xyxy
+    factor = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+    offset = np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+    return xyxy / decode_scale * factor + offset
+
+
+class Preprocess:
+    """Resize or letterbox frames to the model input size once, early in the pipeline.
+
+    The preprocessed frame replaces ImageData.original, and the scale and offset that map source
+    coordinates onto it are recorded in the context, so Analyze can map detections back to the
+    source image. Resize parameters are computed once per source resolution and cached, and
+    frames are written into reusable buffers. Modes: letterbox keeps the aspect ratio and pads
+    to size, resize stretches to size, and fit keeps the aspect ratio without padding.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        size: t.Tuple[int, int] = (640, 640),
+        mode: ResizeMode = "letterbox",
+        upscale: bool = False,
+        pad_value: int = 114,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 0.0,
+        max_buffers: int = 32,
+        executor: t.Optional[StageExecutor] = None,
+        workers: int = 1,
+    ):
+        if mode not in ("letterbox", "resize", "fit"):
+            raise ValueError(f"Invalid mode: {mode}, valids: letterbox, resize, fit")
+        self.size = (int(size[0]), int(size[1]))
+        self.mode = mode
+        self.upscale = upscale
+        self.pad_value = pad_value
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor: StageExecutor = executor or StageExecutor(
+            name="preprocess", kind="thread", workers=workers
+        )
+        self.buffers = BufferPool(max_buffers=max_buffers)
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._lock = threading.Lock()
+        self._plans: t.Dict[t.Tuple[int, int], ResizePlan] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={self.size}, mode={self.mode!r})"
+
+    @property
+    def settings(self) -> str:
+        """The settings preprocessed frames depend on, as a compact string."""
+        return f"{self.mode}={self.size[0]}x{self.size[1]}/{int(self.upscale)}/{self.pad_value}"
+
+    def get_plan(self, width: int, height: int) -> ResizePlan:
+        """Resize parameters for a source resolution, computed once and cached."""
+        plan = self._plans.get((width, height))
+        if plan is None:
+            plan = build_plan(
+                width=width, height=height, size=self.size, mode=self.mode, upscale=self.upscale
+            )
+            with self._lock:
+                self._plans[(width, height)] = plan
+            self.logger.debug("Cached resize plan for %dx%d: %s", width, height, plan)
+        return plan
+
+    def apply(self, image: np.ndarray) -> t.Tuple[np.ndarray, ResizePlan]:
+        """Resize or letterbox a frame into a pooled buffer."""
+        import cv2
+
+        height, width = image.shape[:2]
+        plan = self.get_plan(width, height)
+        if (plan.width, plan.height) == (width, height) and plan.offset_x == plan.offset_y == 0:
+            return image, plan
+
+        frame = self.buffers.acquire((plan.height, plan.width, *image.shape[2:]), image.dtype)
+        top, left = plan.offset_y, plan.offset_x
+        bottom, right = top + plan.resized_height, left + plan.resized_width
+        if top or left or bottom < plan.height or right < plan.width:
+            # pads are refilled since buffers of this shape may come from another resolution
+            frame[:top] = self.pad_value
+            frame[bottom:] = self.pad_value
+            frame[top:bottom, :left] = self.pad_value
+            frame[top:bottom, right:] = self.pad_value
+        cv2.resize(
+            image,
+            (plan.resized_width, plan.resized_height),
+            dst=frame[top:bottom, left:right],
+            interpolation=plan.interpolation,
+        )
+        return frame, plan
+
+    def preprocess_image(self, image_data: ImageData) -> ImageData:
+        """Replace the original frame with its preprocessed version, recording the mapping."""
+        if not image_data.has_original or image_data.error is not None:
+            return image_data
+        original = image_data.get_original()
+        frame, plan = self.apply(original)
+        decode_scale = image_data.context.get("decode_scale", 1)
+        image_data.context["source_size"] = (
+            original.shape[1] * decode_scale,
+            original.shape[0] * decode_scale,
+        )
+        image_data.context["scale"] = (plan.scale_x, plan.scale_y)
+        image_data.context["offset"] = (plan.offset_x, plan.offset_y)
+        image_data.context["preprocess"] = self.settings
+        image_data.original = frame
+        # the encoded bytes would decode to the full frame, which no longer matches the mapping
+        image_data.encoded = None
+        return image_data
+
+    async def preprocess_batch(self, images: t.Sequence[ImageData]) -> t.List[ImageData]:
+        """Preprocess a batch of images on the preprocess executor."""
+        images = list(images)
+
+        def run() -> None:
+            for image_data in images:
+                try:
+                    self.preprocess_image(image_data)
+                except Exception as exc:
+                    self.logger.exception("Preprocess failed for source=%s", image_data.source)
+                    image_data.error = str(exc)
+                    image_data.error_exc = exc
+
+        await self.executor.run(run)
+        return images
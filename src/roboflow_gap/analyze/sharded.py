@@ -0,0 +1,620 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.batches import batch_stream
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.imports import has_module, optional_import
+from roboflow_gap.utils.shared_frames import FrameHandle, SharedFrameRing
+
+from .model_pool import ModelLoader, load_inference_model
+
+if t.TYPE_CHECKING:
+    import supervision as sv
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for a batch whose worker process died while analyzing it, too many times."""
+
+
+def set_memory_limit(nbytes: int) -> None:
+    """Cap the address space of this process, where the platform supports it."""
+    if not has_module("resource"):
+        return
+    resource = optional_import("resource")
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        nbytes = min(nbytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (nbytes, hard))
+
+
+def worker_main(  # noqa: PLR0913
+    worker_id: int,
+    loader: ModelLoader,
+    model_id: str,
+    params: t.Dict[str, t.Any],
+    infer_params: t.Dict[str, t.Any],
+    warmup_shape: t.Optional[t.Tuple[int, int, int]],
+    memory_limit: t.Optional[int],
+    tasks: "multiprocessing.Queue",
+    results: "multiprocessing.connection.Connection",
+) -> None:
+    """Load the model once, then analyze batches from tasks until a None task arrives.
+
+    Inference and the conversion of its results to sv.Detections both run in this process, so
+    neither holds the parent's GIL. Messages go back on the worker's own pipe rather than a
+    queue shared by every worker, whose write lock a killed worker could leave held.
+    """
+    from roboflow_gap.analyze import Analyze
+
+    if memory_limit:
+        set_memory_limit(memory_limit)
+    try:
+        model = loader(model_id, **params)
+        if warmup_shape is not None:
+            # converting the results too imports supervision before the first real batch
+            warmup = model.infer(image=np.zeros(warmup_shape, dtype=np.uint8), **infer_params)
+            [Analyze.build_detections(x) for x in warmup or [] if x]
+    except BaseException as exc:
+        error = f"{exc.__class__.__name__}: {exc}"
+        results.send(("failed", worker_id, os.getpid(), None, error))
+        return
+    results.send(("ready", worker_id, os.getpid(), None, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, frames = task
+        try:
+            images = [x.view() if isinstance(x, FrameHandle) else x for x in frames]
+            raw = list(model.infer(image=images, **infer_params) or [])
+            if len(raw) != len(images):
+                raise ValueError(f"Expected {len(images)} results from inference, got {len(raw)}.")
+            detections = [Analyze.build_detections(x)["detections"] if x else None for x in raw]
+            results.send(("result", worker_id, task_id, detections, None))
+        except Exception as exc:
+            error = f"{exc.__class__.__name__}: {exc}"
+            results.send(("result", worker_id, task_id, None, error))
+
+
+class ShardTask:
+    """One batch dispatched to a worker and the future waiting for its detections."""
+
+    def __init__(
+        self, task_id: int, frames: t.List[t.Any], future: asyncio.Future, loop: t.Any
+    ):
+        self.task_id = task_id
+        self.frames = frames
+        self.future = future
+        self.loop = loop
+        self.worker_id: t.Optional[int] = None
+        self.attempts: int = 0
+
+    def resolve(self, result: t.Any = None, error: t.Optional[BaseException] = None) -> None:
+        """Complete the future on its event loop, from any thread."""
+
+        def complete() -> None:
+            if self.future.done():
+                return
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(result)
+
+        self.loop.call_soon_threadsafe(complete)
+
+
+class ShardWorker:
+    """A worker process, its task queue and the tasks it holds."""
+
+    def __init__(
+        self,
+        worker_id: int,
+        process: t.Any,
+        tasks: "multiprocessing.Queue",
+        results: "multiprocessing.connection.Connection",
+    ):
+        self.worker_id = worker_id
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.pid: t.Optional[int] = None
+        self.ready = False
+        self.stopping = False
+        self.in_flight: t.Dict[int, ShardTask] = {}
+        self.done: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(worker_id={self.worker_id}, pid={self.pid}, "
+            f"ready={self.ready}, in_flight={len(self.in_flight)})"
+        )
+
+
+class ShardedAnalyze:
+    """Analyze batches on a pool of worker processes, each holding its own copy of the model.
+
+    Workers are spawned on first use and load the model once with loader, which must be
+    picklable, e.g. load_inference_model or load_stub_model, then warm it up. Each batch goes
+    to the worker with the fewest batches in flight, and inference plus the conversion to
+    sv.Detections run there, so throughput scales with workers instead of being bound by one
+    interpreter's GIL. A worker that dies is restarted and its batches are retried on another
+    one up to max_retries times. memory_limit caps each worker's address space in bytes, so a
+    runaway worker fails allocations instead of the node running out of memory. With a ring,
+    frames are copied into shared memory and workers map them instead of unpickling a copy.
+
+    It can stand in for Analyze in a Pipeline. Scripts using it must guard their entry point
+    with if __name__ == "__main__", as workers are started with the spawn method.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api_key: str,
+        model_id: str,
+        workers: t.Optional[int] = None,
+        loader: ModelLoader = load_inference_model,
+        loader_params: t.Optional[t.Dict[str, t.Any]] = None,
+        confidence: float = 0.5,
+        iou_threshold: float = 0.5,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_in_flight: t.Optional[int] = None,
+        memory_limit: t.Optional[int] = None,
+        max_retries: int = 1,
+        max_restarts: int = 16,
+        warmup_shape: t.Optional[t.Tuple[int, int, int]] = (640, 640, 3),
+        ring: t.Optional[SharedFrameRing] = None,
+        start_timeout: float = 300.0,
+    ):
+        self.api_key = api_key
+        self.model_id = model_id
+        self.workers = max(int(workers or os.cpu_count() or 1), 1)
+        self.loader = loader
+        self.loader_params = dict(loader_params or {})
+        self.confidence = confidence
+        self.iou_threshold = iou_threshold
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_in_flight = max(int(max_in_flight or self.workers * 2), 1)
+        self.memory_limit = memory_limit
+        self.max_retries = max_retries
+        self.max_restarts = max_restarts
+        self.warmup_shape = warmup_shape
+        self.ring = ring
+        self.start_timeout = start_timeout
+        self.restarts: int = 0
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._workers: t.Dict[int, ShardWorker] = {}
+        self._task_ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._started = False
+        self._threads: t.List[threading.Thread] = []
+        self._closing = threading.Event()
+        self._load_error: t.Optional[str] = None
+        self._semaphore: t.Optional[asyncio.Semaphore] = None
+        # held for the whole of start, so concurrent callers wait for the workers to be ready
+        self._start_guard = threading.Lock()
+        self._start_lock: t.Optional[asyncio.Lock] = None
+        self._running = False
+        # batches waiting for a worker to finish loading the model
+        self._waiting: t.List[ShardTask] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(model_id={self.model_id!r}, workers={self.workers}, "
+            f"alive={self.alive}, restarts={self.restarts})"
+        )
+
+    def __enter__(self) -> "ShardedAnalyze":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: t.Any) -> None:
+        self.shutdown()
+
+    @property
+    def started(self) -> bool:
+        """If the worker processes were started."""
+        return self._started
+
+    @property
+    def running(self) -> bool:
+        """If the workers were started and every one loaded the model."""
+        return self._running
+
+    @property
+    def alive(self) -> int:
+        """Number of workers that loaded the model and are running."""
+        return sum(1 for x in list(self._workers.values()) if x.ready and x.process.is_alive())
+
+    def start(self) -> None:
+        """Spawn the workers and wait until every one has loaded the model."""
+        with self._start_guard:
+            if self._running:
+                return
+            self._start()
+            self._running = True
+
+    def _start(self) -> None:
+        """Spawn the workers and wait for them, with the start guard held."""
+        with self._lock:
+            self._closing.clear()
+            self._load_error = None
+            self._started = True
+            for _ in range(self.workers):
+                self._spawn()
+        self._threads = [
+            threading.Thread(target=self._collect, name="gap-shard-results", daemon=True),
+            threading.Thread(target=self._monitor, name="gap-shard-monitor", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        deadline = time.monotonic() + self.start_timeout
+        with self._ready:
+            while self.alive < self.workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._load_error is not None:
+                    break
+                self._ready.wait(timeout=remaining)
+        if self.alive < self.workers:
+            alive, error = self.alive, self._load_error
+            self.shutdown()
+            raise RuntimeError(
+                f"Only {alive} of {self.workers} workers loaded model_id={self.model_id}, "
+                f"error={error}"
+            )
+        self.logger.debug("Started %r", self)
+
+    def _spawn(self) -> ShardWorker:
+        """Start one worker process, with the lock held."""
+        worker_id = next(self._worker_ids)
+        tasks = self._context.Queue()
+        results, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=worker_main,
+            name=f"gap-shard-{worker_id}",
+            args=(
+                worker_id,
+                self.loader,
+                self.model_id,
+                {"api_key": self.api_key, **self.loader_params},
+                {"confidence": self.confidence, "iou_threshold": self.iou_threshold},
+                self.warmup_shape,
+                self.memory_limit,
+                tasks,
+                sender,
+            ),
+            daemon=True,
+        )
+        process.start()
+        # only the worker writes to its pipe, so reading it ends with EOFError once it exits
+        sender.close()
+        worker = ShardWorker(worker_id=worker_id, process=process, tasks=tasks, results=results)
+        self._workers[worker_id] = worker
+        return worker
+
+    def _collect(self) -> None:
+        """Read worker messages, resolving the futures of finished batches."""
+        while not self._closing.is_set():
+            with self._lock:
+                pipes = [x.results for x in self._workers.values() if not x.results.closed]
+            for pipe in multiprocessing.connection.wait(pipes, timeout=0.2):
+                try:
+                    message = pipe.recv()
+                except (EOFError, OSError):
+                    # the worker exited, its batches are retried once the monitor notices
+                    pipe.close()
+                    continue
+                self._handle_message(*message)
+
+    def _handle_message(
+        self, kind: str, worker_id: int, key: t.Any, payload: t.Any, error: t.Optional[str]
+    ) -> None:
+        """Record a worker as ready, or resolve the future of the batch it finished."""
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if kind == "ready" and worker is not None:
+                worker.pid, worker.ready = key, True
+                self._ready.notify_all()
+                waiting, self._waiting = self._waiting, []
+                for task in waiting:
+                    self._send(worker, task)
+                return
+            if kind == "failed":
+                # the worker exits next, and is restarted like a crashed one once started
+                self.logger.error("Worker %s failed to load the model: %s", worker_id, error)
+                self._load_error = error
+                self._ready.notify_all()
+                return
+            task = worker.in_flight.pop(key, None) if worker is not None else None
+            if worker is not None:
+                worker.done += 1
+        if task is None:
+            return
+        if error is not None:
+            task.resolve(error=RuntimeError(error))
+        else:
+            task.resolve(result=payload)
+
+    def _monitor(self) -> None:
+        """Restart workers that died, retrying or failing the batches they held."""
+        while not self._closing.is_set():
+            with self._lock:
+                sentinels = {x.process.sentinel: x for x in self._workers.values()}
+            dead = multiprocessing.connection.wait(list(sentinels), timeout=0.2)
+            for sentinel in dead:
+                self._handle_exit(sentinels[sentinel])
+
+    def _handle_exit(self, worker: ShardWorker) -> None:
+        """Replace a worker that exited and redistribute its batches.
+
+        Workers that exit before loading the model are not restarted, since their replacement
+        would most likely fail the same way. Batches are only sent to workers that loaded the
+        model, so an exit while holding batches is always a crash.
+        """
+        # the sentinel fires just before the exit code is set
+        worker.process.join(timeout=1.0)
+        exitcode = worker.process.exitcode
+        # nothing reads the queue anymore, so batches still buffered for it must not block exit
+        worker.tasks.cancel_join_thread()
+        with self._lock:
+            if self._workers.get(worker.worker_id) is not worker:
+                return
+            del self._workers[worker.worker_id]
+            tasks = list(worker.in_flight.values())
+            if worker.stopping or self._closing.is_set():
+                return
+            if not worker.ready and not tasks:
+                self._load_error = self._load_error or f"worker exited with code {exitcode}"
+                self._ready.notify_all()
+                self.logger.error(
+                    "Worker %s exited with code %s before loading the model, not restarting",
+                    worker.worker_id,
+                    exitcode,
+                )
+            elif self.restarts >= self.max_restarts:
+                self.logger.error(
+                    "Worker %s exited with code %s, not restarting after %d restarts",
+                    worker.worker_id,
+                    exitcode,
+                    self.restarts,
+                )
+            else:
+                self.restarts += 1
+                replacement = self._spawn()
+                self.logger.warning(
+                    "Worker %s exited with code %s holding %d batches, restarted as worker %s",
+                    worker.worker_id,
+                    exitcode,
+                    len(tasks),
+                    replacement.worker_id,
+                )
+            if not self._workers:
+                # nothing is left to load the model, so batches waiting for one fail below
+                tasks.extend(self._waiting)
+                self._waiting = []
+        for task in tasks:
+            task.attempts += 1
+            if task.attempts > self.max_retries:
+                task.resolve(
+                    error=WorkerCrashedError(
+                        f"Worker exited with code {exitcode} while analyzing the batch"
+                    )
+                )
+            else:
+                self._dispatch(task)
+
+    def _dispatch(self, task: ShardTask) -> None:
+        """Send a batch to the ready worker with the fewest batches in flight.
+
+        While every worker is still loading the model, such as right after a restart, the
+        batch waits for the first one to be ready.
+        """
+        with self._lock:
+            workers = [x for x in self._workers.values() if not x.stopping]
+            if not workers:
+                task.resolve(error=WorkerCrashedError("No workers left to analyze the batch"))
+                return
+            ready = [x for x in workers if x.ready]
+            if not ready:
+                self._waiting.append(task)
+                return
+            self._send(min(ready, key=lambda x: len(x.in_flight)), task)
+
+    def _send(self, worker: ShardWorker, task: ShardTask) -> None:
+        """Put a batch on a worker's queue, with the lock held."""
+        task.worker_id = worker.worker_id
+        worker.in_flight[task.task_id] = task
+        worker.tasks.put((task.task_id, task.frames))
+
+    async def infer(self, frames: t.List[t.Any]) -> t.List[t.Optional["sv.Detections"]]:
+        """Analyze frames or frame handles on a worker, returning detections per frame."""
+        if not self._running:
+            if self._start_lock is None:
+                self._start_lock = asyncio.Lock()
+            # concurrent batches wait for one start instead of dispatching to loading workers
+            async with self._start_lock:
+                if not self._running:
+                    await asyncio.to_thread(self.start)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            task = ShardTask(
+                task_id=next(self._task_ids), frames=frames, future=loop.create_future(), loop=loop
+            )
+            self._dispatch(task)
+            return await task.future
+
+    async def analyze_image(self, image_data: ImageData) -> ImageData:
+        """Analyzes an image and updates the ImageData instance with analysis results."""
+        await self.analyze_batch([image_data])
+        return image_data
+
+    async def analyze_batch(self, images: t.Sequence[ImageData]) -> t.List[ImageData]:
+        """Analyzes a batch of images on one worker process."""
+        from roboflow_gap.analyze import Analyze
+
+        images = list(images)
+        ready = [x for x in images if x.has_original and x.error is None]
+        if ready:
+            shared: t.List[FrameHandle] = []
+            try:
+                frames = await asyncio.to_thread(self.build_frames, ready, shared)
+                results = await self.infer(frames)
+            except Exception as e:
+                self.logger.exception("Inference failed for batch of %d images", len(ready))
+                for image_data in ready:
+                    image_data.error = str(e)
+                    image_data.error_exc = e
+                results = []
+            finally:
+                for handle in shared:
+                    self.ring.release(handle)
+
+            for image_data, detections in zip(ready, results):
+                if detections is None:
+                    image_data.error = "No results from inference."
+                    continue
+                image_data.analysis = {"detections": detections}
+                Analyze.map_to_source(image_data)
+
+        date_done, done = get_now(), get_monotonic()
+        for image_data in images:
+            image_data.date_analyze_done = date_done
+            image_data.mark("analyze", at=done)
+        return images
+
+    def build_frames(self, images: t.Sequence[ImageData], shared: t.List[FrameHandle]) -> t.List:
+        """Frames to send to a worker: handles where frames are or can be put in shared memory.
+
+        Handles of frames this call put into the ring are appended to shared, to be released
+        once the batch is analyzed.
+        """
+        frames = []
+        for image_data in images:
+            if image_data.handle is not None and not image_data.is_decoded:
+                frames.append(image_data.handle)
+            elif self.ring is not None:
+                handle = self.ring.put(image_data.get_original())
+                shared.append(handle)
+                frames.append(handle)
+            else:
+                frames.append(image_data.get_original())
+        return frames
+
+    async def analyze_stream(
+        self,
+        images: t.AsyncIterable[ImageData],
+        ordered: bool = True,
+        max_batch_size: t.Optional[int] = None,
+        max_wait_ms: t.Optional[float] = None,
+    ) -> t.AsyncIterator[ImageData]:
+        """Analyzes a stream of images with up to max_in_flight batches on the workers at once.
+
+        Images are yielded in input order if ordered, otherwise as their batches complete.
+        """
+        pending: t.Set[asyncio.Task] = set()
+        order: t.List[asyncio.Task] = []
+        batches = batch_stream(
+            images,
+            max_batch_size=max_batch_size or self.max_batch_size,
+            max_wait_ms=self.max_wait_ms if max_wait_ms is None else max_wait_ms,
+        )
+        try:
+            async for batch in batches:
+                task = asyncio.ensure_future(self.analyze_batch(batch))
+                pending.add(task)
+                order.append(task)
+                while len(pending) >= self.max_in_flight:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not ordered:
+                        for finished in done:
+                            order.remove(finished)
+                            for image_data in finished.result():
+                                yield image_data
+                while ordered and order and order[0].done():
+                    for image_data in order.pop(0).result():
+                        yield image_data
+            if ordered:
+                for task in order:
+                    for image_data in await task:
+                        yield image_data
+            else:
+                for finished in asyncio.as_completed(pending):
+                    for image_data in await finished:
+                        yield image_data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the workers, failing batches still in flight."""
+        with self._lock:
+            if not self.started:
+                return
+            self._closing.set()
+            workers = list(self._workers.values())
+            self._workers.clear()
+            for worker in workers:
+                worker.stopping = True
+                try:
+                    worker.tasks.put(None)
+                except (OSError, ValueError):
+                    pass
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        for worker in workers:
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(timeout=timeout)
+                worker.tasks.cancel_join_thread()
+            for task in worker.in_flight.values():
+                task.resolve(error=WorkerCrashedError("Analyzer shut down"))
+            worker.tasks.close()
+            worker.results.close()
+        with self._lock:
+            waiting, self._waiting = self._waiting, []
+        for task in waiting:
+            task.resolve(error=WorkerCrashedError("Analyzer shut down"))
+        self._started = False
+        self._running = False
+        self.logger.debug("Shut down %r", self)
+
+    async def close(self) -> None:
+        """Stop the workers without blocking the event loop."""
+        await asyncio.to_thread(self.shutdown)
+
+    def stats(self) -> t.Dict[str, t.Any]:
+        """Per-worker batch counts and restarts."""
+        return {
+            "restarts": self.restarts,
+            "workers": [
+                {
+                    "worker_id": x.worker_id,
+                    "pid": x.pid,
+                    "ready": x.ready,
+                    "in_flight": len(x.in_flight),
+                    "done": x.done,
+                }
+                for x in list(self._workers.values())
+            ],
+        }
@@ -0,0 +1,68 @@
+import time
+import typing as t
+
+
+class StubModel:
+    """Deterministic local stand-in for an inference model.
+
+    Returns the same predictions for the same frame size on every call, without network access
+    or model weights, so batching and pipeline behaviour can be exercised offline.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        per_image_latency: float = 0.0,
+        num_detections: int = 1,
+        class_names: t.Sequence[str] = ("object",),
+    ):
+        self.latency = latency
+        self.per_image_latency = per_image_latency
+        self.num_detections = num_detections
+        self.class_names = list(class_names)
+        self.infer_calls: int = 0
+        self.images_seen: int = 0
+
+    def infer(
+        self,
+        image: t.Any,
+        confidence: float = 0.5,
+        iou_threshold: float = 0.5,
+        **kwargs: t.Any,
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """Return one inference result per image, mirroring the roboflow response format."""
+        images = image if isinstance(image, list) else [image]
+        self.infer_calls += 1
+        self.images_seen += len(images)
+
+        delay = self.latency + self.per_image_latency * len(images)
+        if delay > 0:
+            time.sleep(delay)
+
+        return [self.predict(image=x, confidence=confidence) for x in images]
+
+    def predict(self, image: t.Any, confidence: float = 0.5) -> t.Dict[str, t.Any]:
+        """Build a deterministic result for a single image."""
+        shape = getattr(image, "shape", None) or (0, 0)
+        height, width = int(shape[0]), int(shape[1])
+        predictions = []
+        for index in range(self.num_detections):
+            score = round(0.95 - 0.05 * index, 4)
+            if score < confidence:
+                break
+            box_width = width / (2 + index)
+            box_height = height / (2 + index)
+            class_id = index % len(self.class_names)
+            predictions.append(
+                {
+                    "x": box_width / 2 + index,
+                    "y": box_height / 2 + index,
+                    "width": box_width,
+                    "height": box_height,
+                    "confidence": score,
+                    "class": self.class_names[class_id],
+                    "class_id": class_id,
+                    "detection_id": f"stub-{index}",
+                }
+            )
+        return {"image": {"width": width, "height": height}, "predictions": predictions}
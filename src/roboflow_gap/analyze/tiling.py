@@ -0,0 +1,218 @@
+import asyncio
+import functools
+import threading
+import time
+import typing as t
+
+import numpy as np
+
+if t.TYPE_CHECKING:
+    import supervision as sv
+
+MergeMode = t.Literal["nms", "nmm", "none"]
+
+
+@functools.lru_cache(maxsize=64)
+def tile_boxes(
+    width: int, height: int, tile_size: t.Tuple[int, int], overlap: t.Tuple[int, int]
+) -> np.ndarray:
+    """Boxes (x1, y1, x2, y2) of overlapping tiles covering a width x height frame.
+
+    Tiles step by tile size minus overlap, and the last row and column are shifted back to end
+    at the frame edge, so every tile has the full tile size unless the frame is smaller.
+    """
+
+    def starts(length: int, size: int, step: int) -> t.List[int]:
+        if length <= size:
+            return [0]
+        values = list(range(0, length - size, step))
+        values.append(length - size)
+        return values
+
+    tile_width, tile_height = tile_size
+    step_x = max(tile_width - overlap[0], 1)
+    step_y = max(tile_height - overlap[1], 1)
+    boxes = [
+        (x, y, min(x + tile_width, width), min(y + tile_height, height))
+        for y in starts(height, tile_height, step_y)
+        for x in starts(width, tile_width, step_x)
+    ]
+    result = np.array(boxes, dtype=np.int32)
+    result.setflags(write=False)
+    return result
+
+
+class TileTimings:
+    """Cumulative time spent slicing, inferring and merging tiled images."""
+
+    def __init__(self):
+        self.images: int = 0
+        self.tiles: int = 0
+        self.slice_seconds: float = 0.0
+        self.inference_seconds: float = 0.0
+        self.merge_seconds: float = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()})"
+
+    def add(self, images: int, tiles: int, slicing: float, inference: float, merge: float) -> None:
+        """Add the counts and durations of one tiled batch."""
+        with self._lock:
+            self.images += images
+            self.tiles += tiles
+            self.slice_seconds += slicing
+            self.inference_seconds += inference
+            self.merge_seconds += merge
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """Snapshot of the counters, durations in milliseconds."""
+        return {
+            "images": self.images,
+            "tiles": self.tiles,
+            "slice_ms": round(self.slice_seconds * 1000, 3),
+            "inference_ms": round(self.inference_seconds * 1000, 3),
+            "merge_ms": round(self.merge_seconds * 1000, 3),
+        }
+
+
+class Tiler:
+    """Slice high resolution frames into overlapping tiles and merge the tile detections.
+
+    Small objects survive because each tile goes to the model at close to native resolution
+    instead of the whole frame being downscaled. Frames no larger than a tile are passed through
+    as a single tile. Tiles of every frame in a batch are inferred together in chunks of
+    batch_size, which run concurrently when the analyzer has more than one inference worker.
+    Tile detections are moved into frame coordinates and merged with non-max suppression (nms),
+    non-max merging (nmm), or not at all (none). Tiles are views into the frame, not copies.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        tile_size: t.Tuple[int, int] = (640, 640),
+        overlap: t.Union[float, t.Tuple[int, int]] = 0.2,
+        merge: MergeMode = "nms",
+        iou_threshold: float = 0.5,
+        class_agnostic: bool = False,
+        batch_size: int = 8,
+    ):
+        if merge not in ("nms", "nmm", "none"):
+            raise ValueError(f"Invalid merge: {merge}, valids: nms, nmm, none")
+        self.tile_size = (int(tile_size[0]), int(tile_size[1]))
+        if isinstance(overlap, (int, float)) and not isinstance(overlap, bool):
+            if not 0 <= overlap < 1:
+                raise ValueError(f"Overlap ratio must be in [0, 1), got {overlap}")
+            overlap = (int(self.tile_size[0] * overlap), int(self.tile_size[1] * overlap))
+        self.overlap = (int(overlap[0]), int(overlap[1]))
+        self.merge = merge
+        self.iou_threshold = iou_threshold
+        self.class_agnostic = class_agnostic
+        self.batch_size = max(int(batch_size), 1)
+        self.timings = TileTimings()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(tile_size={self.tile_size}, overlap={self.overlap}, "
+            f"merge={self.merge!r})"
+        )
+
+    @property
+    def settings(self) -> str:
+        """The settings tiled detections depend on, as a compact string."""
+        return (
+            f"tile={self.tile_size[0]}x{self.tile_size[1]}/{self.overlap[0]}x{self.overlap[1]}"
+            f"/{self.merge}/{self.iou_threshold:g}/{int(self.class_agnostic)}"
+        )
+
+    def get_boxes(self, image: np.ndarray) -> np.ndarray:
+        """Tile boxes for a frame, cached per resolution."""
+        height, width = image.shape[:2]
+        return tile_boxes(width, height, self.tile_size, self.overlap)
+
+    def slice(self, images: t.Sequence[np.ndarray]) -> t.Tuple[t.List[np.ndarray], t.List[int]]:
+        """Tiles of every frame in order, and the number of tiles of each frame."""
+        tiles: t.List[np.ndarray] = []
+        counts: t.List[int] = []
+        for image in images:
+            boxes = self.get_boxes(image)
+            tiles.extend(image[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes)
+            counts.append(len(boxes))
+        return tiles, counts
+
+    def chunks(self, tiles: t.Sequence[np.ndarray]) -> t.List[t.List[np.ndarray]]:
+        """Tiles split into inference batches of at most batch_size."""
+        return [
+            list(tiles[index : index + self.batch_size])
+            for index in range(0, len(tiles), self.batch_size)
+        ]
+
+    def merge_tiles(
+        self, image: np.ndarray, detections: t.Sequence["sv.Detections"]
+    ) -> "sv.Detections":
+        """Move the detections of each tile of a frame into frame coordinates and merge them."""
+        import supervision as sv
+        from supervision.detection.tools.inference_slicer import move_detections
+
+        height, width = image.shape[:2]
+        boxes = self.get_boxes(image)
+        moved = [
+            move_detections(x, offset=np.array(box[:2]), resolution_wh=(width, height))
+            if box[0] or box[1]
+            else x
+            for x, box in zip(detections, boxes)
+            if len(x)
+        ]
+        merged = sv.Detections.merge(moved) if moved else sv.Detections.empty()
+        if len(boxes) == 1 or len(merged) < 2 or self.merge == "none":
+            return merged
+        if self.merge == "nmm":
+            return merged.with_nmm(
+                threshold=self.iou_threshold, class_agnostic=self.class_agnostic
+            )
+        return merged.with_nms(threshold=self.iou_threshold, class_agnostic=self.class_agnostic)
+
+    async def run(
+        self,
+        images: t.Sequence[np.ndarray],
+        infer: t.Callable[[t.List[np.ndarray]], t.Awaitable[t.List[t.Any]]],
+        to_detections: t.Callable[[t.Any], "sv.Detections"],
+    ) -> t.Tuple[t.List["sv.Detections"], t.Dict[str, float]]:
+        """Run tiled inference on frames, returning merged detections per frame and timings.
+
+        infer runs a model on a list of tiles and to_detections turns one result into
+        sv.Detections. Timings are the milliseconds spent slicing, inferring and merging.
+        """
+        started = time.perf_counter()
+        tiles, counts = self.slice(images)
+        sliced = time.perf_counter()
+        results = [
+            result
+            for chunk in await asyncio.gather(*(infer(x) for x in self.chunks(tiles)))
+            for result in (chunk or [])
+        ]
+        inferred = time.perf_counter()
+        if len(results) != len(tiles):
+            raise ValueError(f"Expected {len(tiles)} results from inference, got {len(results)}.")
+
+        merged = []
+        index = 0
+        for image, count in zip(images, counts):
+            detections = [to_detections(x) for x in results[index : index + count]]
+            merged.append(self.merge_tiles(image, detections))
+            index += count
+        done = time.perf_counter()
+
+        self.timings.add(
+            images=len(images),
+            tiles=len(tiles),
+            slicing=sliced - started,
+            inference=inferred - sliced,
+            merge=done - inferred,
+        )
+        timings = {
+            "tiles": len(tiles),
+            "slice_ms": round((sliced - started) * 1000, 3),
+            "inference_ms": round((inferred - sliced) * 1000, 3),
+            "merge_ms": round((done - inferred) * 1000, 3),
+        }
+        return merged, timings
@@ -0,0 +1,21 @@
+from .bench import (
+    SCENARIOS,
+    BenchConfig,
+    check_budgets,
+    compare,
+    format_results,
+    load_results,
+    main,
+    run_benchmarks,
+)
+
+__all__ = [
+    "SCENARIOS",
+    "BenchConfig",
+    "check_budgets",
+    "compare",
+    "format_results",
+    "load_results",
+    "main",
+    "run_benchmarks",
+]
@@ -0,0 +1,400 @@
+import asyncio
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+
+import cv2
+import numpy as np
+
+from roboflow_gap.analyze import Analyze, ShardedAnalyze, StubModel, load_stub_model
+from roboflow_gap.gather.gather_from_directory import GatherFromDirectory
+from roboflow_gap.gather.gather_from_files import GatherFromFile
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.pipeline import Pipeline
+from roboflow_gap.process.results_sink import ResultsSink
+from roboflow_gap.utils.dates import get_now
+from roboflow_gap.utils.images import decode_image_bytes, read_image_bytes
+from roboflow_gap.utils.paths import pathify
+
+BENCH_VERSION: int = 1
+
+# Modules that importing the package, or its light commands, must not pull in.
+HEAVY_MODULES: t.Tuple[str, ...] = ("cv2", "inference", "supervision", "torch", "pyarrow", "av")
+
+IMPORT_SCRIPT: str = """
+import json, sys, time
+started = time.perf_counter()
+import roboflow_gap
+import roboflow_gap.gather
+import roboflow_gap.utils.tools
+roboflow_gap.utils.tools.get_subcls_method_args(roboflow_gap.gather.GatherBase, "run")
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "heavy": [x for x in HEAVY if x in sys.modules]}))
+"""
+
+
+class BenchConfig:
+    """Settings shared by every benchmark scenario."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        images: int = 200,
+        width: int = 640,
+        height: int = 480,
+        latency_ms: float = 5.0,
+        per_image_latency_ms: float = 2.0,
+        batch_size: int = 8,
+        seed: int = 0,
+        import_runs: int = 5,
+        import_budget_ms: float = 1000.0,
+        shard_workers: int = 4,
+    ):
+        self.images = images
+        self.width = width
+        self.height = height
+        self.latency_ms = latency_ms
+        self.per_image_latency_ms = per_image_latency_ms
+        self.batch_size = batch_size
+        self.seed = seed
+        self.import_runs = import_runs
+        self.import_budget_ms = import_budget_ms
+        self.shard_workers = shard_workers
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """Settings as a dict, stored with the results."""
+        return dict(vars(self))
+
+    def build_model(self) -> StubModel:
+        """Deterministic stand-in for the inference model."""
+        return StubModel(
+            latency=self.latency_ms / 1000,
+            per_image_latency=self.per_image_latency_ms / 1000,
+            num_detections=5,
+        )
+
+    def build_sharded(self) -> ShardedAnalyze:
+        """Sharded analyzer whose workers each load the stand-in model."""
+        return ShardedAnalyze(
+            api_key="",
+            model_id="bench/1",
+            workers=self.shard_workers,
+            loader=load_stub_model,
+            loader_params={
+                "latency": self.latency_ms / 1000,
+                "per_image_latency": self.per_image_latency_ms / 1000,
+                "num_detections": 5,
+            },
+            max_batch_size=self.batch_size,
+            max_wait_ms=5.0,
+        )
+
+    def build_analyze(self, max_batch_size: int = 1) -> Analyze:
+        """Analyzer around the stand-in model."""
+        return Analyze(
+            api_key="",
+            model_id="bench/1",
+            model=self.build_model(),
+            max_batch_size=max_batch_size,
+            max_wait_ms=5.0,
+        )
+
+
+def summarize(name: str, latencies: t.Sequence[float], seconds: float) -> t.Dict[str, t.Any]:
+    """Latency percentiles and throughput for one scenario."""
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    items = len(values)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if items else (0.0, 0.0, 0.0)
+    return {
+        "name": name,
+        "items": items,
+        "seconds": round(seconds, 6),
+        "items_per_s": round(items / seconds, 3) if seconds > 0 else 0.0,
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+    }
+
+
+def write_images(directory: pathlib.Path, config: BenchConfig) -> t.List[pathlib.Path]:
+    """Write deterministic synthetic JPEGs to benchmark against."""
+    rng = np.random.default_rng(config.seed)
+    base = rng.integers(0, 255, size=(config.height, config.width, 3), dtype=np.uint8)
+    paths = []
+    for index in range(config.images):
+        image = np.roll(base, shift=index * 7, axis=1)
+        path = directory / f"image_{index:06d}.jpg"
+        cv2.imwrite(str(path), image)
+        paths.append(path)
+    return paths
+
+
+async def bench_gather_files(paths: t.List[pathlib.Path], config: BenchConfig) -> t.Dict:
+    """Throughput of GatherFromFile over explicit paths."""
+    gatherer = GatherFromFile(paths=paths)
+    latencies = []
+    started = last = time.perf_counter()
+    async for _ in gatherer.run():
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+    return summarize("gather_files", latencies, time.perf_counter() - started)
+
+
+async def bench_gather_directory(directory: pathlib.Path, config: BenchConfig) -> t.Dict:
+    """Throughput of GatherFromDirectory with decode prefetch."""
+    gatherer = GatherFromDirectory(directories=directory, ordered=False)
+    latencies = []
+    started = last = time.perf_counter()
+    async for _ in gatherer.run():
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+    return summarize("gather_directory", latencies, time.perf_counter() - started)
+
+
+async def bench_decode(paths: t.List[pathlib.Path], config: BenchConfig) -> t.Dict:
+    """Decode throughput of encoded images already in memory, on one thread."""
+    encoded = [read_image_bytes(x) for x in paths]
+    latencies = []
+    started = time.perf_counter()
+    for data in encoded:
+        begin = time.perf_counter()
+        decode_image_bytes(data)
+        latencies.append(time.perf_counter() - begin)
+    return summarize("decode", latencies, time.perf_counter() - started)
+
+
+async def load_images(paths: t.List[pathlib.Path]) -> t.List[t.Any]:
+    """Gather every image up front so analyze scenarios exclude decode time."""
+    return [x async for x in GatherFromFile(paths=paths).run()]
+
+
+async def bench_analyze_latency(paths: t.List[pathlib.Path], config: BenchConfig) -> t.Dict:
+    """Per-image latency of Analyze.analyze_image, one inference call per image."""
+    images = await load_images(paths)
+    analyze = config.build_analyze()
+    latencies = []
+    started = time.perf_counter()
+    for image_data in images:
+        begin = time.perf_counter()
+        await analyze.analyze_image(image_data)
+        latencies.append(time.perf_counter() - begin)
+    return summarize("analyze_latency", latencies, time.perf_counter() - started)
+
+
+async def bench_analyze_stream(
+    paths: t.List[pathlib.Path], config: BenchConfig, batch_size: int
+) -> t.Dict:
+    """Throughput of Analyze.analyze_stream at a given micro-batch size."""
+    images = await load_images(paths)
+    analyze = config.build_analyze(max_batch_size=batch_size)
+    submitted: t.Dict[int, float] = {}
+
+    async def source() -> t.AsyncIterator[t.Any]:
+        for image_data in images:
+            submitted[id(image_data)] = time.perf_counter()
+            yield image_data
+
+    latencies = []
+    started = time.perf_counter()
+    async for image_data in analyze.analyze_stream(source()):
+        latencies.append(time.perf_counter() - submitted[id(image_data)])
+    name = "analyze_unbatched" if batch_size == 1 else "analyze_batched"
+    return summarize(name, latencies, time.perf_counter() - started)
+
+
+async def bench_analyze_sharded(paths: t.List[pathlib.Path], config: BenchConfig) -> t.Dict:
+    """Throughput of ShardedAnalyze.analyze_stream, worker startup excluded."""
+    images = await load_images(paths)
+    analyze = config.build_sharded()
+    await asyncio.to_thread(analyze.start)
+    submitted: t.Dict[int, float] = {}
+
+    async def source() -> t.AsyncIterator[t.Any]:
+        for image_data in images:
+            submitted[id(image_data)] = time.perf_counter()
+            yield image_data
+
+    latencies = []
+    started = time.perf_counter()
+    try:
+        async for image_data in analyze.analyze_stream(source()):
+            latencies.append(time.perf_counter() - submitted[id(image_data)])
+    finally:
+        await analyze.close()
+    summary = summarize("analyze_sharded", latencies, time.perf_counter() - started)
+    summary["workers"] = config.shard_workers
+    return summary
+
+
+async def bench_pipeline(directory: pathlib.Path, config: BenchConfig) -> t.Dict:
+    """End to end gather, batched analyze and results sink run, latency from gather to done."""
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = Pipeline(
+            gatherer=GatherFromDirectory(directories=directory),
+            analyzer=config.build_analyze(max_batch_size=config.batch_size),
+            processors=[ResultsSink(path=pathlib.Path(tmp) / "results.jsonl")],
+            release_after_analyze=True,
+        )
+        latencies = []
+        started = time.perf_counter()
+        async for image_data in pipeline.stream():
+            latencies.append((get_now() - image_data.date_started).total_seconds())
+        return summarize("pipeline", latencies, time.perf_counter() - started)
+
+
+async def bench_import(config: BenchConfig) -> t.Dict:
+    """Time importing the package and listing gatherers, each in a fresh interpreter."""
+    script = f"HEAVY = {HEAVY_MODULES!r}\n{IMPORT_SCRIPT}"
+    latencies, heavy = [], set()
+    started = time.perf_counter()
+    for _ in range(max(config.import_runs, 1)):
+        output = await asyncio.to_thread(
+            subprocess.run,
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        latencies.append(result["seconds"])
+        heavy.update(result["heavy"])
+    summary = summarize("import", latencies, time.perf_counter() - started)
+    summary["heavy_modules"] = sorted(heavy)
+    return summary
+
+
+SCENARIOS: t.List[str] = [
+    "import",
+    "gather_files",
+    "gather_directory",
+    "decode",
+    "analyze_latency",
+    "analyze_unbatched",
+    "analyze_batched",
+    "analyze_sharded",
+    "pipeline",
+]
+
+
+async def run_benchmarks(
+    config: t.Optional[BenchConfig] = None, scenarios: t.Optional[t.Sequence[str]] = None
+) -> t.Dict[str, t.Any]:
+    """Run benchmark scenarios against synthetic images and a stand-in model."""
+    config = config or BenchConfig()
+    scenarios = list(scenarios or SCENARIOS)
+    invalid = [x for x in scenarios if x not in SCENARIOS]
+    if invalid:
+        raise ValueError(f"Invalid scenarios: {invalid}, valids: {SCENARIOS}")
+
+    results: t.Dict[str, t.Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = pathlib.Path(tmp)
+        paths = write_images(directory, config)
+        runs: t.Dict[str, t.Callable[[], t.Awaitable[t.Dict]]] = {
+            "import": lambda: bench_import(config),
+            "gather_files": lambda: bench_gather_files(paths, config),
+            "gather_directory": lambda: bench_gather_directory(directory, config),
+            "decode": lambda: bench_decode(paths, config),
+            "analyze_latency": lambda: bench_analyze_latency(paths, config),
+            "analyze_unbatched": lambda: bench_analyze_stream(paths, config, 1),
+            "analyze_batched": lambda: bench_analyze_stream(paths, config, config.batch_size),
+            "analyze_sharded": lambda: bench_analyze_sharded(paths, config),
+            "pipeline": lambda: bench_pipeline(directory, config),
+        }
+        for name in scenarios:
+            results[name] = await runs[name]()
+
+    return {
+        "version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config.to_dict(),
+        "scenarios": results,
+    }
+
+
+def compare(
+    results: t.Dict[str, t.Any], baseline: t.Dict[str, t.Any], tolerance: float = 0.1
+) -> t.List[str]:
+    """List regressions of results against a baseline.
+
+    A scenario regresses if its throughput dropped, or its p95 latency rose, by more than
+    tolerance, as a fraction of the baseline value.
+    """
+    regressions = []
+    for name, current in results.get("scenarios", {}).items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["items_per_s"] and current["items_per_s"] < previous["items_per_s"] * (
+            1 - tolerance
+        ):
+            regressions.append(
+                f"{name}: items_per_s {current['items_per_s']} < baseline "
+                f"{previous['items_per_s']}"
+            )
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95_ms {current['p95_ms']} > baseline {previous['p95_ms']}"
+            )
+    return regressions
+
+
+def check_budgets(results: t.Dict[str, t.Any], config: BenchConfig) -> t.List[str]:
+    """List results over their absolute budgets, regardless of any baseline."""
+    failures = []
+    imported = results.get("scenarios", {}).get("import")
+    if imported:
+        if imported["p95_ms"] > config.import_budget_ms:
+            failures.append(
+                f"import: p95_ms {imported['p95_ms']} > budget {config.import_budget_ms}"
+            )
+        if imported.get("heavy_modules"):
+            failures.append(f"import: loaded heavy modules {imported['heavy_modules']}")
+    return failures
+
+
+def load_results(path: PathLike) -> t.Dict[str, t.Any]:
+    """Load benchmark results written as JSON."""
+    return json.loads(pathify(path, as_file=True).read_text())
+
+
+def format_results(results: t.Dict[str, t.Any]) -> str:
+    """Human readable table of benchmark results."""
+    lines = [f"{'scenario':<20} {'items/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    for name, result in results["scenarios"].items():
+        lines.append(
+            f"{name:<20} {result['items_per_s']:>10.1f} {result['p50_ms']:>10.3f} "
+            f"{result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main(  # noqa: PLR0913
+    config: BenchConfig,
+    scenarios: t.Optional[t.Sequence[str]] = None,
+    output: t.Optional[PathLike] = None,
+    baseline: t.Optional[PathLike] = None,
+    tolerance: float = 0.1,
+) -> int:
+    """Run benchmarks, write JSON results and compare against a baseline, returning exit code."""
+    results = asyncio.run(run_benchmarks(config=config, scenarios=scenarios))
+    print(format_results(results))
+
+    if output is not None:
+        path = pathify(output)
+        path.write_text(json.dumps(results, indent=2))
+        print(f"Wrote results to: {path}")
+
+    regressions = check_budgets(results, config)
+    if baseline is not None:
+        regressions += compare(results, load_results(baseline), tolerance=tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
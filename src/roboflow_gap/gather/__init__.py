@@ -1,4 +1,23 @@
+from .frame_store import FrameEntry, FrameStore
 from .gather_base import GatherBase
-from .gather_from_files import GatherFromFiles
+from .gather_from_camera import GatherFromCamera
+from .gather_from_directory import GatherFromDirectory
+from .gather_from_files import GatherFromFile
+from .gather_from_frame_store import GatherFromFrameStore
+from .gather_from_urls import GatherFromUrls
+from .gather_from_video import GatherFromVideo
+from .manifest import Manifest, ManifestEntry
 
-__all__ = ["GatherBase", "GatherFromFiles"]
+__all__ = [
+    "GatherBase",
+    "GatherFromFile",
+    "GatherFromDirectory",
+    "GatherFromCamera",
+    "GatherFromUrls",
+    "GatherFromVideo",
+    "GatherFromFrameStore",
+    "FrameStore",
+    "FrameEntry",
+    "Manifest",
+    "ManifestEntry",
+]
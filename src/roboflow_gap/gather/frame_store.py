@@ -0,0 +1,303 @@
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+import threading
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.utils.images import load_image_path
+from roboflow_gap.utils.paths import pathify
+
+from .gather_from_files import stat_signature
+
+DATA_NAME = "frames.bin"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+_ALIGN = 64
+
+
+class FrameEntry(t.NamedTuple):
+    """Where one decoded frame lives in a frame store's data file."""
+
+    path: str
+    offset: int
+    shape: t.Tuple[int, ...]
+    dtype: str
+    size: t.Optional[int]
+    mtime_ns: t.Optional[int]
+    decode_scale: int
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes of the frame."""
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+
+class FrameStore:
+    """Directory of decoded frames, packed into one data file with an offset index.
+
+    pack decodes image files once and appends the raw pixels to frames.bin, recording the offset,
+    shape and dtype of each frame in index.json. Frames are then served as read only numpy views
+    into a memory map of the data file, so repeated runs over the same images skip decoding, and
+    every process reading the store shares the same page cache pages instead of its own copies.
+    Packing again only decodes files that are new or whose size or modification time changed.
+    Frames replaced that way leave dead bytes behind, and once they pass compact_ratio of the
+    data file, pack compacts the store into a new data file holding only the live frames.
+    """
+
+    def __init__(self, path: PathLike):
+        self.path: pathlib.Path = pathify(path)
+        self.data_path: pathlib.Path = self.path / DATA_NAME
+        self.index_path: pathlib.Path = self.path / INDEX_NAME
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._generation: int = 0
+        self._lock = threading.Lock()
+        self._entries: t.List[FrameEntry] = []
+        self._by_path: t.Dict[str, int] = {}
+        self._data: t.Optional[np.memmap] = None
+        self._private: t.Optional[np.memmap] = None
+        self.load()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={str(self.path)!r}, frames={len(self._entries)})"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.frame(self._entries[index])
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        # worker processes map the data file themselves rather than unpickling the frames
+        return {"path": self.path}
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        self.__init__(state["path"])
+
+    @property
+    def entries(self) -> t.List[FrameEntry]:
+        """Every frame in the store, in the order they were packed."""
+        return list(self._entries)
+
+    def load(self) -> None:
+        """Read the index and drop the current memory map, if the store exists."""
+        with self._lock:
+            self._data = self._private = None
+            self._entries = []
+            self._generation = 0
+            self.data_path = self.path / DATA_NAME
+            if self.index_path.is_file():
+                index = json.loads(self.index_path.read_text())
+                if index.get("version") != INDEX_VERSION:
+                    raise ValueError(
+                        f"Unsupported frame store version {index.get('version')} at: {self.path}"
+                    )
+                self._entries = [
+                    FrameEntry(**{**x, "shape": tuple(x["shape"])}) for x in index["frames"]
+                ]
+                # compacted stores switch to a new data file
+                self._generation = index.get("generation", 0)
+                self.data_path = self.path / index.get("data", DATA_NAME)
+            self._by_path = {x.path: i for i, x in enumerate(self._entries)}
+
+    def get(self, path: PathLike) -> t.Optional[FrameEntry]:
+        """The entry of a source image path, if it was packed."""
+        index = self._by_path.get(str(path))
+        return self._entries[index] if index is not None else None
+
+    @property
+    def dead_bytes(self) -> int:
+        """Bytes of the data file no entry points at, left by frames that were packed again."""
+        try:
+            size = self.data_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        return max(size - sum(_aligned(x.nbytes) for x in self._entries), 0)
+
+    def data(self, writable: bool = False) -> np.memmap:
+        """Memory map of the data file, created on first use.
+
+        The read only map is shared with every other process mapping the store; the writable
+        one is copy on write, so pages written to become private copies of this process.
+        """
+        with self._lock:
+            if self._data is None and self._private is None:
+                # memmap can not map a missing or empty file, and would say so less clearly
+                size = self.data_path.stat().st_size if self.data_path.is_file() else 0
+                if not size:
+                    raise FileNotFoundError(
+                        f"No frames packed in frame store at: {self.path}, pack images first"
+                    )
+            if writable:
+                if self._private is None:
+                    self._private = np.memmap(self.data_path, dtype=np.uint8, mode="c")
+                return self._private
+            if self._data is None:
+                self._data = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+            return self._data
+
+    def frame(self, entry: FrameEntry, writable: bool = False) -> np.ndarray:
+        """The frame of an entry, as a view into the memory map without copying it."""
+        data = self.data(writable=writable)
+        view = data[entry.offset : entry.offset + entry.nbytes]
+        return view.view(np.dtype(entry.dtype)).reshape(entry.shape)
+
+    def is_current(self, path: PathLike, size: t.Optional[int], mtime_ns: t.Optional[int]) -> bool:
+        """If a path was packed and its size and modification time have not changed since."""
+        entry = self.get(path)
+        return entry is not None and entry.size == size and entry.mtime_ns == mtime_ns
+
+    def pack(
+        self,
+        paths: t.Iterable[PathLike],
+        decode_scale: int = 1,
+        workers: t.Optional[int] = None,
+        compact_ratio: t.Optional[float] = 0.5,
+    ) -> int:
+        """Decode image files into the store, returning how many frames were added.
+
+        Files already packed at the same decode_scale and unchanged since are skipped; changed
+        files are packed again and their entry points at the new frame. Files that fail to
+        decode are logged and left out. The store is compacted afterwards if more than
+        compact_ratio of the data file is dead, never if None.
+        """
+        todo = []
+        for path in paths:
+            path = pathify(path)
+            signature = stat_signature(path) or (None, None)
+            entry = self.get(path)
+            if entry is not None and entry.decode_scale == decode_scale:
+                if self.is_current(path, *signature):
+                    continue
+            todo.append((path, signature))
+        if not todo:
+            return 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        # the map of the old data file does not cover frames appended below
+        with self._lock:
+            self._data = self._private = None
+        added = 0
+        workers = workers or os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor, open(
+            self.data_path, "ab"
+        ) as handle:
+            offset = handle.tell()
+            # decode in windows so at most a few frames per worker are held in memory
+            window = workers * 4
+            for start in range(0, len(todo), window):
+                chunk = todo[start : start + window]
+                images = executor.map(lambda x: _try_load(x[0], decode_scale), chunk)
+                for (path, (size, mtime_ns)), image in zip(chunk, images):
+                    if image is None:
+                        self.logger.error("Not packing image, could not decode path=%s", path)
+                        continue
+                    image = np.ascontiguousarray(image)
+                    padding = -offset % _ALIGN
+                    handle.write(b"\0" * padding)
+                    offset += padding
+                    handle.write(memoryview(image).cast("B"))
+                    self._add(
+                        FrameEntry(
+                            path=str(path),
+                            offset=offset,
+                            shape=tuple(image.shape),
+                            dtype=image.dtype.str,
+                            size=size,
+                            mtime_ns=mtime_ns,
+                            decode_scale=decode_scale,
+                        )
+                    )
+                    offset += image.nbytes
+                    added += 1
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.write_index()
+        if compact_ratio is not None and self.dead_bytes > compact_ratio * offset:
+            self.compact()
+        return added
+
+    def compact(self) -> int:
+        """Copy the live frames into a new data file, returning how many bytes were reclaimed.
+
+        The index is switched to the new file atomically before the old one is removed, so a
+        crash leaves a consistent store, and processes still mapping the old file keep reading
+        it until they load the store again.
+        """
+        with self._lock:
+            entries = list(self._entries)
+            previous = self.data_path
+            generation = self._generation + 1
+        if not previous.is_file():
+            return 0
+        before = previous.stat().st_size
+        path = self.path / f"frames-{generation}.bin"
+        source = np.memmap(previous, dtype=np.uint8, mode="r") if before else None
+        moved = []
+        offset = 0
+        with open(path, "wb") as handle:
+            for entry in entries:
+                padding = -offset % _ALIGN
+                handle.write(b"\0" * padding)
+                offset += padding
+                handle.write(source[entry.offset : entry.offset + entry.nbytes])
+                moved.append(entry._replace(offset=offset))
+                offset += entry.nbytes
+            handle.flush()
+            os.fsync(handle.fileno())
+        del source
+        with self._lock:
+            self._entries = moved
+            self._generation = generation
+            self.data_path = path
+            self._data = self._private = None
+        self.write_index()
+        previous.unlink()
+        self.logger.info("Compacted %s from %d to %d bytes", self.path, before, offset)
+        return before - offset
+
+    def _add(self, entry: FrameEntry) -> None:
+        """Add or replace the entry of a path."""
+        with self._lock:
+            index = self._by_path.get(entry.path)
+            if index is None:
+                self._by_path[entry.path] = len(self._entries)
+                self._entries.append(entry)
+            else:
+                self._entries[index] = entry
+
+    def write_index(self) -> None:
+        """Atomically replace index.json with the current entries."""
+        with self._lock:
+            frames = [x._asdict() for x in self._entries]
+            index = {
+                "version": INDEX_VERSION,
+                "data": self.data_path.name,
+                "generation": self._generation,
+                "frames": frames,
+            }
+        temp = self.index_path.with_suffix(".tmp")
+        temp.write_text(json.dumps(index))
+        os.replace(temp, self.index_path)
+
+    def close(self) -> None:
+        """Drop the memory map; views handed out keep it alive until they are released."""
+        with self._lock:
+            self._data = self._private = None
+
+
+def _aligned(nbytes: int) -> int:
+    """Bytes a frame takes in the data file, with the padding that aligns the next one."""
+    return nbytes + -nbytes % _ALIGN
+
+
+def _try_load(path: pathlib.Path, scale: int) -> t.Optional[np.ndarray]:
+    """Decode an image file, or None if it can not be decoded."""
+    try:
+        return load_image_path(path, scale)
+    except ValueError:
+        return None
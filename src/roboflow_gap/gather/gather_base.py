@@ -1,11 +1,12 @@
 import abc
 import datetime
 import logging
+import time
 import typing as t
 
 import pydantic
 
-from roboflow_gap.models import ImageData
+from roboflow_gap.models.image_data import ImageData
 from roboflow_gap.utils.dates import get_now
 
 
@@ -13,15 +14,51 @@ from roboflow_gap.utils.dates import get_now
 class GatherBase(abc.ABC, pydantic.BaseModel):
     """Base class for image data gathering."""
 
+    max_images: t.Optional[int] = pydantic.Field(
+        default=None,
+        description="The maximum number of images to gather before stopping.",
+    )
+    max_seconds: t.Optional[float] = pydantic.Field(
+        default=None,
+        description="The maximum number of seconds to gather before stopping.",
+    )
+
     _logger: t.Optional[logging.Logger] = pydantic.PrivateAttr(default=None)
     _date_created: datetime.datetime = pydantic.PrivateAttr(default_factory=get_now)
+    _count: int = pydantic.PrivateAttr(default=0)
+    _started: t.Optional[float] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        self._logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
 
     @abc.abstractmethod
     async def run(self) -> t.AsyncIterator[ImageData]:
         """An asynchronous generator yielding ImageData instances."""
         yield NotImplemented
 
-    @pydantic.validator("_logger", pre=True)
-    def set_logger(cls, value: t.Optional[logging.Logger]) -> logging.Logger:
-        """Set logger if not provided."""
-        return value or logging.getLogger(f"{cls.__module__}.{cls.__name__}")
+    def report_latency(self, seconds: float) -> None:
+        """Feed the analyzer's measured seconds per frame, for gatherers that adapt to it."""
+
+    def start_limits(self) -> None:
+        """Reset the image count and start the clock for max_images and max_seconds."""
+        self._count = 0
+        self._started = time.monotonic()
+
+    def limit_reached(self) -> bool:
+        """Check if max_images or max_seconds has been reached."""
+        if isinstance(self.max_images, int) and self.max_images > 0:
+            if self._count >= self.max_images:
+                self._logger.debug("Ending gather due to max_images=%s reached", self.max_images)
+                return True
+
+        if (
+            isinstance(self.max_seconds, (int, float))
+            and self.max_seconds > 0
+            and self._started is not None
+            and time.monotonic() - self._started > self.max_seconds
+        ):
+            self._logger.debug("Ending gather due to max_seconds=%s exceeded", self.max_seconds)
+            return True
+
+        return False
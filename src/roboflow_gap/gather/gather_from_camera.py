@@ -0,0 +1,178 @@
+import threading
+import time
+import typing as t
+
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.frame_buffers import BufferClosed, FrameBuffer
+
+from .gather_base import GatherBase
+
+if t.TYPE_CHECKING:
+    import cv2
+
+CaptureFactory = t.Callable[[t.Union[int, str]], t.Any]
+
+
+def open_capture(source: t.Union[int, str]) -> "cv2.VideoCapture":
+    """Open a video capture for a camera index or a video file/stream url."""
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+
+    if not cap.isOpened():
+        raise IOError(f"Error: Could not open camera: {source}")
+
+    return cap
+
+
+class GatherFromCamera(GatherBase):
+    """Gather image data from a camera, always handing over the newest frame.
+
+    Frames are read on a dedicated capture thread into a small drop-oldest buffer, so slow
+    analysis never lets stale frames pile up in the driver. When adaptive_skip is on, the capture
+    thread grabs, without decoding, the frames that would have been dropped anyway, based on the
+    seconds per frame of the analyzer, which Pipeline reports through report_latency. Without
+    those reports, the time the consumer takes between frames is measured instead.
+    """
+
+    camera: t.Union[int, str] = pydantic.Field(
+        default=0,
+        description="Camera index, or a video file path or stream url.",
+    )
+    buffer_size: int = pydantic.Field(
+        default=1,
+        description="Number of most recent frames kept for the consumer.",
+    )
+    fps: t.Optional[float] = pydantic.Field(
+        default=None,
+        description="Frame rate of the source, read from the capture if not given.",
+    )
+    adaptive_skip: bool = pydantic.Field(
+        default=True,
+        description="If True, skip decoding frames based on measured analyzer latency.",
+    )
+    max_skip: int = pydantic.Field(
+        default=30,
+        description="Maximum number of frames skipped between two decoded frames.",
+    )
+    latency_smoothing: float = pydantic.Field(
+        default=0.3,
+        description="Weight of the newest latency sample in the moving average, 0 to 1.",
+    )
+    capture_factory: CaptureFactory = pydantic.Field(
+        default=open_capture,
+        exclude=True,
+        description="Callable returning a cv2.VideoCapture-like object for camera.",
+    )
+
+    _buffer: t.Optional[FrameBuffer] = pydantic.PrivateAttr(default=None)
+    _latency: float = pydantic.PrivateAttr(default=0.0)
+    _skip: int = pydantic.PrivateAttr(default=0)
+    _skipped: int = pydantic.PrivateAttr(default=0)
+    _read: int = pydantic.PrivateAttr(default=0)
+    _reported: bool = pydantic.PrivateAttr(default=False)
+
+    @property
+    def latency(self) -> float:
+        """Moving average of the consumer's seconds per frame."""
+        return self._latency
+
+    @property
+    def skip(self) -> int:
+        """Number of frames currently skipped between two decoded frames."""
+        return self._skip
+
+    def report_latency(self, seconds: float) -> None:
+        """Feed the analyzer's measured seconds per frame into the skip estimate.
+
+        Once reported, the time the consumer takes between frames is no longer measured.
+        """
+        self._reported = True
+        self.observe_latency(seconds)
+
+    def observe_latency(self, seconds: float) -> None:
+        """Add a per-frame latency sample to the moving average and update the skip."""
+        weight = min(max(self.latency_smoothing, 0.0), 1.0)
+        self._latency = seconds if not self._latency else (
+            weight * seconds + (1 - weight) * self._latency
+        )
+        if self.adaptive_skip and self.fps:
+            # frames arriving while one is being consumed would be dropped, so skip them
+            self._skip = min(max(int(self._latency * self.fps) - 1, 0), self.max_skip)
+
+    async def run(self) -> t.AsyncIterator[ImageData]:
+        """An asynchronous generator yielding ImageData instances."""
+        import cv2
+
+        self.start_limits()
+        cap = self.capture_factory(self.camera)
+        if not self.fps:
+            self.fps = float(cap.get(cv2.CAP_PROP_FPS) or 0) or 30.0
+        self._buffer = FrameBuffer(maxsize=self.buffer_size, drop_oldest=True)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self.capture, args=(cap, stop), name=f"gap-camera-{self.camera}", daemon=True
+        )
+        thread.start()
+        self._logger.debug("Started capture thread for camera=%s fps=%s", self.camera, self.fps)
+
+        try:
+            while True:
+                try:
+                    frame, index, captured = await self._buffer.get()
+                except BufferClosed:
+                    self._logger.debug("Ending gather, capture ended for camera=%s", self.camera)
+                    return
+
+                context = {
+                    "camera": self.camera,
+                    "frame_index": index,
+                    "captured": captured,
+                    "skip": self._skip,
+                    "skipped": self._skipped,
+                    "dropped": self._buffer.dropped,
+                    "gatherer": self.__class__.__name__,
+                }
+                self._count += 1
+                yielded = time.monotonic()
+                yield ImageData(
+                    original=frame,
+                    date_started=get_now(),
+                    date_original_loaded=get_now(),
+                    context=context,
+                    timings={"captured": captured, "loaded": get_monotonic()},
+                )
+                if not self._reported:
+                    self.observe_latency(time.monotonic() - yielded)
+                if self.limit_reached():
+                    return
+        finally:
+            stop.set()
+            self._buffer.close()
+            thread.join(timeout=5)
+            cap.release()
+
+    def capture(self, cap: t.Any, stop: threading.Event) -> None:
+        """Capture thread loop, reading frames into the buffer until stopped or exhausted."""
+        index = -1
+        try:
+            while not stop.is_set():
+                for _ in range(self._skip):
+                    if not cap.grab():
+                        return
+                    index += 1
+                    self._skipped += 1
+
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                index += 1
+                self._read += 1
+                self._buffer.put((frame, index, time.monotonic()))
+        except Exception:
+            self._logger.exception("Capture failed for camera=%s", self.camera)
+        finally:
+            self._buffer.close()
@@ -0,0 +1,248 @@
+import asyncio
+import collections
+import fnmatch
+import itertools
+import os
+import pathlib
+import typing as t
+
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.executors import ExecutorKind, StageExecutor
+from roboflow_gap.utils.images import DecodeScale, load_image_path
+from roboflow_gap.utils.paths import pathify
+from roboflow_gap.utils.tools import listify
+
+from .gather_base import GatherBase
+from .gather_from_files import stat_signature
+from .manifest import Manifest
+
+IMAGE_PATTERNS: t.List[str] = [
+    "*.jpg",
+    "*.jpeg",
+    "*.png",
+    "*.bmp",
+    "*.webp",
+    "*.tif",
+    "*.tiff",
+]
+
+
+def match_patterns(relative: str, name: str, patterns: t.Sequence[str]) -> bool:
+    """Check a file against glob patterns.
+
+    Patterns without a slash match the file name, patterns with one match the path relative to
+    the scanned directory, where a leading **/ also matches files at the top level.
+    """
+    for pattern in patterns:
+        if "/" not in pattern:
+            if fnmatch.fnmatch(name, pattern):
+                return True
+        elif fnmatch.fnmatch(relative, pattern) or (
+            pattern.startswith("**/") and fnmatch.fnmatch(relative, pattern[3:])
+        ):
+            return True
+    return False
+
+
+def scan_paths(
+    directory: pathlib.Path, patterns: t.Sequence[str], recursive: bool = True
+) -> t.Iterator[pathlib.Path]:
+    """Lazily yield files under directory matching patterns, using os.scandir."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda x: x.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subdirs.append(pathlib.Path(entry.path))
+            elif entry.is_file():
+                relative = pathlib.Path(entry.path).relative_to(directory).as_posix()
+                if match_patterns(relative=relative, name=entry.name, patterns=patterns):
+                    yield pathlib.Path(entry.path)
+        # reversed so directories are visited in sorted order
+        stack.extend(reversed(subdirs))
+
+
+class GatherFromDirectory(GatherBase):
+    """Gather image data from the files in one or more directories."""
+
+    directories: t.Union[pathlib.Path, t.List[pathlib.Path]] = pydantic.Field(
+        description="The directories to gather images from.",
+    )
+    patterns: t.List[str] = pydantic.Field(
+        default_factory=lambda: list(IMAGE_PATTERNS),
+        description="Glob patterns of files to gather, e.g. *.jpg or **/cam1/*.png.",
+    )
+    recursive: bool = pydantic.Field(
+        default=True,
+        description="If True, subdirectories are scanned as well.",
+    )
+    ordered: bool = pydantic.Field(
+        default=True,
+        description=(
+            "If True, images are yielded in scan order, otherwise in the order their decode "
+            "finishes."
+        ),
+    )
+    prefetch: int = pydantic.Field(
+        default=16,
+        description="Number of images decoded ahead of the consumer.",
+    )
+    decode_scale: DecodeScale = pydantic.Field(
+        default=1,
+        description=(
+            "Decode images at 1/decode_scale of their size, 1, 2, 4 or 8; JPEGs decode directly "
+            "at the reduced size, which is much faster than decoding in full and resizing."
+        ),
+    )
+    decode_kind: ExecutorKind = pydantic.Field(
+        default="thread",
+        description="Pool type to decode images on, thread or process.",
+    )
+    decode_workers: t.Optional[int] = pydantic.Field(
+        default=None,
+        description="Number of decode workers, defaults to the number of CPUs.",
+    )
+    manifest: t.Optional[pydantic.InstanceOf[Manifest]] = pydantic.Field(
+        default=None,
+        exclude=True,
+        description=(
+            "Persistent manifest of processed files; files it records as done are skipped if "
+            "their size and modification time are unchanged, so reruns resume where they left."
+        ),
+    )
+
+    _decoder: t.Optional[StageExecutor] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self.directories: t.List[pathlib.Path] = [
+            pathify(path=x) for x in listify(self.directories)
+        ]
+        for directory in self.directories:
+            if not directory.is_dir():
+                raise NotADirectoryError(f"Directory not found at: {directory}")
+        self.prefetch = max(self.prefetch, 1)
+        self._decoder = StageExecutor(
+            name="decode",
+            kind=self.decode_kind,
+            workers=self.decode_workers,
+            max_in_flight=self.prefetch,
+        )
+
+    def iter_paths(self) -> t.Iterator[pathlib.Path]:
+        """Lazily yield every matching path in every directory, except those done in manifest.
+
+        The done files of each directory are read from the manifest in one query up front,
+        rather than looking every scanned path up.
+        """
+        skipped = 0
+        for directory in self.directories:
+            done = self.manifest.done_signatures(directory) if self.manifest is not None else {}
+            for path in scan_paths(
+                directory=directory, patterns=self.patterns, recursive=self.recursive
+            ):
+                if done:
+                    signature = done.get(str(path))
+                    if signature is not None and signature == stat_signature(path):
+                        skipped += 1
+                        continue
+                yield path
+        if skipped:
+            self._logger.info("Skipped %d paths done in manifest", skipped)
+
+    async def run(self) -> t.AsyncIterator[ImageData]:
+        """An asynchronous generator yielding ImageData instances."""
+        self.start_limits()
+        paths = self.iter_paths()
+        pending: t.Deque[asyncio.Future] = collections.deque()
+        submitted = 0
+
+        async def fill() -> None:
+            # scanning, stat calls and manifest reads run on a thread, off the event loop
+            nonlocal submitted
+            while len(pending) < self.prefetch:
+                count = self.prefetch - len(pending)
+                if self.max_images:
+                    count = min(count, self.max_images - submitted)
+                    if count <= 0:
+                        return
+                batch = await asyncio.to_thread(list, itertools.islice(paths, count))
+                if not batch:
+                    return
+                for path in batch:
+                    pending.append(asyncio.ensure_future(self.load_path(path=path)))
+                submitted += len(batch)
+
+        try:
+            await fill()
+            while pending:
+                if self.ordered:
+                    task = pending.popleft()
+                    image_data = await task
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    task = next(x for x in pending if x in done)
+                    pending.remove(task)
+                    image_data = task.result()
+
+                await fill()
+                self._count += 1
+                yield image_data
+                if self.limit_reached():
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def mark_pending(self, path: pathlib.Path) -> None:
+        """Record a file as pending in the manifest with its current signature."""
+        signature = stat_signature(path)
+        if signature:
+            self.manifest.mark(path, "pending", *signature)
+
+    async def load_path(self, path: pathlib.Path) -> ImageData:
+        """Load image from path on the decode pool."""
+        date_started = get_now()
+        started = get_monotonic()
+        original = None
+        error = None
+        error_exc = None
+        context = {
+            "path": path,
+            "decode_scale": self.decode_scale,
+            "gatherer": self.__class__.__name__,
+        }
+        if self.manifest is not None:
+            # marking may checkpoint the manifest, keep its SQLite writes off the event loop
+            await asyncio.to_thread(self.mark_pending, path)
+        try:
+            original = await self._decoder.run(load_image_path, path, self.decode_scale)
+            if original is None:
+                error = f"Not loading image from file, could not decode context={context}"
+                self._logger.error(error)
+        except Exception as exc:
+            error = f"Not loading image from file, error={exc}, context={context}"
+            self._logger.exception(error)
+            error_exc = exc
+
+        return ImageData(
+            original=original,
+            date_started=date_started,
+            date_original_loaded=get_now(),
+            context=context,
+            timings={"started": started, "loaded": get_monotonic()},
+            error=error,
+            error_exc=error_exc,
+        )
@@ -1,16 +1,58 @@
 import asyncio
+import os
 import pathlib
+import time
 import typing as t
 
-import cv2
 import pydantic
 
-from roboflow_gap.models import ImageData
-from roboflow_gap.utils.dates import get_now
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.executors import ExecutorKind, StageExecutor
+from roboflow_gap.utils.images import (
+    DecodeScale,
+    decode_image_bytes,
+    digest_bytes,
+    read_image_bytes,
+)
+from roboflow_gap.utils.imports import has_module, optional_import
 from roboflow_gap.utils.paths import pathify
 from roboflow_gap.utils.tools import listify
 
 from .gather_base import GatherBase
+from .manifest import Manifest
+
+Signature = t.Optional[t.Tuple[int, int]]
+
+
+def stat_signature(path: pathlib.Path) -> Signature:
+    """Get the (size, mtime_ns) of a file with a single stat call, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_if_changed(
+    path: pathlib.Path,
+    previous_digest: t.Optional[str] = None,
+    decode: bool = True,
+    scale: int = 1,
+) -> t.Tuple[str, t.Any, t.Optional[bytes]]:
+    """Read a file and decode it only if its content hash differs from previous_digest.
+
+    Returns the content hash, the decoded image and the encoded bytes. The image and bytes are
+    both None if the content is unchanged; if decode is False the bytes are returned in place of
+    the image. Images are decoded at 1/scale of their size.
+    """
+    data = read_image_bytes(path)
+    digest = digest_bytes(data)
+    if digest == previous_digest:
+        return digest, None, None
+    if not decode:
+        return digest, None, data
+    return digest, decode_image_bytes(data, scale=scale), None
 
 
 class GatherFromFile(GatherBase):
@@ -27,102 +69,241 @@ class GatherFromFile(GatherBase):
         default=False,
         description="If True, the gatherer will watch paths for changes.",
     )
+    watch_mode: t.Literal["auto", "events", "poll"] = pydantic.Field(
+        default="auto",
+        description=(
+            "How to watch paths: events uses OS file events (inotify on Linux) and needs the "
+            "watchfiles package, poll checks modification times every sleep seconds, auto uses "
+            "events when available and falls back to poll."
+        ),
+    )
     sleep: float = pydantic.Field(
         default=0.5,
         description="The number of seconds to sleep between checking paths for changes.",
     )
-    max_images: t.Optional[int] = pydantic.Field(
+    debounce: float = pydantic.Field(
+        default=0.2,
+        description="Seconds a path must stay unchanged before a burst of writes is reloaded.",
+    )
+    lazy_decode: bool = pydantic.Field(
+        default=False,
+        description=(
+            "If True, images are yielded as encoded bytes and decoded on first access to "
+            "ImageData.original, instead of on the decode pool."
+        ),
+    )
+    decode_scale: DecodeScale = pydantic.Field(
+        default=1,
+        description=(
+            "Decode images at 1/decode_scale of their size, 1, 2, 4 or 8; JPEGs decode directly "
+            "at the reduced size, which is much faster than decoding in full and resizing."
+        ),
+    )
+    decode_kind: ExecutorKind = pydantic.Field(
+        default="thread",
+        description="Pool type to decode images on, thread or process.",
+    )
+    decode_workers: t.Optional[int] = pydantic.Field(
+        default=None,
+        description="Number of decode workers, defaults to the number of CPUs.",
+    )
+    decode_max_in_flight: t.Optional[int] = pydantic.Field(
         default=None,
-        description="The maximum number of images to gather before stopping.",
+        description="Maximum number of decodes queued or running at once.",
     )
-    max_seconds: t.Optional[float] = pydantic.Field(
+    manifest: t.Optional[pydantic.InstanceOf[Manifest]] = pydantic.Field(
         default=None,
-        description="The maximum number of seconds to gather before stopping.",
+        exclude=True,
+        description=(
+            "Persistent manifest of processed files; files it records as done are skipped if "
+            "their size and modification time, or else their content hash, are unchanged."
+        ),
     )
 
-    _count: int = pydantic.PrivateAttr(default=0)
-    _paths_mtime: t.Dict[pathlib.Path, float] = pydantic.PrivateAttr(default_factory=dict)
+    _paths_signature: t.Dict[pathlib.Path, Signature] = pydantic.PrivateAttr(default_factory=dict)
+    _paths_digest: t.Dict[pathlib.Path, str] = pydantic.PrivateAttr(default_factory=dict)
+    _decoder: t.Optional[StageExecutor] = pydantic.PrivateAttr(default=None)
 
     def model_post_init(self, __context: t.Any) -> None:
         """Post init model method."""
+        super().model_post_init(__context)
         self.paths: t.List[pathlib.Path] = [
             pathify(path=x, as_file=self.must_exist) for x in listify(self.paths)
         ]
+        self._decoder = StageExecutor(
+            name="decode",
+            kind=self.decode_kind,
+            workers=self.decode_workers,
+            max_in_flight=self.decode_max_in_flight,
+        )
 
     async def run(self) -> t.AsyncIterator[ImageData]:
         """An asynchronous generator yielding ImageData instances."""
+        self.start_limits()
         for path in self.paths:
-            async for image_data in self.load_path(path=path):
+            image_data = await self.load_path(path=path, force=True)
+            if image_data is not None:
                 yield image_data
+            if self.limit_reached():
+                return
+
+        if not self.watch:
+            self._logger.debug("Ending gather due to watch=False")
+            return
+
+        async for changed in self.watch_changes():
+            for path in changed:
+                image_data = await self.load_path(path=path)
+                if image_data is not None:
+                    yield image_data
+                if self.limit_reached():
+                    return
+            if self.limit_reached():
+                return
+
+    async def watch_changes(self) -> t.AsyncIterator[t.Set[pathlib.Path]]:
+        """Yield sets of paths that may have changed, or empty sets on idle timeouts."""
+        directories = {x.parent for x in self.paths if x.parent.is_dir()}
+        use_events = self.watch_mode != "poll" and has_module("watchfiles") and directories
+        if self.watch_mode == "events" and not has_module("watchfiles"):
+            raise ImportError("watch_mode='events' requires the watchfiles package")
+
+        if use_events:
+            changes = self._event_changes(directories)
+        else:
+            changes = self._poll_changes()
+        self._logger.debug(
+            "Watching %d paths using %s", len(self.paths), "events" if use_events else "poll"
+        )
+
+        async for changed in changes:
+            yield changed
+
+    async def _event_changes(
+        self, directories: t.Set[pathlib.Path]
+    ) -> t.AsyncIterator[t.Set[pathlib.Path]]:
+        """Watch parent directories with OS file events, coalescing bursts with debounce."""
+        paths = set(self.paths)
+        watchfiles = optional_import("watchfiles")
+        async for changes in watchfiles.awatch(
+            *directories,
+            watch_filter=lambda _, path: pathlib.Path(path) in paths,
+            debounce=int(self.debounce * 1000),
+            step=50,
+            rust_timeout=int(max(self.sleep, 0.05) * 1000),
+            yield_on_timeout=True,
+            recursive=False,
+        ):
+            yield {pathlib.Path(path) for _, path in changes}
 
-    async def load_path(self, path: pathlib.Path) -> t.AsyncGenerator[ImageData, None]:
-        """Load image from path."""
+    async def _poll_changes(self) -> t.AsyncIterator[t.Set[pathlib.Path]]:
+        """Poll file signatures, reporting a path once it stayed unchanged for debounce."""
+        seen = {
+            path: self._paths_signature[path]
+            if path in self._paths_signature
+            else stat_signature(path)
+            for path in self.paths
+        }
+        pending: t.Dict[pathlib.Path, float] = {}
         while True:
-            date_started = get_now()
-            original = None
-            date_loaded = None
-            error = None
-            error_exc = None
-            path_exists: bool = path.is_file()
-            path_mtime: t.Optional[float] = path.stat().st_mtime if path_exists else None
-
-            context = {
-                "path": path,
-                "exists": path_exists,
-                "modified": None,
-                "gatherer": self.__class__.__name__,
-            }
-            self._logger.debug("Starting gather context=%s", context)
-            if context["exists"]:
-                path_stat = path.stat()
-
-                if context["modified"]:
-                    if path_stat.st_mtime == context["modified"]:
-                        self._logger.debug(
-                            "Not loading image from file, modification time unchanged since previous gather context=%s",
-                            context,
-                        )
-                        continue
-                    context["modified"] = path_stat.st_mtime
-
-                self.path_last_mtime = path_stat.st_mtime
-                self._logger.debug("Loading image from file context=%s", context)
-                try:
-                    original = cv2.imread(str(self.path))
-                    date_loaded = get_now()
-                    self.count += 1
-                    self._logger.debug("Loaded image from file context=%s", context)
-                except Exception as exc:
-                    error = f"Not loading image from file, error={exc}, context={context}"
-                    self._logger.exception(error)
-                    error_exc = exc
-            else:
-                error = f"Not loading image from file, file not found context={context}"
-                self._logger.error(error)
-
-            yield ImageData(
-                original=original,
-                date_started=date_started,
-                date_loaded=date_loaded or get_now(),
-                context=context,
-                error=error,
-                error_exc=error_exc,
-            )
-
-            if not self.watch:
-                self._logger.debug("Ending gather due to watch=False context=%s", context)
-                break
-
-            if (
-                isinstance(self.max_seconds, (int, float))
-                and self.max_seconds > 0
-                and (get_now() - date_started).total_seconds() > self.max_seconds
-            ):
-                self._logger.debug(
-                    "Ending gather due to max_seconds=%s exceeded context=%s",
-                    self.max_seconds,
-                    context,
+            await asyncio.sleep(self.sleep)
+            now = time.monotonic()
+            for path in self.paths:
+                signature = stat_signature(path)
+                if signature != seen[path]:
+                    seen[path] = signature
+                    pending[path] = now
+            ready = {path for path, changed in pending.items() if now - changed >= self.debounce}
+            for path in ready:
+                del pending[path]
+            yield ready
+
+    async def load_path(self, path: pathlib.Path, force: bool = False) -> t.Optional[ImageData]:
+        """Load image from path, returning None if its content has not changed since last load.
+
+        A single stat decides whether the file could have changed; only then is it read, and it
+        is only decoded if the hash of its bytes differs from the last load.
+        """
+        date_started = get_now()
+        started = get_monotonic()
+        original = None
+        encoded = None
+        error = None
+        error_exc = None
+        signature = stat_signature(path)
+        previous = self._paths_signature.get(path)
+
+        if not force and path in self._paths_signature and signature == previous:
+            return None
+        self._paths_signature[path] = signature
+        done_digest = None
+        if self.manifest is not None and signature:
+            # one lookup off the event loop answers both whether the file is done and its digest
+            entry = await asyncio.to_thread(self.manifest.get, path)
+            if entry is not None and entry.state == "done":
+                if signature == (entry.size, entry.mtime_ns):
+                    self._logger.debug(
+                        "Not loading image from file, done in manifest path=%s", path
+                    )
+                    return None
+                done_digest = entry.digest
+
+        context = {
+            "path": path,
+            "exists": signature is not None,
+            "modified": signature[1] / 1e9 if signature else None,
+            "size": signature[0] if signature else None,
+            "decode_scale": self.decode_scale,
+            "gatherer": self.__class__.__name__,
+        }
+        self._logger.debug("Starting gather context=%s", context)
+        if context["exists"]:
+            self._logger.debug("Loading image from file context=%s", context)
+            previous_digest = None if force else self._paths_digest.get(path)
+            if previous_digest is None:
+                previous_digest = done_digest
+            try:
+                digest, original, encoded = await self._decoder.run(
+                    load_if_changed,
+                    path,
+                    previous_digest,
+                    not self.lazy_decode,
+                    self.decode_scale,
                 )
-                break
+                self._paths_digest[path] = digest
+                context["digest"] = digest
+                if original is None and encoded is None:
+                    self._logger.debug(
+                        "Not loading image from file, content unchanged since previous gather "
+                        "context=%s",
+                        context,
+                    )
+                    if self.manifest is not None and done_digest == digest:
+                        # only touched, so remember the new signature to skip the read next time
+                        await asyncio.to_thread(self.manifest.mark, path, "done", *signature)
+                    return None
+                if self.manifest is not None:
+                    await asyncio.to_thread(
+                        self.manifest.mark, path, "pending", *signature, digest=digest
+                    )
+                self._count += 1
+                self._logger.debug("Loaded image from file context=%s", context)
+            except Exception as exc:
+                error = f"Not loading image from file, error={exc}, context={context}"
+                self._logger.exception(error)
+                error_exc = exc
+        else:
+            self._paths_digest.pop(path, None)
+            error = f"Not loading image from file, file not found context={context}"
+            self._logger.error(error)
 
-            await asyncio.sleep(self.sleep)
+        return ImageData(
+            original=original,
+            encoded=encoded,
+            date_started=date_started,
+            date_original_loaded=get_now(),
+            context=context,
+            timings={"started": started, "loaded": get_monotonic()},
+            error=error,
+            error_exc=error_exc,
+        )
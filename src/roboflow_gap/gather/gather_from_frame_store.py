@@ -0,0 +1,106 @@
+import asyncio
+import fnmatch
+import pathlib
+import typing as t
+
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.paths import pathify
+
+from .frame_store import FrameEntry, FrameStore
+from .gather_base import GatherBase
+
+
+class GatherFromFrameStore(GatherBase):
+    """Gather decoded frames from a FrameStore, without decoding anything.
+
+    Frames are yielded as read only numpy views into the store's memory mapped data file, so
+    loading one costs no decode and no copy, and its pages are shared with every other process
+    reading the same store. Build the store once with FrameStore.pack, or with the frame-store
+    command, then point repeated runs over the same images at it.
+    """
+
+    store: pathlib.Path = pydantic.Field(
+        description="The frame store directory to gather frames from.",
+    )
+    patterns: t.Optional[t.List[str]] = pydantic.Field(
+        default=None,
+        description="Glob patterns of packed source paths to gather, defaults to every frame.",
+    )
+    copy_on_write: bool = pydantic.Field(
+        default=False,
+        description=(
+            "If True, frames are private copy on write views that later stages may draw on in "
+            "place; pages are only copied once written to."
+        ),
+    )
+    yield_every: int = pydantic.Field(
+        default=64,
+        description="Give control back to the event loop after this many frames.",
+    )
+
+    _store: t.Optional[FrameStore] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self.store = pathify(self.store)
+        self._store = FrameStore(self.store)
+        if not len(self._store):
+            raise FileNotFoundError(f"No frames found in frame store at: {self.store}")
+
+    @property
+    def frame_store(self) -> FrameStore:
+        """The frame store frames are gathered from."""
+        return self._store
+
+    def iter_entries(self) -> t.Iterator[FrameEntry]:
+        """Entries of the store matching patterns, in the order they were packed."""
+        for entry in self._store.entries:
+            if self.patterns is None or any(
+                fnmatch.fnmatch(entry.path, x) for x in self.patterns
+            ):
+                yield entry
+
+    async def run(self) -> t.AsyncIterator[ImageData]:
+        """An asynchronous generator yielding ImageData instances."""
+        self.start_limits()
+        for entry in self.iter_entries():
+            self._count += 1
+            yield self.load_entry(entry)
+            if self.limit_reached():
+                return
+            if self._count % max(self.yield_every, 1) == 0:
+                await asyncio.sleep(0)
+
+    def load_entry(self, entry: FrameEntry) -> ImageData:
+        """Map the frame of an entry from the store."""
+        date_started = get_now()
+        started = get_monotonic()
+        original = None
+        error = None
+        error_exc = None
+        context = {
+            "path": pathlib.Path(entry.path),
+            "decode_scale": entry.decode_scale,
+            "frame_store": self.store,
+            "gatherer": self.__class__.__name__,
+        }
+        try:
+            original = self._store.frame(entry, writable=self.copy_on_write)
+        except Exception as exc:
+            error = f"Not loading frame from frame store, error={exc}, context={context}"
+            self._logger.exception(error)
+            error_exc = exc
+
+        return ImageData(
+            original=original,
+            date_started=date_started,
+            date_original_loaded=get_now(),
+            context=context,
+            timings={"started": started, "loaded": get_monotonic()},
+            error=error,
+            error_exc=error_exc,
+        )
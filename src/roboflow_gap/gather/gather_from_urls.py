@@ -0,0 +1,381 @@
+import asyncio
+import email.utils
+import hashlib
+import random
+import time
+import typing as t
+
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_monotonic, get_now
+from roboflow_gap.utils.executors import ExecutorKind, StageExecutor
+from roboflow_gap.utils.images import DecodeScale, decode_image_bytes
+from roboflow_gap.utils.imports import has_module, optional_import
+from roboflow_gap.utils.tools import listify
+
+from .gather_base import GatherBase
+
+if t.TYPE_CHECKING:
+    import aiohttp
+
+RETRY_STATUSES: t.Tuple[int, ...] = (408, 429, 500, 502, 503, 504)
+
+
+class UrlState(t.NamedTuple):
+    """Validators and content hash of the last response of a url."""
+
+    etag: t.Optional[str]
+    last_modified: t.Optional[str]
+    digest: str
+
+
+class FetchStats:
+    """Request and response counters for a GatherFromUrls."""
+
+    def __init__(self):
+        self.requests: int = 0
+        self.downloads: int = 0
+        self.not_modified: int = 0
+        self.unchanged: int = 0
+        self.retries: int = 0
+        self.errors: int = 0
+        self.bytes: int = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()})"
+
+    def to_dict(self) -> t.Dict[str, int]:
+        """Snapshot of the counters."""
+        return dict(vars(self))
+
+
+class RetryableStatus(Exception):
+    """Raised for a response status worth retrying."""
+
+    def __init__(self, status: int, retry_after: t.Optional[float] = None):
+        super().__init__(f"HTTP status {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after(value: t.Optional[str]) -> t.Optional[float]:
+    """Seconds to wait from a Retry-After header, in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+class GatherFromUrls(GatherBase):
+    """Gather image data from http and https urls over a pooled async HTTP client.
+
+    Requests share one aiohttp session, so connections are kept alive and reused, with at most
+    concurrency requests in flight and per_host of them to any one host. Failed requests and
+    retryable statuses are retried with exponential backoff and jitter, honoring Retry-After.
+    Bodies are streamed in chunks, rejected once they exceed max_bytes, and hashed as they
+    arrive, then decoded on the decode pool. The ETag and Last-Modified of each response are
+    sent back as If-None-Match and If-Modified-Since on the next poll, so an unchanged url costs
+    a 304 instead of a download and decode; bodies whose hash did not change are not decoded
+    either.
+    Needs the aiohttp package.
+    """
+
+    urls: t.Union[str, t.List[str]] = pydantic.Field(
+        description="The urls to gather images from.",
+    )
+    proxy: t.Optional[str] = pydantic.Field(
+        default=None,
+        description="Proxy url to send requests through.",
+    )
+    headers: t.Dict[str, str] = pydantic.Field(
+        default_factory=dict,
+        description="Extra headers sent with every request.",
+    )
+    watch: bool = pydantic.Field(
+        default=False,
+        description="If True, the urls are polled for changes every sleep seconds.",
+    )
+    sleep: float = pydantic.Field(
+        default=5.0,
+        description="The number of seconds to sleep between polls of the urls.",
+    )
+    concurrency: int = pydantic.Field(
+        default=16,
+        description="Maximum number of requests in flight, and of pooled connections.",
+    )
+    per_host: int = pydantic.Field(
+        default=4,
+        description="Maximum number of connections to a single host, 0 for no limit.",
+    )
+    timeout: float = pydantic.Field(
+        default=30.0,
+        description="Seconds a request may take in total, including reading the body.",
+    )
+    connect_timeout: float = pydantic.Field(
+        default=10.0,
+        description="Seconds to wait for a connection.",
+    )
+    retries: int = pydantic.Field(
+        default=3,
+        description="Number of times a failed request is retried.",
+    )
+    backoff: float = pydantic.Field(
+        default=0.5,
+        description="Seconds before the first retry, doubled for every further retry.",
+    )
+    conditional: bool = pydantic.Field(
+        default=True,
+        description="If True, send If-None-Match and If-Modified-Since when polling again.",
+    )
+    chunk_size: int = pydantic.Field(
+        default=64 * 1024,
+        description="Number of bytes read from a response body at once.",
+    )
+    max_bytes: int = pydantic.Field(
+        default=64 * 1024 * 1024,
+        description="Responses with a larger body are rejected.",
+    )
+    lazy_decode: bool = pydantic.Field(
+        default=False,
+        description=(
+            "If True, images are yielded as encoded bytes and decoded on first access to "
+            "ImageData.original, instead of on the decode pool."
+        ),
+    )
+    decode_scale: DecodeScale = pydantic.Field(
+        default=1,
+        description=(
+            "Decode images at 1/decode_scale of their size, 1, 2, 4 or 8; JPEGs decode directly "
+            "at the reduced size, which is much faster than decoding in full and resizing."
+        ),
+    )
+    decode_kind: ExecutorKind = pydantic.Field(
+        default="thread",
+        description="Pool type to decode images on, thread or process.",
+    )
+    decode_workers: t.Optional[int] = pydantic.Field(
+        default=None,
+        description="Number of decode workers, defaults to the number of CPUs.",
+    )
+
+    _states: t.Dict[str, UrlState] = pydantic.PrivateAttr(default_factory=dict)
+    _stats: FetchStats = pydantic.PrivateAttr(default_factory=FetchStats)
+    _decoder: t.Optional[StageExecutor] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        if not has_module("aiohttp"):
+            raise ImportError(f"{self.__class__.__name__} requires the aiohttp package")
+        self.urls: t.List[str] = [str(x) for x in listify(self.urls)]
+        self.concurrency = max(self.concurrency, 1)
+        self._decoder = StageExecutor(
+            name="decode",
+            kind=self.decode_kind,
+            workers=self.decode_workers,
+            max_in_flight=self.concurrency,
+        )
+
+    @property
+    def stats(self) -> FetchStats:
+        """Request and response counters."""
+        return self._stats
+
+    def build_session(self) -> "aiohttp.ClientSession":
+        """Create the pooled HTTP session shared by every request of a run."""
+        aiohttp = optional_import("aiohttp")
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency, limit_per_host=self.per_host, ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=self.headers,
+            auto_decompress=True,
+        )
+
+    async def run(self) -> t.AsyncIterator[ImageData]:
+        """An asynchronous generator yielding ImageData instances."""
+        self.start_limits()
+        async with self.build_session() as session:
+            while True:
+                async for image_data in self.poll(session):
+                    self._count += 1
+                    yield image_data
+                    if self.limit_reached():
+                        return
+
+                if not self.watch:
+                    self._logger.debug("Ending gather due to watch=False")
+                    return
+                await asyncio.sleep(self.sleep)
+                if self.limit_reached():
+                    return
+
+    async def poll(self, session: "aiohttp.ClientSession") -> t.AsyncIterator[ImageData]:
+        """Fetch every url once, yielding images in the order their downloads finish.
+
+        At most concurrency fetches are scheduled at once; urls that did not change since the
+        previous poll yield nothing.
+        """
+        urls = iter(self.urls)
+        pending: t.Set[asyncio.Future] = set()
+
+        def fill() -> None:
+            while len(pending) < self.concurrency:
+                url = next(urls, None)
+                if url is None:
+                    return
+                pending.add(asyncio.ensure_future(self.fetch(session, url)))
+
+        try:
+            fill()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                fill()
+                for task in done:
+                    image_data = task.result()
+                    if image_data is not None:
+                        yield image_data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def request_headers(self, url: str) -> t.Dict[str, str]:
+        """Conditional request headers for a url, from the validators of its last response."""
+        state = self._states.get(url)
+        if not self.conditional or state is None:
+            return {}
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        return headers
+
+    async def fetch(self, session: "aiohttp.ClientSession", url: str) -> t.Optional[ImageData]:
+        """Download and decode one url, retrying failures, or None if it has not changed."""
+        aiohttp = optional_import("aiohttp")
+        date_started = get_now()
+        started = get_monotonic()
+        context: t.Dict[str, t.Any] = {
+            "url": url,
+            "decode_scale": self.decode_scale,
+            "gatherer": self.__class__.__name__,
+        }
+        error = None
+        error_exc = None
+        original = None
+        encoded = None
+
+        for attempt in range(self.retries + 1):
+            context["attempts"] = attempt + 1
+            delay = None
+            try:
+                result = await self.download(session, url, context)
+                if result is None:
+                    return None
+                data, state = result
+                context["digest"] = state.digest
+                if self.lazy_decode:
+                    encoded = bytes(data)
+                else:
+                    original = await self._decoder.run(
+                        decode_image_bytes, data, self.decode_scale
+                    )
+                # only a body that decoded may make the next poll conditional, or skip it as
+                # unchanged, otherwise a bad body would be served from then on as a 304
+                self._states[url] = state
+                error = error_exc = None
+                break
+            except RetryableStatus as exc:
+                error, error_exc, delay = str(exc), exc, exc.retry_after
+            except aiohttp.ClientResponseError as exc:
+                # other error statuses will not go away by retrying
+                error, error_exc = f"HTTP status {exc.status}: {exc.message}", exc
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                error = f"{exc.__class__.__name__}: {exc}".rstrip(": ")
+                error_exc = exc
+            except Exception as exc:
+                error, error_exc = str(exc), exc
+                break
+
+            if attempt < self.retries:
+                self._stats.retries += 1
+                if delay is None:
+                    delay = self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+                self._logger.debug("Retrying url=%s in %.2fs after error=%s", url, delay, error)
+                await asyncio.sleep(delay)
+
+        if error is not None:
+            self._stats.errors += 1
+            error = f"Not loading image from url, error={error}, context={context}"
+            self._logger.error(error)
+
+        return ImageData(
+            original=original,
+            encoded=encoded,
+            date_started=date_started,
+            date_original_loaded=get_now(),
+            context=context,
+            timings={"started": started, "loaded": get_monotonic()},
+            error=error,
+            error_exc=error_exc,
+        )
+
+    async def download(
+        self, session: "aiohttp.ClientSession", url: str, context: t.Dict[str, t.Any]
+    ) -> t.Optional[t.Tuple[bytearray, UrlState]]:
+        """Stream a response body into a buffer, hashing it on the way.
+
+        Returns None for a 304, or for a body with the same hash as the previous download,
+        otherwise the body and the state to record for the url once it is decoded.
+        """
+        self._stats.requests += 1
+        async with session.get(url, headers=self.request_headers(url), proxy=self.proxy) as resp:
+            context["status"] = resp.status
+            if resp.status == 304:
+                self._stats.not_modified += 1
+                self._logger.debug("Not loading image from url, not modified context=%s", context)
+                return None
+            if resp.status in RETRY_STATUSES:
+                raise RetryableStatus(resp.status, retry_after(resp.headers.get("Retry-After")))
+            resp.raise_for_status()
+
+            length = resp.content_length
+            if length is not None and length > self.max_bytes:
+                raise ValueError(f"Response of {length} bytes exceeds max_bytes={self.max_bytes}")
+            data = bytearray()
+            hasher = hashlib.blake2b(digest_size=16)
+            async for chunk in resp.content.iter_chunked(self.chunk_size):
+                data += chunk
+                hasher.update(chunk)
+                if len(data) > self.max_bytes:
+                    raise ValueError(f"Response exceeds max_bytes={self.max_bytes}")
+            digest = hasher.hexdigest()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+
+        self._stats.downloads += 1
+        self._stats.bytes += len(data)
+        context["size"] = len(data)
+        state = UrlState(etag=etag, last_modified=last_modified, digest=digest)
+        previous = self._states.get(url)
+        if previous is not None and previous.digest == digest:
+            # same body under new validators, which the next poll should send
+            self._states[url] = state
+            self._stats.unchanged += 1
+            self._logger.debug("Not loading image from url, content unchanged context=%s", context)
+            return None
+        return data, state
+
@@ -0,0 +1,199 @@
+import pathlib
+import threading
+import typing as t
+
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_now
+from roboflow_gap.utils.frame_buffers import BufferClosed, FrameBuffer
+from roboflow_gap.utils.imports import has_module, optional_import
+from roboflow_gap.utils.paths import pathify
+
+from .gather_base import GatherBase
+from .gather_from_camera import CaptureFactory, open_capture
+
+# (frame, frame index, timestamp in seconds)
+Frame = t.Tuple[t.Any, int, float]
+
+
+class GatherFromVideo(GatherBase):
+    """Gather image data from a video file, decoding ahead on a background thread.
+
+    Frames are decoded into a bounded buffer, so decoding overlaps with analysis but never runs
+    more than buffer_size frames ahead. Frames between samples are grabbed without being
+    decoded, and keyframes_only skips decoding of every non-key frame altogether.
+    """
+
+    path: pathlib.Path = pydantic.Field(
+        description="The video file to gather frames from.",
+    )
+    stride: int = pydantic.Field(
+        default=1,
+        description="Yield every stride-th frame.",
+    )
+    target_fps: t.Optional[float] = pydantic.Field(
+        default=None,
+        description="Sample frames at about this rate instead of using stride.",
+    )
+    start_seconds: t.Optional[float] = pydantic.Field(
+        default=None,
+        description="Seek to this position before gathering.",
+    )
+    end_seconds: t.Optional[float] = pydantic.Field(
+        default=None,
+        description="Stop gathering at this position.",
+    )
+    keyframes_only: bool = pydantic.Field(
+        default=False,
+        description=(
+            "If True, only decode keyframes at least stride, or target_fps, frames apart; this "
+            "needs the av package."
+        ),
+    )
+    buffer_size: int = pydantic.Field(
+        default=32,
+        description="Maximum number of frames decoded ahead of the consumer.",
+    )
+    capture_factory: CaptureFactory = pydantic.Field(
+        default=open_capture,
+        exclude=True,
+        description="Callable returning a cv2.VideoCapture-like object for path.",
+    )
+
+    _buffer: t.Optional[FrameBuffer] = pydantic.PrivateAttr(default=None)
+    _fps: float = pydantic.PrivateAttr(default=0.0)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self.path = pathify(path=self.path, as_file=True)
+        if self.keyframes_only and not has_module("av"):
+            raise ImportError("keyframes_only=True requires the av package")
+
+    def get_stride(self, fps: float) -> int:
+        """Number of source frames per yielded frame."""
+        if self.target_fps and fps:
+            return max(int(round(fps / self.target_fps)), 1)
+        return max(self.stride, 1)
+
+    async def run(self) -> t.AsyncIterator[ImageData]:
+        """An asynchronous generator yielding ImageData instances."""
+        self.start_limits()
+        self._buffer = FrameBuffer(maxsize=self.buffer_size, drop_oldest=False)
+        stop = threading.Event()
+        target = self.decode_keyframes if self.keyframes_only else self.decode
+        thread = threading.Thread(
+            target=target, args=(stop,), name=f"gap-video-{self.path.name}", daemon=True
+        )
+        thread.start()
+
+        try:
+            while True:
+                try:
+                    frame, index, timestamp = await self._buffer.get()
+                except BufferClosed:
+                    self._logger.debug("Ending gather, end of video path=%s", self.path)
+                    return
+
+                context = {
+                    "path": self.path,
+                    "frame_index": index,
+                    "timestamp": timestamp,
+                    "fps": self._fps,
+                    "gatherer": self.__class__.__name__,
+                }
+                self._count += 1
+                yield ImageData(
+                    original=frame,
+                    date_started=get_now(),
+                    date_original_loaded=get_now(),
+                    context=context,
+                )
+                if self.limit_reached():
+                    return
+        finally:
+            stop.set()
+            self._buffer.close()
+            self._buffer.clear()
+            thread.join(timeout=5)
+
+    def put(self, frame: Frame, stop: threading.Event) -> bool:
+        """Put a frame into the buffer, waiting for room until stopped."""
+        while not stop.is_set():
+            if self._buffer.put(frame, timeout=0.1):
+                return True
+            if self._buffer.closed:
+                return False
+        return False
+
+    def decode(self, stop: threading.Event) -> None:
+        """Decode thread using opencv, grabbing frames between samples without decoding them."""
+        import cv2
+
+        cap = self.capture_factory(str(self.path))
+        try:
+            self._fps = float(cap.get(cv2.CAP_PROP_FPS) or 0) or 30.0
+            stride = self.get_stride(self._fps)
+            index = 0
+            if self.start_seconds:
+                cap.set(cv2.CAP_PROP_POS_MSEC, self.start_seconds * 1000)
+                index = int(cap.get(cv2.CAP_PROP_POS_FRAMES) or 0)
+
+            while not stop.is_set():
+                timestamp = index / self._fps
+                if self.end_seconds is not None and timestamp > self.end_seconds:
+                    return
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                if not self.put((frame, index, timestamp), stop):
+                    return
+                for _ in range(stride - 1):
+                    if not cap.grab():
+                        return
+                index += stride
+        except Exception:
+            self._logger.exception("Decoding failed for path=%s", self.path)
+        finally:
+            cap.release()
+            self._buffer.close()
+
+    def decode_keyframes(self, stop: threading.Event) -> None:
+        """Decode thread using PyAV, asking the decoder to skip every non-key frame."""
+        av = optional_import("av")
+        try:
+            with av.open(str(self.path)) as container:
+                stream = container.streams.video[0]
+                stream.codec_context.skip_frame = "NONKEY"
+                self._fps = float(stream.average_rate or 0) or 30.0
+                stride = self.get_stride(self._fps)
+                if self.start_seconds:
+                    container.seek(
+                        int(self.start_seconds / stream.time_base), stream=stream, backward=True
+                    )
+
+                due = None
+                for frame in container.decode(stream):
+                    if stop.is_set():
+                        return
+                    if not frame.key_frame:
+                        # not every codec honours skip_frame
+                        continue
+                    timestamp = float(frame.time or 0.0)
+                    if self.start_seconds and timestamp < self.start_seconds:
+                        continue
+                    if self.end_seconds is not None and timestamp > self.end_seconds:
+                        return
+                    index = int(round(timestamp * self._fps))
+                    # keyframes are irregular, keep those at least stride source frames apart
+                    if due is not None and index < due:
+                        continue
+                    due = index + stride
+                    image = frame.to_ndarray(format="bgr24")
+                    if not self.put((image, index, timestamp), stop):
+                        return
+        except Exception:
+            self._logger.exception("Decoding keyframes failed for path=%s", self.path)
+        finally:
+            self._buffer.close()
@@ -0,0 +1,197 @@
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import typing as t
+
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.utils.paths import pathify
+
+ManifestState = t.Literal["pending", "done", "error"]
+
+
+class ManifestEntry(t.NamedTuple):
+    """What the manifest knows about one file."""
+
+    path: str
+    size: t.Optional[int]
+    mtime_ns: t.Optional[int]
+    digest: t.Optional[str]
+    state: str
+    result: t.Optional[str]
+    updated: float
+
+
+class Manifest:
+    """Persistent SQLite record of every gathered file and how far its processing got.
+
+    Gatherers skip files whose size and modification time match an entry that is already done,
+    so a restarted or repeated run only loads new or modified files. Writes are buffered and
+    committed in one transaction every checkpoint_seconds or checkpoint_rows writes, so a crash
+    loses at most the last checkpoint interval, which is then simply processed again. A background
+    thread checkpoints on time, so buffered writes are committed even when no new writes arrive.
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        checkpoint_seconds: float = 5.0,
+        checkpoint_rows: int = 1000,
+    ):
+        self.path: pathlib.Path = pathify(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.checkpoint_rows = checkpoint_rows
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._lock = threading.Lock()
+        self._pending: t.Dict[str, ManifestEntry] = {}
+        self._last_checkpoint = time.monotonic()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, "
+            "state TEXT NOT NULL, result TEXT, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_state ON files (state)")
+        self._conn.commit()
+        self._closing = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+        if checkpoint_seconds > 0:
+            self._thread = threading.Thread(
+                target=self.checkpoint_periodically, name="gap-manifest", daemon=True
+            )
+            self._thread.start()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={str(self.path)!r}, pending={len(self._pending)})"
+
+    def get(self, path: PathLike) -> t.Optional[ManifestEntry]:
+        """The entry for a path, including writes not checkpointed yet."""
+        key = str(path)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is not None:
+                return entry
+            row = self._conn.execute(
+                "SELECT path, size, mtime_ns, digest, state, result, updated "
+                "FROM files WHERE path = ?",
+                (key,),
+            ).fetchone()
+        return ManifestEntry(*row) if row is not None else None
+
+    def is_done(self, path: PathLike, size: t.Optional[int], mtime_ns: t.Optional[int]) -> bool:
+        """If a path was processed and its size and modification time have not changed since."""
+        entry = self.get(path)
+        return (
+            entry is not None
+            and entry.state == "done"
+            and entry.size == size
+            and entry.mtime_ns == mtime_ns
+        )
+
+    def done_signatures(self, directory: PathLike) -> t.Dict[str, t.Tuple[int, int]]:
+        """The (size, mtime_ns) of every done path under a directory, read in one query."""
+        prefix = os.path.join(str(directory), "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns FROM files "
+                "WHERE path >= ? AND path < ? AND state = 'done'",
+                # every path starting with prefix sorts between prefix and prefix + U+10FFFF
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+            pending = [x for x in self._pending.values() if x.path.startswith(prefix)]
+        done = {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+        for entry in pending:
+            if entry.state == "done":
+                done[entry.path] = (entry.size, entry.mtime_ns)
+            else:
+                done.pop(entry.path, None)
+        return done
+
+    def done_digest(self, path: PathLike) -> t.Optional[str]:
+        """Content hash of a path's last processed version, if it was processed."""
+        entry = self.get(path)
+        return entry.digest if entry is not None and entry.state == "done" else None
+
+    def mark(  # noqa: PLR0913
+        self,
+        path: PathLike,
+        state: ManifestState,
+        size: t.Optional[int] = None,
+        mtime_ns: t.Optional[int] = None,
+        digest: t.Optional[str] = None,
+        result: t.Optional[str] = None,
+    ) -> None:
+        """Record the state of a path, keeping known values of fields that are not given."""
+        previous = self.get(path)
+        if previous is not None:
+            size = previous.size if size is None else size
+            mtime_ns = previous.mtime_ns if mtime_ns is None else mtime_ns
+            digest = previous.digest if digest is None else digest
+            result = previous.result if result is None else result
+        entry = ManifestEntry(
+            path=str(path),
+            size=size,
+            mtime_ns=mtime_ns,
+            digest=digest,
+            state=state,
+            result=result,
+            updated=time.time(),
+        )
+        with self._lock:
+            self._pending[entry.path] = entry
+        self.maybe_checkpoint()
+
+    def maybe_checkpoint(self) -> bool:
+        """Checkpoint if enough writes are buffered or enough time has passed."""
+        if len(self._pending) >= self.checkpoint_rows or (
+            self._pending and time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+        ):
+            self.checkpoint()
+            return True
+        return False
+
+    def checkpoint_periodically(self) -> None:
+        """Checkpoint every checkpoint_seconds until closed."""
+        while not self._closing.wait(self.checkpoint_seconds):
+            try:
+                self.maybe_checkpoint()
+            except sqlite3.Error:
+                self.logger.exception("Could not checkpoint manifest at %s", self.path)
+
+    def checkpoint(self) -> int:
+        """Commit every buffered write in one transaction, returning how many were written."""
+        with self._lock:
+            self._last_checkpoint = time.monotonic()
+            if not self._pending:
+                return 0
+            rows = list(self._pending.values())
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files "
+                    "(path, size, mtime_ns, digest, state, result, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            self._pending.clear()
+        return len(rows)
+
+    def counts(self) -> t.Dict[str, int]:
+        """Number of checkpointed paths per state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM files GROUP BY state")
+            return dict(rows.fetchall())
+
+    def close(self) -> None:
+        """Stop the checkpoint thread, checkpoint buffered writes and close the connection."""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.checkpoint()
+        with self._lock:
+            self._conn.close()
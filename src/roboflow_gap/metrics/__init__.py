@@ -0,0 +1,14 @@
+from .exporters import MetricsServer, dump_metrics, dump_metrics_periodically
+from .profiling import StageProfiler
+from .registry import DEFAULT_BUCKETS, Counter, Histogram, Registry
+
+__all__ = [
+    "DEFAULT_BUCKETS",
+    "Counter",
+    "Histogram",
+    "Registry",
+    "MetricsServer",
+    "dump_metrics",
+    "dump_metrics_periodically",
+    "StageProfiler",
+]
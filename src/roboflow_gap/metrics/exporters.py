@@ -0,0 +1,97 @@
+import asyncio
+import http.server
+import logging
+import os
+import threading
+import typing as t
+
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.utils.paths import pathify
+
+from .registry import Registry
+
+CONTENT_TYPE: str = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class MetricsServer:
+    """Serve a registry in the OpenMetrics text format over HTTP, on a background thread."""
+
+    def __init__(self, registry: Registry, host: str = "127.0.0.1", port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._server: t.Optional[http.server.ThreadingHTTPServer] = None
+        self._thread: t.Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(self, *exc: t.Any) -> None:
+        self.stop()
+
+    @property
+    def address(self) -> t.Tuple[str, int]:
+        """Host and port being served, the port is resolved if 0 was given."""
+        if self._server is None:
+            return self.host, self.port
+        return self._server.server_address[:2]
+
+    def start(self) -> "MetricsServer":
+        """Start serving /metrics."""
+        registry = self.registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: t.Any) -> None:  # noqa: A002
+                pass
+
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="gap-metrics", daemon=True
+        )
+        self._thread.start()
+        self.logger.info("Serving metrics on http://%s:%s/metrics", *self.address)
+        return self
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def dump_metrics(registry: Registry, path: PathLike) -> None:
+    """Write a registry in the OpenMetrics text format, replacing the file atomically."""
+    path = pathify(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(registry.render(), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def dump_metrics_periodically(
+    registry: Registry, path: PathLike, interval: float = 10.0
+) -> None:
+    """Dump a registry to a file every interval seconds, and once more when cancelled."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(dump_metrics, registry, path)
+    finally:
+        dump_metrics(registry, path)
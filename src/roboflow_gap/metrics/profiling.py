@@ -0,0 +1,101 @@
+import cProfile
+import contextlib
+import io
+import logging
+import pstats
+import random
+import threading
+import typing as t
+
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.utils.paths import pathify
+
+
+class StageProfiler:
+    """Sample cProfile runs of pipeline stage work, aggregated per stage.
+
+    A fraction sample_rate of stage calls run under cProfile. Only one profile is active at a
+    time, since the interpreter allows a single profiler. Stage work is awaited, so a sampled
+    profile also includes whatever else the event loop ran meanwhile; read it as where time went
+    while the stage was busy.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.01,
+        stages: t.Optional[t.Iterable[str]] = None,
+        seed: t.Optional[int] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.stages = set(stages) if stages is not None else None
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._random = random.Random(seed)
+        self._active = threading.Lock()
+        self._stats: t.Dict[str, pstats.Stats] = {}
+        self._samples: t.Dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(sample_rate={self.sample_rate}, samples={self._samples})"
+
+    @property
+    def samples(self) -> t.Dict[str, int]:
+        """Number of profiled calls per stage."""
+        return dict(self._samples)
+
+    def should_sample(self, stage: str) -> bool:
+        """If the next call of a stage should be profiled."""
+        if self.stages is not None and stage not in self.stages:
+            return False
+        return self.sample_rate > 0 and self._random.random() < self.sample_rate
+
+    @contextlib.contextmanager
+    def sample(self, stage: str) -> t.Iterator[None]:
+        """Maybe profile the enclosed stage work."""
+        if not self.should_sample(stage) or not self._active.acquire(blocking=False):
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is already active
+            self._active.release()
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active.release()
+            self.add(stage, profile)
+
+    def add(self, stage: str, profile: cProfile.Profile) -> None:
+        """Merge a finished profile into the stage's aggregate."""
+        if stage in self._stats:
+            self._stats[stage].add(profile)
+        else:
+            self._stats[stage] = pstats.Stats(profile)
+        self._samples[stage] = self._samples.get(stage, 0) + 1
+
+    def report(self, stage: str, sort: str = "cumulative", limit: int = 25) -> str:
+        """Text report of a stage's aggregated profile."""
+        stats = self._stats.get(stage)
+        if stats is None:
+            return ""
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self, directory: PathLike) -> t.List[str]:
+        """Write each stage's aggregated profile as <stage>.prof, for pstats or snakeviz."""
+        directory = pathify(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for stage, stats in self._stats.items():
+            path = directory / f"{stage}.prof"
+            stats.dump_stats(str(path))
+            paths.append(str(path))
+        self.logger.debug("Dumped %d stage profiles to %s", len(paths), directory)
+        return paths
@@ -0,0 +1,247 @@
+import math
+import threading
+import typing as t
+
+# Default histogram buckets, in seconds, from sub-millisecond work up to slow model calls.
+DEFAULT_BUCKETS: t.Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = t.Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    """Format a sample value the way OpenMetrics expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: t.Sequence[str], values: t.Sequence[str]) -> str:
+    """Format a label set as {name="value",...}, or nothing if there are no labels."""
+    if not names:
+        return ""
+    escaped = (
+        str(x).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for x in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class CounterValue:
+    """A monotonically increasing value for one label set."""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value: float = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the counter."""
+        with self._lock:
+            self.value += amount
+
+
+class HistogramValue:
+    """Bucketed observations for one label set."""
+
+    __slots__ = ("_lock", "buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: t.Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts: t.List[int] = [0] * len(self.buckets)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+    def snapshot(self) -> t.Tuple[t.List[int], float, int]:
+        """Cumulative bucket counts, sum and count at one point in time."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class Metric:
+    """A named metric family with a value per label set."""
+
+    kind: str = ""
+
+    def __init__(self, name: str, help: str, labelnames: t.Sequence[str] = ()):  # noqa: A002
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: t.Dict[LabelValues, t.Any] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r}, labelnames={self.labelnames})"
+
+    def new_value(self) -> t.Any:
+        """Create the value for a new label set."""
+        raise NotImplementedError
+
+    def labels(self, *values: t.Any, **kwargs: t.Any) -> t.Any:
+        """The value for a label set, created on first use."""
+        if kwargs:
+            values = tuple(kwargs[x] for x in self.labelnames)
+        key = tuple(str(x) for x in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"Expected labels {self.labelnames} for {self.name}, got {key}")
+        value = self._values.get(key)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(key, self.new_value())
+        return value
+
+    def items(self) -> t.List[t.Tuple[LabelValues, t.Any]]:
+        """Label sets and their values."""
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> t.List[str]:
+        """Lines of the OpenMetrics text exposition for this family."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Counter metric, exposed with a _total suffix."""
+
+    kind = "counter"
+
+    def new_value(self) -> CounterValue:
+        """Create the value for a new label set."""
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0, **labels: t.Any) -> None:
+        """Increase the counter for a label set."""
+        self.labels(**labels).inc(amount)
+
+    def render(self) -> t.List[str]:
+        """Lines of the OpenMetrics text exposition for this family."""
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.help}"]
+        for key, value in self.items():
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_total{labels} {format_value(value.value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """Histogram metric with fixed bucket upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labelnames: t.Sequence[str] = (),
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name=name, help=help, labelnames=labelnames)
+        self.buckets = tuple(sorted(float(x) for x in buckets if not math.isinf(x)))
+
+    def new_value(self) -> HistogramValue:
+        """Create the value for a new label set."""
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float, **labels: t.Any) -> None:
+        """Record one observation for a label set."""
+        self.labels(**labels).observe(value)
+
+    def render(self) -> t.List[str]:
+        """Lines of the OpenMetrics text exposition for this family."""
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.help}"]
+        names = (*self.labelnames, "le")
+        for key, value in self.items():
+            cumulative, total, count = value.snapshot()
+            for bound, running in zip((*self.buckets, math.inf), (*cumulative, count)):
+                labels = format_labels(names, (*key, format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """A set of metric families, rendered together in the OpenMetrics text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: t.Dict[str, Metric] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(metrics={list(self._metrics)})"
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric family, or return the existing family of the same name and kind."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+            raise ValueError(f"Metric {metric.name} already registered as {existing!r}")
+        return existing
+
+    def counter(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labelnames: t.Sequence[str] = (),
+    ) -> Counter:
+        """Get or create a counter family."""
+        return self.register(Counter(name=name, help=help, labelnames=labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labelnames: t.Sequence[str] = (),
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram family."""
+        return self.register(
+            Histogram(name=name, help=help, labelnames=labelnames, buckets=buckets)
+        )
+
+    def get(self, name: str) -> t.Optional[Metric]:
+        """A registered metric family by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """The OpenMetrics text exposition of every registered family."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.render()]
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
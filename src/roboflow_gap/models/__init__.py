@@ -1,3 +1,16 @@
-from . import custom_types, image_data
+import importlib
+import typing as t
+
+if t.TYPE_CHECKING:
+    from . import custom_types, image_data
 
 __all__ = ["image_data", "custom_types"]
+
+
+def __getattr__(name: str) -> t.Any:
+    # image_data imports utils, which imports custom_types, so submodules load on first access
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
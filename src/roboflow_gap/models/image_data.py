@@ -1,50 +1,184 @@
 import datetime
+import sys
 import typing as t
 
-import cv2
-from pydantic import BaseModel, Field
+from roboflow_gap.utils.dates import get_monotonic
+from roboflow_gap.utils.images import decode_image_bytes
+from roboflow_gap.utils.shared_frames import FrameHandle, SharedFrameRing
 
+if t.TYPE_CHECKING:
+    import cv2
 
-class ImageData(BaseModel):
-    """Dataclass for image data."""
 
-    original: t.Optional[cv2.typing.MatLike] = Field(
-        default=None,
-        description="Original image frame.",
-    )
-    processed: t.Optional[cv2.typing.MatLike] = Field(
-        default=None,
-        description="Processed image frame.",
-    )
-    context: t.Optional[t.Dict[str, t.Any]] = Field(
-        default_factory=dict,
-        description="Context of the original image frame.",
-    )
-    analysis: t.Optional[t.Dict[str, t.Any]] = Field(
-        default_factory=dict,
-        description="Analysis results.",
-    )
-    date_started: t.Optional[datetime.datetime] = Field(
-        default=None,
-        description="Datetime the original image started loading.",
-    )
-    date_original_loaded: t.Optional[datetime.datetime] = Field(
-        default=None,
-        description="Datetime the original image finished loading.",
-    )
-    date_analyze_done: t.Optional[datetime.datetime] = Field(
-        default=None,
-        description="Datetime the original image finished analyzing.",
-    )
-    date_process_done: t.Optional[datetime.datetime] = Field(
-        default=None,
-        description="Datetime the processed image was finished.",
-    )
-    error: t.Optional[str] = Field(
-        default=None,
-        description="Error message.",
-    )
-    error_exc: t.Optional[Exception] = Field(
-        default=None,
-        description="Exception instance.",
+class ImageData:
+    """Record for a single image moving through gather, analyze and process.
+
+    A slotted class rather than a pydantic model, since one is created per frame and field
+    validation showed up in per-frame cost. The original frame can be held as encoded bytes and
+    decoded on first access, and released once no later stage needs it.
+    """
+
+    __slots__ = (
+        "_original",
+        "encoded",
+        "processed",
+        "context",
+        "analysis",
+        "date_started",
+        "date_original_loaded",
+        "date_analyze_done",
+        "date_process_done",
+        "error",
+        "error_exc",
+        "handle",
+        "timings",
     )
+
+    def __init__(  # noqa: PLR0913
+        self,
+        original: t.Optional["cv2.typing.MatLike"] = None,
+        encoded: t.Optional[bytes] = None,
+        processed: t.Optional["cv2.typing.MatLike"] = None,
+        context: t.Optional[t.Dict[str, t.Any]] = None,
+        analysis: t.Optional[t.Dict[str, t.Any]] = None,
+        date_started: t.Optional[datetime.datetime] = None,
+        date_original_loaded: t.Optional[datetime.datetime] = None,
+        date_analyze_done: t.Optional[datetime.datetime] = None,
+        date_process_done: t.Optional[datetime.datetime] = None,
+        error: t.Optional[str] = None,
+        error_exc: t.Optional[Exception] = None,
+        handle: t.Optional[FrameHandle] = None,
+        timings: t.Optional[t.Dict[str, float]] = None,
+    ):
+        # Original image frame, decoded from encoded on first access if not given.
+        self._original = original
+        # Encoded bytes of the original image frame.
+        self.encoded = encoded
+        # Processed image frame.
+        self.processed = processed
+        # Context of the original image frame.
+        self.context: t.Dict[str, t.Any] = context if context is not None else {}
+        # Analysis results.
+        self.analysis: t.Dict[str, t.Any] = analysis if analysis is not None else {}
+        # Datetime the original image started loading.
+        self.date_started = date_started
+        # Datetime the original image finished loading.
+        self.date_original_loaded = date_original_loaded
+        # Datetime the original image finished analyzing.
+        self.date_analyze_done = date_analyze_done
+        # Datetime the processed image was finished.
+        self.date_process_done = date_process_done
+        # Error message.
+        self.error = error
+        # Exception instance.
+        self.error_exc = error_exc
+        # Shared memory handle of the original image frame.
+        self.handle = handle
+        # Monotonic clock readings of when the image reached each stage, keyed by stage name.
+        self.timings: t.Dict[str, float] = (
+            timings if timings is not None else {"loaded": get_monotonic()}
+        )
+
+    def __repr__(self) -> str:
+        shape = getattr(self._original, "shape", None)
+        return (
+            f"{self.__class__.__name__}(original={shape}, "
+            f"encoded={len(self.encoded) if self.encoded is not None else None}, "
+            f"context={self.context}, error={self.error!r})"
+        )
+
+    @property
+    def original(self) -> t.Optional["cv2.typing.MatLike"]:
+        """Original image frame, decoding the encoded bytes on first access."""
+        if self._original is None and self.encoded is not None:
+            self._original = decode_image_bytes(
+                self.encoded, scale=self.context.get("decode_scale", 1)
+            )
+        return self._original
+
+    @original.setter
+    def original(self, value: t.Optional["cv2.typing.MatLike"]) -> None:
+        self._original = value
+
+    @property
+    def source(self) -> str:
+        """Where the image came from: its path, url or camera, from the context."""
+        for key in ("path", "url", "camera"):
+            value = self.context.get(key)
+            if value is not None:
+                return str(value)
+        return str(self.context.get("gatherer", ""))
+
+    @property
+    def is_decoded(self) -> bool:
+        """If the original image frame is in memory, without triggering a decode."""
+        return self._original is not None
+
+    @property
+    def has_original(self) -> bool:
+        """If an original image frame is available in any form, without triggering a decode."""
+        return self._original is not None or self.encoded is not None or self.handle is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by this record, including its frames."""
+        size = sys.getsizeof(self)
+        for value in (self._original, self.processed):
+            size += getattr(value, "nbytes", 0)
+        if self.encoded is not None:
+            size += len(self.encoded)
+        return size
+
+    def mark(self, stage: str, at: t.Optional[float] = None) -> "ImageData":
+        """Record the monotonic clock reading of when the image finished a stage."""
+        self.timings[stage] = get_monotonic() if at is None else at
+        return self
+
+    def durations(self) -> t.Dict[str, float]:
+        """Seconds spent reaching each stage since the previous one, in stage order."""
+        marks = sorted(self.timings.items(), key=lambda x: x[1])
+        return {name: at - marks[index][1] for index, (name, at) in enumerate(marks[1:])}
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds between the first and the last recorded stage."""
+        if not self.timings:
+            return 0.0
+        return max(self.timings.values()) - min(self.timings.values())
+
+    def get_original(self) -> t.Optional["cv2.typing.MatLike"]:
+        """Original image frame, mapped from shared memory if it was moved there."""
+        if self._original is None and self.encoded is None and self.handle is not None:
+            return self.handle.view()
+        return self.original
+
+    def release_original(self, keep_encoded: bool = True) -> "ImageData":
+        """Drop the decoded original image frame once no later stage needs it.
+
+        If keep_encoded is True the encoded bytes are kept, so the frame can still be decoded
+        again on access.
+        """
+        self._original = None
+        if not keep_encoded:
+            self.encoded = None
+        return self
+
+    def share(self, ring: SharedFrameRing, timeout: t.Optional[float] = None) -> "ImageData":
+        """Move the original image frame into a shared memory ring slot, keeping only a handle.
+
+        Pickling the instance afterwards, e.g. to send it to a worker process, no longer copies
+        the frame.
+        """
+        original = self.original
+        if original is not None:
+            self.handle = ring.put(original, timeout=timeout)
+            self._original = None
+            self.encoded = None
+        return self
+
+    def release(self, ring: SharedFrameRing) -> "ImageData":
+        """Return the shared memory slot of the original image frame to its ring."""
+        if self.handle is not None:
+            ring.release(self.handle)
+            self.handle = None
+        return self
@@ -0,0 +1,5 @@
+from .pipeline import Pipeline, Stage
+from .queues import OverflowPolicy, QueueClosed, StageQueue
+from .stats import StageStats
+
+__all__ = ["Pipeline", "Stage", "StageQueue", "StageStats", "QueueClosed", "OverflowPolicy"]
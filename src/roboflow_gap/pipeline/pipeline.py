@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import time
+import typing as t
+
+from roboflow_gap.metrics.exporters import dump_metrics_periodically
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import get_now
+
+from .queues import OverflowPolicy, QueueClosed, StageQueue
+from .stats import StageStats
+
+if t.TYPE_CHECKING:
+    from roboflow_gap.analyze import Analyze, Preprocess, ShardedAnalyze
+    from roboflow_gap.gather.gather_base import GatherBase
+    from roboflow_gap.metrics.profiling import StageProfiler
+    from roboflow_gap.metrics.registry import Registry
+    from roboflow_gap.process.process_base import ProcessBase
+
+Handler = t.Callable[[t.List[ImageData]], t.Awaitable[t.List[ImageData]]]
+
+
+class Stage:
+    """A named pipeline step and how many workers run it."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        handler: Handler,
+        workers: int = 1,
+        batch_size: int = 1,
+        max_wait_ms: float = 0.0,
+        on_close: t.Optional[t.Callable[[], t.Awaitable[None]]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(int(workers), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.max_wait_ms = max_wait_ms
+        self.on_close = on_close
+        self.stats = StageStats(name=name)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r}, workers={self.workers})"
+
+
+class Pipeline:
+    """Drive a gatherer through the preprocess, analyzer and process stages over bounded queues.
+
+    Every stage reads from its own bounded StageQueue, so a slow stage fills its queue and
+    throttles everything upstream of it instead of buffering frames without limit.
+
+    With a metrics registry, per-stage item, error and drop counters and work, queue wait and
+    latency histograms are recorded into it, along with the end to end latency of every item,
+    and optionally dumped to metrics_path every metrics_interval seconds. With a profiler, stage
+    work is sampled under cProfile.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        gatherer: "GatherBase",
+        analyzer: t.Optional[t.Union["Analyze", "ShardedAnalyze"]] = None,
+        processors: t.Sequence["ProcessBase"] = (),
+        queue_size: int = 32,
+        overflow: OverflowPolicy = "block",
+        analyze_workers: int = 1,
+        process_workers: int = 1,
+        report_interval: t.Optional[float] = None,
+        release_after_analyze: bool = False,
+        preprocess: t.Optional["Preprocess"] = None,
+        metrics: t.Optional["Registry"] = None,
+        metrics_path: t.Optional[PathLike] = None,
+        metrics_interval: float = 10.0,
+        profiler: t.Optional["StageProfiler"] = None,
+    ):
+        self.gatherer = gatherer
+        self.preprocess = preprocess
+        self.analyzer = analyzer
+        self.processors = list(processors)
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.report_interval = report_interval
+        self.metrics = metrics
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.profiler = profiler
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self.gather_stats = StageStats(name="gather")
+        self._item_latency = None
+        if metrics is not None:
+            self.gather_stats.bind_metrics(metrics)
+            self._item_latency = metrics.histogram(
+                "gap_item_latency_seconds", "Seconds from gathering an item to it leaving."
+            ).labels()
+        self.stages: t.List[Stage] = []
+        self._queues: t.List[StageQueue] = []
+        self._stopping: t.Optional[asyncio.Event] = None
+
+        if preprocess is not None:
+            self.add_stage(
+                Stage(
+                    name="preprocess",
+                    handler=preprocess.preprocess_batch,
+                    batch_size=preprocess.max_batch_size,
+                    max_wait_ms=preprocess.max_wait_ms,
+                )
+            )
+        if analyzer is not None:
+            self.add_stage(
+                Stage(
+                    name="analyze",
+                    handler=self.build_analyze_handler(
+                        analyzer,
+                        release=release_after_analyze,
+                        on_latency=gatherer.report_latency,
+                        workers=analyze_workers,
+                    ),
+                    workers=analyze_workers,
+                    batch_size=analyzer.max_batch_size,
+                    max_wait_ms=analyzer.max_wait_ms,
+                    on_close=getattr(analyzer, "close", None),
+                )
+            )
+        for index, processor in enumerate(self.processors):
+            processor.set_upstream(self.processors[:index])
+            processor.set_downstream(self.processors[index + 1 :])
+            self.add_stage(
+                Stage(
+                    name=f"process.{processor.__class__.__name__}",
+                    handler=self.build_process_handler(processor),
+                    workers=process_workers,
+                    batch_size=processor.max_batch_size,
+                    max_wait_ms=processor.max_wait_ms,
+                    on_close=processor.close,
+                )
+            )
+
+    def add_stage(self, stage: Stage) -> Stage:
+        """Append a stage, making its name unique among the existing stages."""
+        names = {x.name for x in self.stages}
+        base, index = stage.name, 1
+        while stage.name in names:
+            index += 1
+            stage.name = stage.stats.name = f"{base}.{index}"
+        if self.metrics is not None:
+            stage.stats.bind_metrics(self.metrics)
+        self.stages.append(stage)
+        return stage
+
+    @staticmethod
+    def build_analyze_handler(
+        analyzer: t.Union["Analyze", "ShardedAnalyze"],
+        release: bool = False,
+        on_latency: t.Optional[t.Callable[[float], None]] = None,
+        workers: int = 1,
+    ) -> Handler:
+        """Wrap the analyzer, optionally dropping decoded frames once they are analyzed.
+
+        on_latency is called after every batch with the seconds spent per frame, across workers,
+        so gatherers such as GatherFromCamera can skip frames the analyzer could not keep up with.
+        """
+        if not release and on_latency is None:
+            return analyzer.analyze_batch
+
+        async def handler(images: t.List[ImageData]) -> t.List[ImageData]:
+            started = time.monotonic()
+            images = await analyzer.analyze_batch(images)
+            if on_latency is not None and images:
+                on_latency((time.monotonic() - started) / len(images) / max(workers, 1))
+            if release:
+                images = [x.release_original() for x in images]
+            return images
+
+        return handler
+
+    @staticmethod
+    def build_process_handler(processor: "ProcessBase") -> Handler:
+        """Wrap a processor's process_batch method, stamping when processing finished."""
+
+        async def handler(images: t.List[ImageData]) -> t.List[ImageData]:
+            images = await processor.process_batch(images)
+            date_done = get_now()
+            for image_data in images:
+                image_data.date_process_done = date_done
+            return images
+
+        return handler
+
+    def stop(self) -> None:
+        """Stop gathering and let every item already in flight drain through the stages."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def stats(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """Per-stage throughput, error and queue depth snapshot."""
+        stats = {"gather": self.gather_stats.to_dict()}
+        for index, stage in enumerate(self.stages):
+            depth = self._queues[index].depth if index < len(self._queues) else None
+            stats[stage.name] = stage.stats.to_dict(queue_depth=depth)
+        return stats
+
+    async def run(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """Run the pipeline until the gatherer is exhausted or stopped, returning its stats."""
+        async for _ in self.stream():
+            pass
+        return self.stats()
+
+    async def stream(self) -> t.AsyncIterator[ImageData]:
+        """Run the pipeline, yielding items as they leave the last stage."""
+        self._stopping = asyncio.Event()
+        self._queues = [
+            StageQueue(
+                name=stage.name, maxsize=self.queue_size, overflow=self.overflow, stats=stage.stats
+            )
+            for stage in self.stages
+        ]
+        output: StageQueue = StageQueue(name="output", maxsize=self.queue_size, overflow="block")
+        queues = [*self._queues, output]
+        consumers = [x.workers for x in self.stages] + [1]
+
+        workers = [
+            asyncio.create_task(self._gather(outbox=queues[0], consumers=consumers[0])),
+            *[
+                asyncio.create_task(
+                    self._run_stage(
+                        stage=stage,
+                        inbox=queues[index],
+                        outbox=queues[index + 1],
+                        consumers=consumers[index + 1],
+                    )
+                )
+                for index, stage in enumerate(self.stages)
+            ],
+        ]
+        tasks = list(workers)
+        if self.report_interval:
+            tasks.append(asyncio.create_task(self._report()))
+        if self.metrics is not None and self.metrics_path is not None:
+            tasks.append(
+                asyncio.create_task(
+                    dump_metrics_periodically(
+                        self.metrics, self.metrics_path, interval=self.metrics_interval
+                    )
+                )
+            )
+
+        drained = False
+        try:
+            while True:
+                try:
+                    item = await output.get()
+                except QueueClosed:
+                    drained = True
+                    break
+                if self._item_latency is not None and item.timings:
+                    self._item_latency.observe(time.monotonic() - min(item.timings.values()))
+                yield item
+        finally:
+            self._stopping.set()
+            if drained:
+                # let the gatherer and stages finish closing their resources, only cancel them
+                # when the consumer stopped early or something failed
+                await asyncio.gather(*workers, return_exceptions=True)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def _gather(self, outbox: StageQueue, consumers: int) -> None:
+        """Feed gathered items into the first queue until exhausted or stopped."""
+        iterator = aiter(self.gatherer.run())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        cancelled = False
+        try:
+            while True:
+                started = time.monotonic()
+                pending = asyncio.ensure_future(anext(iterator))
+                await asyncio.wait({pending, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                if not pending.done():
+                    pending.cancel()
+                    await asyncio.gather(pending, return_exceptions=True)
+                    self.logger.debug("Stopped gathering, draining stages")
+                    break
+                try:
+                    item = pending.result()
+                except StopAsyncIteration:
+                    break
+                self.gather_stats.add_work(
+                    items=1, errors=1 if item.error else 0, seconds=time.monotonic() - started
+                )
+                # blocks while the next stage is full, throttling the gatherer
+                await outbox.put(item)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception:
+            self.logger.exception("Gatherer failed, draining stages")
+            raise
+        finally:
+            stopping.cancel()
+            if not cancelled:
+                await outbox.close(consumers=consumers)
+                await iterator.aclose()
+
+    async def _run_stage(
+        self, stage: Stage, inbox: StageQueue, outbox: StageQueue, consumers: int
+    ) -> None:
+        """Run a stage's workers until its inbox is drained, then close the stage and its outbox.
+
+        The stage is closed first, so closing the last outbox means every stage has finished.
+        """
+        await asyncio.gather(*[self._work(stage, inbox, outbox) for _ in range(stage.workers)])
+        try:
+            if stage.on_close is not None:
+                await stage.on_close()
+        finally:
+            await outbox.close(consumers=consumers)
+
+    async def _work(self, stage: Stage, inbox: StageQueue, outbox: StageQueue) -> None:
+        """Single stage worker loop."""
+        while True:
+            try:
+                batch = await inbox.get_batch(
+                    max_size=stage.batch_size, max_wait_ms=stage.max_wait_ms
+                )
+            except QueueClosed:
+                return
+
+            had_error = [x.error is not None for x in batch]
+            previous = [max(x.timings.values(), default=None) for x in batch]
+            started = time.monotonic()
+            try:
+                if self.profiler is not None:
+                    with self.profiler.sample(stage.name):
+                        batch = await stage.handler(batch)
+                else:
+                    batch = await stage.handler(batch)
+            except Exception as exc:
+                self.logger.exception("Stage %s failed on %d items", stage.name, len(batch))
+                for image_data in batch:
+                    image_data.error = str(exc)
+                    image_data.error_exc = exc
+            errors = sum(
+                1 for x, before in zip(batch, had_error) if x.error is not None and not before
+            )
+            done = time.monotonic()
+            stage.stats.add_work(items=len(batch), errors=errors, seconds=done - started)
+            for image_data, before in zip(batch, previous):
+                if before is not None:
+                    stage.stats.add_latency(done - before)
+                image_data.mark(stage.name, at=done)
+
+            for image_data in batch:
+                await outbox.put(image_data)
+
+    async def _report(self) -> None:
+        """Periodically log stage stats."""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.logger.info("Pipeline stats: %s", self.stats())
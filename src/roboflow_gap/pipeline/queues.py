@@ -0,0 +1,112 @@
+import asyncio
+import time
+import typing as t
+
+from .stats import StageStats
+
+T = t.TypeVar("T")
+
+OverflowPolicy = t.Literal["block", "drop_oldest"]
+
+_CLOSED = object()
+
+
+class QueueClosed(Exception):
+    """Raised by StageQueue.get once the queue is closed and drained."""
+
+
+class StageQueue(t.Generic[T]):
+    """Bounded queue between two pipeline stages.
+
+    With the block policy a full queue makes the producer wait, which propagates backpressure
+    upstream. With the drop_oldest policy the producer never waits and the oldest queued item
+    is discarded instead, which suits live sources where only recent frames matter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 32,
+        overflow: OverflowPolicy = "block",
+        stats: t.Optional[StageStats] = None,
+    ):
+        if overflow not in ("block", "drop_oldest"):
+            raise ValueError(f"Invalid overflow policy: {overflow}, valids: block, drop_oldest")
+        self.name = name
+        self.maxsize = max(int(maxsize), 1)
+        self.overflow = overflow
+        self.stats = stats
+        self.dropped: int = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.maxsize)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name!r}, depth={self.depth}, "
+            f"maxsize={self.maxsize}, overflow={self.overflow!r})"
+        )
+
+    @property
+    def depth(self) -> int:
+        """Number of items currently waiting in the queue."""
+        return self._queue.qsize()
+
+    async def put(self, item: T) -> t.Optional[T]:
+        """Enqueue an item, returning the item dropped to make room for it, if any."""
+        dropped = None
+        if self.overflow == "drop_oldest":
+            while self._queue.full():
+                _, oldest = self._queue.get_nowait()
+                if oldest is _CLOSED:
+                    # never drop a close marker, put it back and wait like the block policy
+                    await self._queue.put((time.monotonic(), oldest))
+                    break
+                dropped = oldest
+                self.dropped += 1
+                if self.stats is not None:
+                    self.stats.add_dropped()
+        await self._queue.put((time.monotonic(), item))
+        return dropped
+
+    async def get(self) -> T:
+        """Dequeue the next item, raising QueueClosed once the queue is closed and drained."""
+        enqueued, item = await self._queue.get()
+        if item is _CLOSED:
+            raise QueueClosed(self.name)
+        if self.stats is not None:
+            self.stats.add_queue_wait(time.monotonic() - enqueued)
+        return item
+
+    async def get_batch(self, max_size: int = 1, max_wait_ms: float = 0.0) -> t.List[T]:
+        """Dequeue up to max_size items, waiting at most max_wait_ms after the first one.
+
+        Raises QueueClosed if the queue was closed before any item arrived. If the close marker
+        arrives after some items, it is put back so the next call sees it.
+        """
+        batch = [await self.get()]
+        deadline = time.monotonic() + max(max_wait_ms, 0.0) / 1000
+        while len(batch) < max_size:
+            if self._queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    enqueued, item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                enqueued, item = self._queue.get_nowait()
+            if item is _CLOSED:
+                self._queue.put_nowait((enqueued, item))
+                break
+            if self.stats is not None:
+                self.stats.add_queue_wait(time.monotonic() - enqueued)
+            batch.append(item)
+        return batch
+
+    async def close(self, consumers: int = 1) -> None:
+        """Signal that no more items will be put, after the queued ones are consumed.
+
+        One close marker is queued per consumer so each of them sees the end of the queue.
+        """
+        for _ in range(max(consumers, 1)):
+            await self._queue.put((time.monotonic(), _CLOSED))
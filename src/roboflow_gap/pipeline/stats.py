@@ -0,0 +1,105 @@
+import time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from roboflow_gap.metrics.registry import Registry
+
+
+class StageStats:
+    """Running counters for one pipeline stage, optionally mirrored into a metrics registry."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items: int = 0
+        self.errors: int = 0
+        self.dropped: int = 0
+        self.busy_seconds: float = 0.0
+        self.queue_wait_seconds: float = 0.0
+        self.queue_waits: int = 0
+        self.date_started: float = time.monotonic()
+        self._metrics: t.Optional[t.Dict[str, t.Any]] = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name!r}, items={self.items})"
+
+    def bind_metrics(self, registry: "Registry") -> None:
+        """Record into the stage's counters and histograms of a metrics registry from now on."""
+        labels = {"stage": self.name}
+        self._metrics = {
+            "items": registry.counter(
+                "gap_stage_items", "Items completed by a stage.", ("stage",)
+            ).labels(**labels),
+            "errors": registry.counter(
+                "gap_stage_errors", "Items that failed in a stage.", ("stage",)
+            ).labels(**labels),
+            "dropped": registry.counter(
+                "gap_stage_dropped", "Items dropped from a stage's full queue.", ("stage",)
+            ).labels(**labels),
+            "work": registry.histogram(
+                "gap_stage_work_seconds", "Seconds a stage spent on one batch.", ("stage",)
+            ).labels(**labels),
+            "queue_wait": registry.histogram(
+                "gap_stage_queue_wait_seconds", "Seconds an item waited for a stage.", ("stage",)
+            ).labels(**labels),
+            "latency": registry.histogram(
+                "gap_stage_latency_seconds",
+                "Seconds from the previous stage finishing an item to this stage finishing it.",
+                ("stage",),
+            ).labels(**labels),
+        }
+
+    def add_queue_wait(self, seconds: float) -> None:
+        """Record the time an item spent waiting in this stage's input queue."""
+        self.queue_wait_seconds += seconds
+        self.queue_waits += 1
+        if self._metrics is not None:
+            self._metrics["queue_wait"].observe(seconds)
+
+    def add_dropped(self, items: int = 1) -> None:
+        """Record items dropped from this stage's input queue."""
+        self.dropped += items
+        if self._metrics is not None:
+            self._metrics["dropped"].inc(items)
+
+    def add_work(self, items: int, errors: int, seconds: float) -> None:
+        """Record a unit of completed work."""
+        self.items += items
+        self.errors += errors
+        self.busy_seconds += seconds
+        if self._metrics is not None:
+            self._metrics["items"].inc(items)
+            if errors:
+                self._metrics["errors"].inc(errors)
+            self._metrics["work"].observe(seconds)
+
+    def add_latency(self, seconds: float) -> None:
+        """Record the time an item took to get through this stage, queueing included."""
+        if self._metrics is not None:
+            self._metrics["latency"].observe(seconds)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the stage started."""
+        return max(time.monotonic() - self.date_started, 1e-9)
+
+    @property
+    def throughput(self) -> float:
+        """Items completed per second since the stage started."""
+        return self.items / self.elapsed
+
+    def to_dict(self, queue_depth: t.Optional[int] = None) -> t.Dict[str, t.Any]:
+        """Snapshot of the stage counters."""
+        return {
+            "name": self.name,
+            "items": self.items,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "throughput": round(self.throughput, 3),
+            "queue_depth": queue_depth,
+            "avg_busy_ms": round(self.busy_seconds / self.items * 1000, 3) if self.items else 0.0,
+            "avg_queue_wait_ms": (
+                round(self.queue_wait_seconds / self.queue_waits * 1000, 3)
+                if self.queue_waits
+                else 0.0
+            ),
+        }
@@ -0,0 +1,18 @@
+from .annotate import Annotate
+from .buffered_detections import BufferedDetections
+from .detection_store import DetectionStore, StoredDetection
+from .process_base import ProcessBase
+from .results_sink import ResultsSink
+from .store_detections import StoreDetections
+from .update_manifest import UpdateManifest
+
+__all__ = [
+    "Annotate",
+    "BufferedDetections",
+    "DetectionStore",
+    "ProcessBase",
+    "ResultsSink",
+    "StoreDetections",
+    "StoredDetection",
+    "UpdateManifest",
+]
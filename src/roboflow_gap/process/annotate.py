@@ -0,0 +1,186 @@
+import asyncio
+import dataclasses
+import typing as t
+
+import numpy as np
+import pydantic
+
+from roboflow_gap.analyze.preprocess import to_frame
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.buffer_pools import BufferPool
+
+from .process_base import ProcessBase
+
+if t.TYPE_CHECKING:
+    from supervision.annotators.base import BaseAnnotator
+
+ANNOTATORS: t.Tuple[str, ...] = ("BoxAnnotator", "LabelAnnotator")
+
+
+def get_valid_annotators() -> t.List[str]:
+    """Get valid annotators."""
+    import supervision as sv
+    from supervision.annotators.base import BaseAnnotator
+
+    names = {x.__name__ for x in BaseAnnotator.__subclasses__() if hasattr(sv, x.__name__)}
+    return sorted(names | {sv.LabelAnnotator.__name__})
+
+
+def get_annotator(annotator: t.Union[str, "BaseAnnotator"]) -> "BaseAnnotator":
+    """Get an annotator instance from a supervision annotator name or instance."""
+    import supervision as sv
+    from supervision.annotators.base import BaseAnnotator
+
+    if isinstance(annotator, str):
+        if not hasattr(sv, annotator):
+            raise ValueError(f"Invalid annotator: {annotator}, valids: {get_valid_annotators()}")
+
+        annotator = getattr(sv, annotator)()
+
+    if not isinstance(annotator, (BaseAnnotator, sv.LabelAnnotator)):
+        raise ValueError(f"Invalid annotator: {annotator}, valids: {get_valid_annotators()}")
+
+    return annotator
+
+
+class Annotate(ProcessBase):
+    """Draw detections onto frames with supervision annotators, filling ImageData.processed.
+
+    Frames are copied into preallocated buffers that are reused once nothing references them
+    anymore, and annotators draw into those buffers, so steady state rendering allocates no new
+    frames. With in_place the annotators draw straight onto the original frame and no copy is
+    made at all. Batches are rendered on a worker thread. With render set to auto, rendering is
+    skipped when a pipeline says every processor after this one ignores processed frames.
+    Detections are in source image coordinates, so they are mapped onto the frame first when
+    Preprocess or a reduced decode changed it.
+    """
+
+    annotators: t.List[t.Any] = pydantic.Field(
+        default_factory=lambda: list(ANNOTATORS),
+        description="Supervision annotator names or instances, applied in order.",
+    )
+    in_place: bool = pydantic.Field(
+        default=False,
+        description="If True, draw onto the original frame instead of a copy of it.",
+    )
+    render: t.Literal["auto", "always", "never"] = pydantic.Field(
+        default="auto",
+        description=(
+            "When to render: always, never, or auto to skip rendering when no later processor "
+            "consumes processed frames."
+        ),
+    )
+    empty_results_text: bool = pydantic.Field(
+        default=True,
+        description="If True, write a notice onto frames without detections.",
+    )
+    max_buffers: int = pydantic.Field(
+        default=8,
+        description="Maximum number of reusable output buffers kept per frame shape.",
+    )
+    max_batch_size: int = pydantic.Field(
+        default=8,
+        description="Maximum number of items rendered at once in a pipeline.",
+    )
+
+    _annotators: t.List["BaseAnnotator"] = pydantic.PrivateAttr(default_factory=list)
+    _buffers: t.Optional[BufferPool] = pydantic.PrivateAttr(default=None)
+    _needed: t.Optional[bool] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self._buffers = BufferPool(max_buffers=self.max_buffers)
+        self.add_annotators(self.annotators)
+
+    @property
+    def buffers(self) -> BufferPool:
+        """Pool of reusable output buffers."""
+        return self._buffers
+
+    @property
+    def enabled(self) -> bool:
+        """If frames are rendered, given the render mode and the downstream processors."""
+        if self.render == "auto":
+            return self._needed is not False
+        return self.render == "always"
+
+    def add_annotators(self, annotators: t.Iterable[t.Union[str, "BaseAnnotator"]]) -> None:
+        """Add annotators."""
+        for annotator in annotators:
+            self.add_annotator(annotator)
+
+    def add_annotator(self, annotator: t.Union[str, "BaseAnnotator"]) -> None:
+        """Add an annotator."""
+        self._annotators.append(get_annotator(annotator))
+
+    def set_downstream(self, processors: t.Sequence[ProcessBase]) -> None:
+        """Render in auto mode only if a later processor consumes processed frames.
+
+        As the last processor its output goes to whoever drives the pipeline, so it renders.
+        """
+        self._needed = any(x.consumes_processed for x in processors) if processors else None
+
+    async def process(self, image_data: ImageData) -> ImageData:
+        """Render detections onto a single image."""
+        return (await self.process_batch([image_data]))[0]
+
+    async def process_batch(self, images: t.Sequence[ImageData]) -> t.List[ImageData]:
+        """Render detections onto a batch of images on a worker thread."""
+        images = list(images)
+        if self.enabled and any(x.has_original and x.error is None for x in images):
+            await asyncio.to_thread(self.render_batch, images)
+        return images
+
+    def render_batch(self, images: t.Sequence[ImageData]) -> None:
+        """Render detections onto each image that has an original frame and no error."""
+        for image_data in images:
+            if not image_data.has_original or image_data.error is not None:
+                continue
+            try:
+                image_data.processed = self.render_image(
+                    image=image_data.get_original(),
+                    detections=self.frame_detections(image_data),
+                )
+            except Exception as exc:
+                self._logger.exception("Rendering failed for source=%s", image_data.source)
+                image_data.error = str(exc)
+                image_data.error_exc = exc
+
+    @staticmethod
+    def frame_detections(image_data: ImageData) -> t.Any:
+        """Detections of an image in the coordinates of its frame, leaving the analysis as is."""
+        detections = (image_data.analysis or {}).get("detections")
+        context = image_data.context
+        if detections is None or not len(detections):
+            return detections
+        if "scale" not in context and context.get("decode_scale", 1) == 1:
+            return detections
+        return dataclasses.replace(detections, xyxy=to_frame(detections.xyxy, context))
+
+    def render_image(self, image: np.ndarray, detections: t.Any = None) -> np.ndarray:
+        """Draw detections onto a buffer copy of image, or onto image itself if in_place."""
+        import supervision as sv
+
+        if self.in_place:
+            scene = image
+        else:
+            scene = self._buffers.acquire(image.shape, image.dtype)
+            np.copyto(scene, image)
+
+        if detections is not None and len(detections):
+            for annotator in self._annotators:
+                # most annotators draw in place and return the scene, others return a new frame
+                scene = annotator.annotate(scene=scene, detections=detections)
+        elif self.empty_results_text:
+            scene = sv.draw_text(
+                scene=scene,
+                text="No results returned",
+                text_anchor=sv.Point(x=100, y=20),
+                text_color=sv.Color.RED,
+                text_scale=0.6,
+                text_thickness=2,
+                text_padding=0,
+                background_color=sv.Color.BLACK,
+            )
+        return scene
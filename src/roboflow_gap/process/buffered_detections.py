@@ -0,0 +1,180 @@
+import abc
+import asyncio
+import time
+import typing as t
+
+import numpy as np
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.utils.dates import to_timestamp
+
+from .process_base import ProcessBase
+
+if t.TYPE_CHECKING:
+    import supervision as sv
+
+COLUMNS: t.Dict[str, t.Any] = {
+    "source": object,
+    "frame_index": np.int64,
+    "timestamp": np.float64,
+    "x1": np.float32,
+    "y1": np.float32,
+    "x2": np.float32,
+    "y2": np.float32,
+    "confidence": np.float32,
+    "class_id": np.int32,
+    "class_name": object,
+}
+
+
+def detection_columns(
+    detections: "sv.Detections", source: str, frame_index: int, timestamp: float
+) -> t.Dict[str, np.ndarray]:
+    """Columns for the detections of one image, built from the detection arrays."""
+    count = len(detections)
+    xyxy = np.asarray(detections.xyxy, dtype=np.float32).reshape(count, 4)
+    confidence = detections.confidence
+    class_id = detections.class_id
+    class_name = detections.data.get("class_name") if detections.data else None
+    return {
+        "source": np.full(count, source, dtype=object),
+        "frame_index": np.full(count, frame_index, dtype=np.int64),
+        "timestamp": np.full(count, timestamp, dtype=np.float64),
+        "x1": xyxy[:, 0],
+        "y1": xyxy[:, 1],
+        "x2": xyxy[:, 2],
+        "y2": xyxy[:, 3],
+        "confidence": (
+            np.full(count, np.nan, dtype=np.float32)
+            if confidence is None
+            else np.asarray(confidence, dtype=np.float32)
+        ),
+        "class_id": (
+            np.full(count, -1, dtype=np.int32)
+            if class_id is None
+            else np.asarray(class_id, dtype=np.int32)
+        ),
+        "class_name": (
+            np.full(count, None, dtype=object)
+            if class_name is None
+            else np.asarray(class_name, dtype=object)
+        ),
+    }
+
+
+class BufferedDetections(ProcessBase):
+    """Base class for processors writing detections in bulk.
+
+    Detections are collected as column chunks taken straight from the sv.Detections arrays and
+    concatenated on flush, which happens every flush_rows detections or flush_seconds seconds,
+    whichever comes first. A background task flushes on time even while no new items arrive.
+    Subclasses write the columns of each flush in write, which runs on a worker thread.
+    """
+
+    flush_rows: int = pydantic.Field(
+        default=10_000,
+        description="Flush once this many detections are buffered.",
+    )
+    flush_seconds: float = pydantic.Field(
+        default=5.0,
+        description="Flush buffered detections at least this often, in seconds.",
+    )
+
+    _chunks: t.Dict[str, t.List[np.ndarray]] = pydantic.PrivateAttr(default_factory=dict)
+    _rows: int = pydantic.PrivateAttr(default=0)
+    _written: int = pydantic.PrivateAttr(default=0)
+    _last_flush: float = pydantic.PrivateAttr(default_factory=time.monotonic)
+    _lock: t.Optional[asyncio.Lock] = pydantic.PrivateAttr(default=None)
+    _timer: t.Optional[asyncio.Task] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self._chunks = {name: [] for name in COLUMNS}
+        self._lock = asyncio.Lock()
+
+    @property
+    def rows_written(self) -> int:
+        """Number of detections written so far."""
+        return self._written
+
+    @property
+    @abc.abstractmethod
+    def destination(self) -> str:
+        """Where detections are written, recorded as the result of every image."""
+        return NotImplemented
+
+    @abc.abstractmethod
+    def write(self, columns: t.Dict[str, np.ndarray]) -> None:
+        """Write a batch of columns."""
+        return NotImplemented
+
+    async def process(self, image_data: ImageData) -> ImageData:
+        """Buffer the detections of an image, flushing when a threshold is reached."""
+        detections = (image_data.analysis or {}).get("detections")
+        if detections is not None and len(detections):
+            date = image_data.date_started
+            columns = detection_columns(
+                detections=detections,
+                source=image_data.source,
+                frame_index=int(image_data.context.get("frame_index", -1)),
+                timestamp=to_timestamp(date) if date is not None else time.time(),
+            )
+            for name, values in columns.items():
+                self._chunks[name].append(values)
+            self._rows += len(detections)
+        image_data.context["result"] = self.destination
+
+        if self._timer is None and self.flush_seconds > 0:
+            self._timer = asyncio.create_task(self.flush_periodically())
+        if self._rows >= self.flush_rows or (
+            self._rows and time.monotonic() - self._last_flush >= self.flush_seconds
+        ):
+            await self.flush()
+        return image_data
+
+    async def flush(self) -> None:
+        """Write buffered detections."""
+        async with self._lock:
+            if not self._rows:
+                return
+            chunks, rows = self._chunks, self._rows
+            self._chunks = {name: [] for name in COLUMNS}
+            self._rows = 0
+            self._last_flush = time.monotonic()
+            columns = {
+                name: np.concatenate(values).astype(COLUMNS[name], copy=False)
+                for name, values in chunks.items()
+            }
+            started = time.perf_counter()
+            await asyncio.to_thread(self.write, columns)
+            self._written += rows
+            self._logger.debug(
+                "Flushed %d detections to %s in %.1fms",
+                rows,
+                self.destination,
+                (time.perf_counter() - started) * 1000,
+            )
+
+    async def flush_periodically(self) -> None:
+        """Flush buffered detections once they are flush_seconds old, even on a stalled stream."""
+        while True:
+            delay = self.flush_seconds
+            if self._rows:
+                delay = self._last_flush + self.flush_seconds - time.monotonic()
+            await asyncio.sleep(max(delay, 0.0))
+            if self._rows and time.monotonic() - self._last_flush >= self.flush_seconds:
+                try:
+                    # shielded so close never cancels a write halfway through
+                    await asyncio.shield(self.flush())
+                except Exception:
+                    self._logger.exception("Timed flush to %s failed", self.destination)
+
+    async def close(self) -> None:
+        """Stop the timed flushes and flush remaining detections."""
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await self.flush()
@@ -0,0 +1,240 @@
+import pathlib
+import sqlite3
+import threading
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.models.custom_types import PathLike
+from roboflow_gap.utils.paths import pathify
+
+# (index name, columns), chosen so filters on source, time, class and confidence use an index
+INDEXES: t.List[t.Tuple[str, str]] = [
+    ("detections_source_time", "source_id, timestamp"),
+    ("detections_class_confidence", "class_id, confidence"),
+    ("detections_time", "timestamp"),
+]
+# rows sampled per index when refreshing planner statistics, as recommended by SQLite
+ANALYSIS_LIMIT: int = 400
+
+
+class StoredDetection(t.NamedTuple):
+    """One detection read back from a DetectionStore."""
+
+    source: str
+    frame_index: int
+    timestamp: float
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    confidence: t.Optional[float]
+    class_id: int
+    class_name: t.Optional[str]
+
+
+class DetectionStore:
+    """Embedded SQLite store of detections, indexed for queries over large runs.
+
+    Detections are written in bulk, one transaction per batch of columns, with source names and
+    class names kept in their own tables so each detection row is only numbers. Indexes on
+    (source, timestamp), (class_id, confidence) and timestamp let queries such as "class 2 above
+    0.8 from camera 0 in the last week" read only the matching rows.
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        readonly: bool = False,
+        page_size: int = 1000,
+        cache_mb: float = 64.0,
+    ):
+        self.path: pathlib.Path = pathify(path)
+        self.readonly = readonly
+        self.page_size = max(int(page_size), 1)
+        self._lock = threading.Lock()
+        self._source_ids: t.Dict[str, int] = {}
+        if readonly:
+            if not self.path.is_file():
+                raise FileNotFoundError(f"Detection store not found at: {self.path}")
+            uri = f"{self.path.as_uri()}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # index pages of large stores stay cached between bulk writes
+        self._conn.execute(f"PRAGMA cache_size=-{int(cache_mb * 1024)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS classes (id INTEGER PRIMARY KEY, name TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS detections "
+            "(source_id INTEGER NOT NULL, frame_index INTEGER NOT NULL, timestamp REAL NOT NULL, "
+            "x1 REAL NOT NULL, y1 REAL NOT NULL, x2 REAL NOT NULL, y2 REAL NOT NULL, "
+            "confidence REAL, class_id INTEGER NOT NULL)"
+        )
+        for name, columns in INDEXES:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON detections ({columns})")
+        self._conn.commit()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path={str(self.path)!r})"
+
+    def source_ids(self, names: t.Iterable[str]) -> t.Dict[str, int]:
+        """Ids of source names, adding the ones not stored yet; call with the lock held."""
+        missing = [x for x in set(names) if x not in self._source_ids]
+        if missing:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sources (name) VALUES (?)", [(x,) for x in missing]
+            )
+            marks = ",".join("?" * len(missing))
+            rows = self._conn.execute(
+                f"SELECT name, id FROM sources WHERE name IN ({marks})", missing
+            )
+            self._source_ids.update(rows.fetchall())
+        return self._source_ids
+
+    def write(self, columns: t.Dict[str, np.ndarray]) -> int:
+        """Insert a batch of detection columns in one transaction, returning the row count.
+
+        Columns are those of buffered_detections.detection_columns: source, frame_index,
+        timestamp, x1, y1, x2, y2, confidence, class_id and class_name.
+        """
+        count = len(columns["source"])
+        if not count:
+            return 0
+        sources = columns["source"].tolist()
+        confidence = columns["confidence"].astype(np.float64)
+        class_id = columns["class_id"].tolist()
+        classes = {x: y for x, y in zip(class_id, columns["class_name"].tolist()) if y is not None}
+        with self._lock, self._conn:
+            ids = self.source_ids(sources)
+            if classes:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO classes (id, name) VALUES (?, ?)", classes.items()
+                )
+            self._conn.executemany(
+                "INSERT INTO detections (source_id, frame_index, timestamp, x1, y1, x2, y2, "
+                "confidence, class_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(
+                    [ids[x] for x in sources],
+                    columns["frame_index"].tolist(),
+                    columns["timestamp"].tolist(),
+                    columns["x1"].tolist(),
+                    columns["y1"].tolist(),
+                    columns["x2"].tolist(),
+                    columns["y2"].tolist(),
+                    # NaN confidences, from models without scores, are stored as NULL
+                    [None if x != x else x for x in confidence.tolist()],
+                    class_id,
+                ),
+            )
+        return count
+
+    @staticmethod
+    def build_filters(  # noqa: PLR0913
+        sources: t.Optional[t.Sequence[str]] = None,
+        class_ids: t.Optional[t.Sequence[int]] = None,
+        class_names: t.Optional[t.Sequence[str]] = None,
+        min_confidence: t.Optional[float] = None,
+        since: t.Optional[float] = None,
+        until: t.Optional[float] = None,
+    ) -> t.Tuple[str, t.List[t.Any]]:
+        """WHERE clause and parameters for query filters; sequences match any of their values."""
+        clauses: t.List[str] = []
+        params: t.List[t.Any] = []
+
+        def any_of(column: str, values: t.Sequence[t.Any]) -> None:
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+
+        if sources:
+            any_of("s.name", list(sources))
+        if class_ids:
+            any_of("d.class_id", [int(x) for x in class_ids])
+        if class_names:
+            any_of("c.name", list(class_names))
+        if min_confidence is not None:
+            clauses.append("d.confidence >= ?")
+            params.append(float(min_confidence))
+        if since is not None:
+            clauses.append("d.timestamp >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("d.timestamp < ?")
+            params.append(float(until))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(
+        self,
+        limit: t.Optional[int] = None,
+        newest_first: bool = False,
+        **filters: t.Any,
+    ) -> t.Iterator[StoredDetection]:
+        """Lazily yield detections matching filters, ordered by timestamp.
+
+        Filters are the arguments of build_filters: sources, class_ids, class_names,
+        min_confidence, and since and until as POSIX timestamps.
+        """
+        where, params = self.build_filters(**filters)
+        sql = (
+            "SELECT s.name, d.frame_index, d.timestamp, d.x1, d.y1, d.x2, d.y2, d.confidence, "
+            "d.class_id, c.name FROM detections d "
+            "JOIN sources s ON s.id = d.source_id LEFT JOIN classes c ON c.id = d.class_id"
+            f"{where} ORDER BY d.timestamp {'DESC' if newest_first else 'ASC'}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        try:
+            # fetched in pages so large results are never held in memory at once
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(self.page_size)
+                if not rows:
+                    return
+                yield from (StoredDetection(*x) for x in rows)
+        finally:
+            cursor.close()
+
+    def count(self, **filters: t.Any) -> int:
+        """Number of detections matching filters."""
+        where, params = self.build_filters(**filters)
+        sql = (
+            "SELECT COUNT(*) FROM detections d JOIN sources s ON s.id = d.source_id "
+            f"LEFT JOIN classes c ON c.id = d.class_id{where}"
+        )
+        with self._lock:
+            return int(self._conn.execute(sql, params).fetchone()[0])
+
+    def sources(self) -> t.List[str]:
+        """Every stored source name."""
+        with self._lock:
+            return [x for (x,) in self._conn.execute("SELECT name FROM sources ORDER BY name")]
+
+    def classes(self) -> t.Dict[int, t.Optional[str]]:
+        """Every stored class id and its name."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, name FROM classes ORDER BY id"))
+
+    def analyze(self, limit: int = ANALYSIS_LIMIT) -> None:
+        """Refresh the statistics the query planner picks indexes with.
+
+        Each index is sampled for about limit rows rather than read in full, so this stays
+        quick on large stores; PRAGMA optimize would skip tables this connection only wrote to.
+        """
+        with self._lock:
+            self._conn.execute(f"PRAGMA analysis_limit={int(limit)}")
+            self._conn.execute("ANALYZE")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,47 @@
+import abc
+import logging
+import typing as t
+
+import pydantic
+
+from roboflow_gap.models.image_data import ImageData
+
+
+class ProcessBase(abc.ABC, pydantic.BaseModel):
+    """Base class for image data processing."""
+
+    # If this processor reads ImageData.processed, so upstream stages must render it.
+    consumes_processed: t.ClassVar[bool] = False
+
+    max_batch_size: int = pydantic.Field(
+        default=1,
+        description="Maximum number of items handed to process_batch at once in a pipeline.",
+    )
+    max_wait_ms: float = pydantic.Field(
+        default=0.0,
+        description="How long a pipeline waits to fill a batch, in milliseconds.",
+    )
+
+    _logger: t.Optional[logging.Logger] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        self._logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+
+    @abc.abstractmethod
+    async def process(self, image_data: ImageData) -> ImageData:
+        """Process an ImageData instance and return it."""
+        return NotImplemented
+
+    async def process_batch(self, images: t.Sequence[ImageData]) -> t.List[ImageData]:
+        """Process a batch of ImageData instances, one at a time unless overridden."""
+        return [await self.process(x) for x in images]
+
+    def set_upstream(self, processors: t.Sequence["ProcessBase"]) -> None:
+        """Called by a pipeline with the processors that run before this one."""
+
+    def set_downstream(self, processors: t.Sequence["ProcessBase"]) -> None:
+        """Called by a pipeline with the processors that run after this one."""
+
+    async def close(self) -> None:
+        """Release resources once every item has been processed."""
@@ -0,0 +1,80 @@
+import json
+import pathlib
+import typing as t
+
+import numpy as np
+import pydantic
+
+from roboflow_gap.utils.imports import has_module, optional_import
+from roboflow_gap.utils.paths import pathify
+
+from .buffered_detections import COLUMNS, BufferedDetections
+
+
+class ResultsSink(BufferedDetections):
+    """Append detections to a columnar file, flushing in batches.
+
+    Detections are buffered and flushed as described in BufferedDetections. Parquet and Arrow
+    IPC output need the pyarrow package.
+    """
+
+    path: pathlib.Path = pydantic.Field(
+        description="The file to write detections to.",
+    )
+    format: t.Literal["jsonl", "parquet", "arrow"] = pydantic.Field(
+        default="jsonl",
+        description="Output format: jsonl, parquet, or arrow (Arrow IPC stream).",
+    )
+    _writer: t.Any = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self.path = pathify(path=self.path)
+        if self.format != "jsonl" and not has_module("pyarrow"):
+            raise ImportError(f"format={self.format!r} requires the pyarrow package")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def destination(self) -> str:
+        """The file detections are written to."""
+        return str(self.path)
+
+    def write(self, columns: t.Dict[str, np.ndarray]) -> None:
+        """Write a batch of columns in the configured format."""
+        if self.format == "jsonl":
+            self.write_jsonl(columns)
+            return
+
+        pa = optional_import("pyarrow")
+        table = pa.Table.from_pydict(
+            {
+                name: pa.array(values, type=pa.string()) if COLUMNS[name] is object else values
+                for name, values in columns.items()
+            }
+        )
+        if self._writer is None:
+            if self.format == "parquet":
+                parquet = optional_import("pyarrow.parquet")
+                self._writer = parquet.ParquetWriter(str(self.path), table.schema)
+            else:
+                ipc = optional_import("pyarrow.ipc")
+                self._writer = ipc.new_stream(str(self.path), table.schema)
+        self._writer.write_table(table)
+
+    def write_jsonl(self, columns: t.Dict[str, np.ndarray]) -> None:
+        """Append a batch of columns as one JSON object per detection."""
+        names = list(columns)
+        values = [columns[name].tolist() for name in names]
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.writelines(dumps(dict(zip(names, row))) + "\n" for row in zip(*values))
+
+    async def close(self) -> None:
+        """Flush remaining detections and close the file, even if the flush fails."""
+        try:
+            await super().close()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
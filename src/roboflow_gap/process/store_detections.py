@@ -0,0 +1,42 @@
+import asyncio
+import typing as t
+
+import numpy as np
+import pydantic
+
+from .buffered_detections import BufferedDetections
+from .detection_store import DetectionStore
+
+
+class StoreDetections(BufferedDetections):
+    """Write detections to a DetectionStore in bulk transactions.
+
+    Detections are buffered and flushed as described in BufferedDetections, each flush in one
+    transaction, so the pipeline never waits on a database write per image.
+    """
+
+    store: pydantic.InstanceOf[DetectionStore] = pydantic.Field(
+        exclude=True,
+        description="The detection store to write to.",
+    )
+    flush_rows: int = pydantic.Field(
+        default=50_000,
+        description="Flush once this many detections are buffered.",
+    )
+
+    @property
+    def destination(self) -> str:
+        """The database detections are written to."""
+        return str(self.store.path)
+
+    def write(self, columns: t.Dict[str, np.ndarray]) -> None:
+        """Write a batch of columns to the store in one transaction."""
+        self.store.write(columns)
+
+    async def close(self) -> None:
+        """Flush remaining detections and refresh the query planner statistics."""
+        try:
+            await super().close()
+        finally:
+            if self._written:
+                await asyncio.to_thread(self.store.analyze)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+import typing as t
+
+import pydantic
+
+from roboflow_gap.gather.manifest import Manifest
+from roboflow_gap.models.image_data import ImageData
+
+from .process_base import ProcessBase
+
+
+class UpdateManifest(ProcessBase):
+    """Mark gathered files as done or failed in a gather manifest.
+
+    Place it last in a pipeline. States are collected and handed to the manifest every
+    checkpoint_seconds; before that, processors that run earlier and buffer their output, such as
+    ResultsSink, are flushed, so a file is only recorded as done once its results are written.
+    """
+
+    manifest: pydantic.InstanceOf[Manifest] = pydantic.Field(
+        exclude=True,
+        description="The manifest the gatherer skips done files with.",
+    )
+    checkpoint_seconds: float = pydantic.Field(
+        default=5.0,
+        description="How often collected states are flushed and checkpointed, in seconds.",
+    )
+
+    _rows: t.List[t.Tuple[str, str, t.Optional[str]]] = pydantic.PrivateAttr(
+        default_factory=list
+    )
+    _upstream: t.List[ProcessBase] = pydantic.PrivateAttr(default_factory=list)
+    _last_checkpoint: float = pydantic.PrivateAttr(default_factory=time.monotonic)
+    _lock: t.Optional[asyncio.Lock] = pydantic.PrivateAttr(default=None)
+
+    def model_post_init(self, __context: t.Any) -> None:
+        """Post init model method."""
+        super().model_post_init(__context)
+        self._lock = asyncio.Lock()
+
+    def set_upstream(self, processors: t.Sequence[ProcessBase]) -> None:
+        """Keep the earlier processors that buffer output, to flush them before checkpoints."""
+        self._upstream = [x for x in processors if callable(getattr(x, "flush", None))]
+
+    async def process(self, image_data: ImageData) -> ImageData:
+        """Collect the state of the file an image was gathered from."""
+        path = image_data.context.get("path")
+        if path is not None:
+            state = "error" if image_data.error is not None else "done"
+            self._rows.append((str(path), state, image_data.context.get("result")))
+        if self._rows and time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds:
+            await self.checkpoint()
+        return image_data
+
+    async def checkpoint(self) -> None:
+        """Flush upstream processors, then record collected states in one transaction."""
+        async with self._lock:
+            self._last_checkpoint = time.monotonic()
+            if not self._rows:
+                return
+            for processor in self._upstream:
+                await processor.flush()
+            rows, self._rows = self._rows, []
+            await asyncio.to_thread(self.write, rows)
+            self._logger.debug("Checkpointed %d manifest entries", len(rows))
+
+    def write(self, rows: t.Sequence[t.Tuple[str, str, t.Optional[str]]]) -> None:
+        """Mark rows in the manifest and commit them."""
+        for path, state, result in rows:
+            self.manifest.mark(path, state, result=result)
+        self.manifest.checkpoint()
+
+    async def close(self) -> None:
+        """Checkpoint remaining states."""
+        await self.checkpoint()
+        await asyncio.to_thread(self.manifest.checkpoint)
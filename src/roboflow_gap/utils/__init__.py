@@ -1,3 +1,42 @@
-from . import dates, images, paths, prompts, tools
+import importlib
+import typing as t
 
-__all__ = ["paths", "images", "dates", "prompts", "tools"]
+if t.TYPE_CHECKING:
+    from . import (
+        batches,
+        dates,
+        executors,
+        frame_buffers,
+        images,
+        imports,
+        paths,
+        prompts,
+        shared_frames,
+        tools,
+    )
+
+__all__ = [
+    "paths",
+    "images",
+    "imports",
+    "dates",
+    "prompts",
+    "tools",
+    "batches",
+    "executors",
+    "frame_buffers",
+    "shared_frames",
+]
+
+
+def __getattr__(name: str) -> t.Any:
+    # submodules load on first access, so light ones such as tools do not pull in cv2 and numpy
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> t.List[str]:
+    return sorted([*globals(), *__all__])
@@ -0,0 +1,52 @@
+import asyncio
+import time
+import typing as t
+
+T = t.TypeVar("T")
+
+
+async def batch_stream(
+    items: t.AsyncIterable[T], max_batch_size: int = 8, max_wait_ms: float = 10.0
+) -> t.AsyncIterator[t.List[T]]:
+    """Group items from an async iterable into micro-batches.
+
+    A batch is yielded as soon as it holds max_batch_size items, or max_wait_ms after its
+    first item arrived, whichever comes first.
+    """
+    max_batch_size = max(int(max_batch_size), 1)
+    max_wait = max(float(max_wait_ms), 0.0) / 1000
+    iterator = aiter(items)
+    pending: t.Optional[asyncio.Future] = None
+    batch: t.List[T] = []
+    deadline: t.Optional[float] = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if done:
+                try:
+                    item = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    break
+                pending = None
+                if not batch:
+                    deadline = time.monotonic() + max_wait
+                batch.append(item)
+                if len(batch) < max_batch_size:
+                    continue
+
+            yield batch
+            batch = []
+            deadline = None
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+    if batch:
+        yield batch
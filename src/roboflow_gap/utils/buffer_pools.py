@@ -0,0 +1,55 @@
+import sys
+import threading
+import typing as t
+
+import numpy as np
+
+# References a pooled buffer has while only the pool holds it: the pool's list, the loop
+# variable and the getrefcount argument.
+_POOL_REFS: int = 3
+
+
+class BufferPool:
+    """Preallocated numpy buffers, keyed by shape and dtype, reused once nothing else holds them.
+
+    A buffer is handed out again only when its reference count shows that the pool is its sole
+    owner, so a frame kept by a later stage, or any view of it, is never overwritten. When every
+    buffer of a shape is still held and max_buffers are allocated, a fresh unpooled buffer is
+    returned instead.
+    """
+
+    def __init__(self, max_buffers: int = 8):
+        self.max_buffers = max(int(max_buffers), 1)
+        self.allocated: int = 0
+        self.reused: int = 0
+        self.unpooled: int = 0
+        self._lock = threading.Lock()
+        self._buffers: t.Dict[t.Tuple[t.Tuple[int, ...], str], t.List[np.ndarray]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(shapes={len(self._buffers)}, allocated={self.allocated}, "
+            f"reused={self.reused}, unpooled={self.unpooled})"
+        )
+
+    def acquire(self, shape: t.Sequence[int], dtype: t.Any = np.uint8) -> np.ndarray:
+        """A buffer of shape and dtype, with undefined contents."""
+        key = (tuple(int(x) for x in shape), np.dtype(dtype).str)
+        with self._lock:
+            buffers = self._buffers.setdefault(key, [])
+            for buffer in buffers:
+                if sys.getrefcount(buffer) <= _POOL_REFS:
+                    self.reused += 1
+                    return buffer
+            buffer = np.empty(key[0], dtype=dtype)
+            if len(buffers) < self.max_buffers:
+                buffers.append(buffer)
+                self.allocated += 1
+            else:
+                self.unpooled += 1
+            return buffer
+
+    def clear(self) -> None:
+        """Drop every pooled buffer."""
+        with self._lock:
+            self._buffers.clear()
@@ -1,6 +1,44 @@
 import datetime
+import time
 
 
 def get_now() -> datetime.datetime:
     """Get the current datetime."""
     return datetime.datetime.utcnow()
+
+
+def get_monotonic() -> float:
+    """Get the current monotonic clock reading in seconds, for measuring durations."""
+    return time.monotonic()
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def to_timestamp(date: datetime.datetime) -> float:
+    """Get the POSIX timestamp of a datetime, reading naive datetimes as UTC like get_now."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.timestamp()
+
+
+def parse_time(value: str) -> float:
+    """Parse a POSIX timestamp, an ISO datetime, or a duration ago such as 30m, 12h or 7d."""
+    value = value.strip()
+    unit = DURATION_UNITS.get(value[-1:].lower())
+    if unit is not None:
+        try:
+            return time.time() - float(value[:-1]) * unit
+        except ValueError:
+            pass
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return to_timestamp(datetime.datetime.fromisoformat(value))
+    except ValueError:
+        raise ValueError(
+            f"Invalid time: {value!r}, expected a timestamp, an ISO datetime or a duration "
+            f"ago such as 7d, units: {list(DURATION_UNITS)}"
+        ) from None
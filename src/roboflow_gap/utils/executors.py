@@ -0,0 +1,81 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import os
+import typing as t
+
+T = t.TypeVar("T")
+
+ExecutorKind = t.Literal["thread", "process"]
+
+
+class StageExecutor:
+    """Run blocking calls for one stage on a thread or process pool without blocking the loop.
+
+    Each stage gets its own pool, so decode and inference can be sized independently, and
+    max_in_flight bounds how many calls may be queued or running at once. Process pools need
+    picklable callables and arguments, which makes them a fit for decode but not for a loaded
+    model.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: ExecutorKind = "thread",
+        workers: t.Optional[int] = None,
+        max_in_flight: t.Optional[int] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Invalid executor kind: {kind}, valids: thread, process")
+        self.name = name
+        self.kind = kind
+        self.workers = max(int(workers or os.cpu_count() or 1), 1)
+        self.max_in_flight = max(int(max_in_flight or self.workers * 2), 1)
+        self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self._executor: t.Optional[concurrent.futures.Executor] = None
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name!r}, kind={self.kind!r}, "
+            f"workers={self.workers}, max_in_flight={self.max_in_flight})"
+        )
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        """The underlying pool, created on first use."""
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix=f"gap-{self.name}"
+                )
+            self.logger.debug("Started executor %r", self)
+        return self._executor
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently queued or running on the pool."""
+        return self._in_flight
+
+    async def run(self, func: t.Callable[..., T], *args: t.Any, **kwargs: t.Any) -> T:
+        """Run func on the pool, waiting for a free in-flight slot first."""
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self.executor, functools.partial(func, *args, **kwargs)
+                )
+            finally:
+                self._in_flight -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the pool; a new one is created if run is called again."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            self.logger.debug("Shut down executor %r", self)
@@ -0,0 +1,95 @@
+import asyncio
+import collections
+import threading
+import typing as t
+
+T = t.TypeVar("T")
+
+
+class BufferClosed(Exception):
+    """Raised by FrameBuffer.get once the buffer is closed and empty."""
+
+
+class FrameBuffer(t.Generic[T]):
+    """Bounded buffer handing frames from a capture or decode thread to the event loop.
+
+    With drop_oldest the producer never waits: a full buffer discards its oldest frame, so the
+    consumer always gets the most recent ones. Without it the producer blocks until there is
+    room, so decoding never runs further ahead than maxsize frames.
+    """
+
+    def __init__(self, maxsize: int = 2, drop_oldest: bool = True):
+        self.maxsize = max(int(maxsize), 1)
+        self.drop_oldest = drop_oldest
+        self.dropped: int = 0
+        self._items: t.Deque[T] = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._waiter: t.Optional[t.Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        """If the buffer was closed."""
+        return self._closed
+
+    def put(self, item: T, timeout: t.Optional[float] = None) -> bool:
+        """Add an item from a producer thread, returning False if the buffer was closed."""
+        with self._cond:
+            if self.drop_oldest:
+                while len(self._items) >= self.maxsize:
+                    self._items.popleft()
+                    self.dropped += 1
+            elif not self._cond.wait_for(
+                lambda: len(self._items) < self.maxsize or self._closed, timeout=timeout
+            ):
+                return False
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._wake()
+        return True
+
+    def close(self) -> None:
+        """Stop accepting items; queued items can still be consumed."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            self._wake()
+
+    def clear(self) -> int:
+        """Discard every queued item, returning how many were discarded."""
+        with self._cond:
+            count = len(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+        return count
+
+    async def get(self) -> T:
+        """Wait for the next item, raising BufferClosed once closed and drained."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._items:
+                    item = self._items.popleft()
+                    self._cond.notify_all()
+                    return item
+                if self._closed:
+                    raise BufferClosed
+                event = asyncio.Event()
+                self._waiter = (loop, event)
+            await event.wait()
+
+    def _wake(self) -> None:
+        """Wake a consumer waiting in get, called with the lock held."""
+        self._cond.notify_all()
+        if self._waiter is not None:
+            loop, event = self._waiter
+            self._waiter = None
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the consumer's loop already closed
+                pass
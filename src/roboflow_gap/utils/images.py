@@ -1,12 +1,65 @@
-import cv2
+import hashlib
+import pathlib
+import typing as t
 
 from roboflow_gap.models.custom_types import PathLike
 
+if t.TYPE_CHECKING:
+    import cv2
 
-def load_image_path(path: PathLike) -> cv2.typing.MatLike:
-    """Load image frame from path with opencv."""
+# Reduced decode factors, JPEGs decode straight to the smaller size via DCT scaling.
+DecodeScale = t.Literal[1, 2, 4, 8]
+
+# names of the opencv imread flags, looked up on use so importing this module skips cv2
+DECODE_FLAGS: t.Dict[int, str] = {
+    1: "IMREAD_COLOR",
+    2: "IMREAD_REDUCED_COLOR_2",
+    4: "IMREAD_REDUCED_COLOR_4",
+    8: "IMREAD_REDUCED_COLOR_8",
+}
+
+
+def get_decode_flag(scale: int = 1) -> int:
+    """Get the opencv imread flag that decodes at 1/scale of the full size."""
+    import cv2
+
+    if scale not in DECODE_FLAGS:
+        raise ValueError(f"Invalid decode scale: {scale}, valids: {list(DECODE_FLAGS)}")
+    return getattr(cv2, DECODE_FLAGS[scale])
+
+
+def load_image_path(path: PathLike, scale: int = 1) -> "cv2.typing.MatLike":
+    """Load image frame from path with opencv, at 1/scale of the full size."""
+    import cv2
+
+    flag = get_decode_flag(scale)
     try:
-        image = cv2.imread(str(path))
+        image = cv2.imread(str(path), flag)
     except Exception as exc:
         raise ValueError(f"Error loading image from file at: {path}\n{exc}") from exc
     return image
+
+
+def read_image_bytes(path: PathLike) -> bytes:
+    """Read the encoded bytes of an image file."""
+    return pathlib.Path(path).read_bytes()
+
+
+def decode_image_bytes(data: bytes, scale: int = 1) -> "cv2.typing.MatLike":
+    """Decode an encoded image with opencv, at 1/scale of the full size."""
+    import cv2
+    import numpy as np
+
+    flag = get_decode_flag(scale)
+    try:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    except Exception as exc:
+        raise ValueError(f"Error decoding image from {len(data)} bytes\n{exc}") from exc
+    if image is None:
+        raise ValueError(f"Error decoding image from {len(data)} bytes")
+    return image
+
+
+def digest_bytes(data: bytes) -> str:
+    """Get a short content hash of encoded image bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -0,0 +1,23 @@
+import functools
+import importlib
+import importlib.util
+import types
+import typing as t
+
+
+@functools.lru_cache(maxsize=None)
+def has_module(name: str) -> bool:
+    """Check if a module is installed, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def optional_import(name: str) -> t.Optional[types.ModuleType]:
+    """Import an optional dependency on first use, None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
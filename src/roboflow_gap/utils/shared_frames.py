@@ -0,0 +1,179 @@
+import dataclasses
+import math
+import threading
+import typing as t
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_HEADER_ITEM = np.dtype(np.int64)
+_ALIGN = 64
+
+_OWNED: t.Dict[str, shared_memory.SharedMemory] = {}
+_ATTACHED: t.Dict[str, shared_memory.SharedMemory] = {}
+_ATTACH_LOCK = threading.Lock()
+
+
+class StaleFrameError(Exception):
+    """Raised when a FrameHandle refers to a slot that has since been released and reused."""
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a shared memory block by name, once per process."""
+    with _ATTACH_LOCK:
+        shm = _OWNED.get(name) or _ATTACHED.get(name)
+        if shm is None:
+            # only the owning ring may unlink the block, so keep it out of this process's
+            # resource tracker where possible
+            try:
+                shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # python < 3.13 always registers it, which is harmless for worker processes
+                # since they share the owning process's resource tracker
+                shm = shared_memory.SharedMemory(name=name)
+            _ATTACHED[name] = shm
+        return shm
+
+
+def detach(name: str) -> None:
+    """Drop this process's mapping of a shared memory block."""
+    with _ATTACH_LOCK:
+        shm = _ATTACHED.pop(name, None)
+    if shm is not None:
+        shm.close()
+
+
+@dataclasses.dataclass(frozen=True)
+class FrameHandle:
+    """Small picklable reference to a frame held in a SharedFrameRing slot."""
+
+    name: str
+    slot: int
+    offset: int
+    shape: t.Tuple[int, ...]
+    dtype: str
+    generation: int
+
+    def view(self) -> np.ndarray:
+        """Map the frame as a numpy array without copying it.
+
+        The array is only valid until the slot is released, so copy it if it has to outlive
+        the handle.
+        """
+        shm = attach(self.name)
+        generations = np.ndarray((self.slot + 1,), dtype=_HEADER_ITEM, buffer=shm.buf)
+        if int(generations[self.slot]) != self.generation:
+            raise StaleFrameError(f"Frame slot {self.slot} of {self.name} was reused")
+        return np.ndarray(
+            self.shape, dtype=np.dtype(self.dtype), buffer=shm.buf, offset=self.offset
+        )
+
+
+class SharedFrameRing:
+    """Fixed set of frame slots in one shared memory block.
+
+    The owning process copies each frame into a free slot once and passes the FrameHandle to
+    worker processes, which map the slot instead of unpickling a copy of the frame. Slots are
+    returned to the ring with release once every consumer is done with the frame.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: t.Optional[str] = None):
+        self.slots = max(int(slots), 1)
+        self.slot_bytes = int(math.ceil(slot_bytes / _ALIGN) * _ALIGN)
+        self.header_bytes = int(math.ceil(self.slots * _HEADER_ITEM.itemsize / _ALIGN) * _ALIGN)
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=True, size=self.header_bytes + self.slots * self.slot_bytes
+        )
+        _OWNED[self.shm.name] = self.shm
+        self._generations = np.ndarray((self.slots,), dtype=_HEADER_ITEM, buffer=self.shm.buf)
+        self._generations[:] = 0
+        self._free: t.List[int] = list(range(self.slots))
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @classmethod
+    def for_frame(
+        cls, shape: t.Sequence[int], dtype: t.Any = np.uint8, slots: int = 8
+    ) -> "SharedFrameRing":
+        """Create a ring sized for frames of a given shape and dtype."""
+        slot_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return cls(slots=slots, slot_bytes=slot_bytes)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name!r}, slots={self.slots}, "
+            f"slot_bytes={self.slot_bytes}, free={self.free})"
+        )
+
+    def __enter__(self) -> "SharedFrameRing":
+        return self
+
+    def __exit__(self, *exc: t.Any) -> None:
+        self.close()
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self.shm.name
+
+    @property
+    def free(self) -> int:
+        """Number of slots currently free."""
+        return len(self._free)
+
+    def put(self, frame: np.ndarray, timeout: t.Optional[float] = None) -> FrameHandle:
+        """Copy a frame into a free slot, waiting up to timeout seconds for one to be released."""
+        frame = np.asarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(
+                f"Frame of {frame.nbytes} bytes exceeds slot of {self.slot_bytes} bytes"
+            )
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._free or self._closed, timeout=timeout):
+                raise TimeoutError(f"No free frame slot after {timeout} seconds")
+            if self._closed:
+                raise ValueError("Frame ring is closed")
+            slot = self._free.pop()
+            self._generations[slot] += 1
+            generation = int(self._generations[slot])
+
+        offset = self.header_bytes + slot * self.slot_bytes
+        target = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf, offset=offset)
+        target[...] = frame
+        return FrameHandle(
+            name=self.name,
+            slot=slot,
+            offset=offset,
+            shape=tuple(frame.shape),
+            dtype=frame.dtype.str,
+            generation=generation,
+        )
+
+    def view(self, handle: FrameHandle) -> np.ndarray:
+        """Map a frame held by this ring without copying it."""
+        return handle.view()
+
+    def release(self, handle: FrameHandle) -> None:
+        """Return a handle's slot to the ring; views of it become invalid."""
+        with self._cond:
+            if int(self._generations[handle.slot]) != handle.generation:
+                raise StaleFrameError(f"Frame slot {handle.slot} of {self.name} already released")
+            # bump the generation so outstanding handles to the slot are detected as stale
+            self._generations[handle.slot] += 1
+            self._free.append(handle.slot)
+            self._cond.notify()
+
+    def close(self, unlink: bool = True) -> None:
+        """Release the shared memory block, unlinking it when this process owns it."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        with _ATTACH_LOCK:
+            _OWNED.pop(self.name, None)
+        del self._generations
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
@@ -0,0 +1,37 @@
+import pathlib
+import typing as t
+
+import cv2
+import numpy as np
+import pytest
+
+from roboflow_gap.analyze import Analyze, StubModel
+from roboflow_gap.gather import GatherFromDirectory
+from roboflow_gap.pipeline import Pipeline
+from roboflow_gap.process import ProcessBase
+
+
+@pytest.fixture()
+def image_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    """A directory of ten random 64x48 images named 0.png to 9.png."""
+    directory = tmp_path / "images"
+    directory.mkdir()
+    rng = np.random.default_rng(0)
+    for index in range(10):
+        image = rng.integers(0, 255, (48, 64, 3), dtype=np.uint8)
+        cv2.imwrite(str(directory / f"{index}.png"), image)
+    return directory
+
+
+@pytest.fixture()
+def stub_pipeline(image_dir: pathlib.Path) -> t.Callable[..., Pipeline]:
+    """Build a pipeline gathering image_dir and analyzing it with a StubModel."""
+
+    def build(*processors: ProcessBase, num_detections: int = 1, **gather: t.Any) -> Pipeline:
+        return Pipeline(
+            GatherFromDirectory(directories=image_dir, **gather),
+            Analyze(api_key="", model_id="stub/1", model=StubModel(num_detections=num_detections)),
+            processors=list(processors),
+        )
+
+    return build
@@ -0,0 +1,55 @@
+import asyncio
+import typing as t
+
+import numpy as np
+import pytest
+import supervision as sv
+
+from roboflow_gap.analyze import Preprocess
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.process import Annotate
+
+
+def drawn_box(image_data: ImageData) -> t.Tuple[int, int, int, int]:
+    """Bounding box (x1, y1, x2, y2) of the pixels the annotator changed."""
+    changed = np.any(image_data.processed != image_data.get_original(), axis=2)
+    rows, columns = np.nonzero(changed)
+    return columns.min(), rows.min(), columns.max(), rows.max()
+
+
+def render(image_data: ImageData) -> None:
+    annotate = Annotate(annotators=["BoxAnnotator"], render="always")
+    asyncio.run(annotate.process_batch([image_data]))
+
+
+def source_detections() -> sv.Detections:
+    # detections leave Analyze in source image coordinates
+    return sv.Detections(
+        xyxy=np.array([[40, 20, 120, 60]], dtype=np.float32), class_id=np.array([0])
+    )
+
+
+@pytest.mark.parametrize("mode", ["letterbox", "resize"])
+def test_boxes_are_drawn_in_preprocessed_frame_coordinates(mode: str) -> None:
+    image_data = ImageData(original=np.zeros((100, 200, 3), dtype=np.uint8))
+    Preprocess(size=(100, 100), mode=mode).preprocess_image(image_data)
+    image_data.analysis = {"detections": source_detections()}
+
+    render(image_data)
+
+    # letterbox halves the frame and pads 25 rows above, resize halves x only
+    expected = (20, 35, 60, 55) if mode == "letterbox" else (20, 20, 60, 60)
+    assert np.allclose(drawn_box(image_data), expected, atol=2)
+    # the analysis itself stays in source coordinates
+    assert image_data.analysis["detections"].xyxy.tolist() == [[40, 20, 120, 60]]
+
+
+def test_boxes_are_drawn_on_reduced_decode_frames() -> None:
+    image_data = ImageData(
+        original=np.zeros((50, 100, 3), dtype=np.uint8), context={"decode_scale": 2}
+    )
+    image_data.analysis = {"detections": source_detections()}
+
+    render(image_data)
+
+    assert np.allclose(drawn_box(image_data), (20, 10, 60, 30), atol=2)
@@ -0,0 +1,44 @@
+import asyncio
+import time
+import typing as t
+
+from roboflow_gap.utils.batches import batch_stream
+
+
+async def produce(items: t.Sequence[t.Tuple[int, float]]) -> t.AsyncIterator[int]:
+    """Yield each item after sleeping its delay in seconds."""
+    for item, delay in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def collect(
+    items: t.AsyncIterable[int], **kwargs: t.Any
+) -> t.List[t.Tuple[t.List[int], float]]:
+    started = time.monotonic()
+    return [(x, time.monotonic() - started) async for x in batch_stream(items, **kwargs)]
+
+
+def test_batches_flush_at_max_batch_size() -> None:
+    batches = asyncio.run(
+        collect(produce([(x, 0) for x in range(10)]), max_batch_size=4, max_wait_ms=10_000)
+    )
+
+    assert [x for x, _ in batches] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    # full batches never wait for the timeout
+    assert batches[-1][1] < 1.0
+
+
+def test_batches_flush_after_max_wait() -> None:
+    # a slow producer: 0 and 1 arrive together, 2 arrives well after the wait ran out
+    items = [(0, 0), (1, 0), (2, 0.5)]
+    batches = asyncio.run(collect(produce(items), max_batch_size=8, max_wait_ms=50))
+
+    assert [x for x, _ in batches] == [[0, 1], [2]]
+    # the first batch is yielded at the deadline, not when the next item arrives
+    assert batches[0][1] < 0.4
+
+
+def test_batches_empty_stream() -> None:
+    assert asyncio.run(collect(produce([]), max_batch_size=4)) == []
@@ -0,0 +1,43 @@
+import asyncio
+
+import numpy as np
+
+from roboflow_gap.analyze import Analyze, NearDuplicateIndex, Preprocess, StubModel
+from roboflow_gap.models.image_data import ImageData
+
+
+def dedup_analyze() -> Analyze:
+    return Analyze(
+        api_key="",
+        model_id="stub/1",
+        model=StubModel(num_detections=2),
+        dedup=NearDuplicateIndex(max_distance=64),
+    )
+
+
+def test_frames_of_different_sources_are_not_duplicates() -> None:
+    preprocess = Preprocess(size=(32, 32), mode="resize")
+    small, large = (
+        preprocess.preprocess_image(ImageData(original=np.zeros(shape, dtype=np.uint8)))
+        for shape in ((32, 64, 3), (64, 128, 3))
+    )
+    # the same preprocessed frame, but detections in source coordinates of another size
+    assert small.get_original().shape == large.get_original().shape
+
+    asyncio.run(dedup_analyze().analyze_batch([small, large]))
+
+    assert not large.context.get("duplicate")
+    assert large.analysis["detections"].xyxy.max() > small.analysis["detections"].xyxy.max()
+
+
+def test_duplicates_get_their_own_copy_of_the_analysis() -> None:
+    images = [ImageData(original=np.zeros((32, 32, 3), dtype=np.uint8)) for _ in range(3)]
+
+    asyncio.run(dedup_analyze().analyze_batch(images))
+    analyzed, first, second = (x.analysis["detections"] for x in images)
+    first.xyxy += 1
+
+    assert images[1].context["duplicate"] and images[2].context["duplicate"]
+    assert first is not analyzed and second is not analyzed
+    assert np.array_equal(analyzed.xyxy, second.xyxy)
+    assert not np.array_equal(analyzed.xyxy, first.xyxy)
@@ -0,0 +1,73 @@
+import os
+import pathlib
+import typing as t
+
+import cv2
+import numpy as np
+import pytest
+
+from roboflow_gap.gather import FrameStore
+
+
+def write_images(directory: pathlib.Path, value: int, count: int = 4) -> t.List[pathlib.Path]:
+    directory.mkdir(exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = directory / f"{index}.png"
+        cv2.imwrite(str(path), np.full((16, 16, 3), value + index, dtype=np.uint8))
+        # a new modification time, so packing again sees the files as changed
+        os.utime(path, ns=(value, value))
+        paths.append(path)
+    return paths
+
+
+def values(store: FrameStore) -> t.List[int]:
+    return [int(store[x][0, 0, 0]) for x in range(len(store))]
+
+
+def test_repacked_frames_are_compacted_away(tmp_path: pathlib.Path) -> None:
+    store = FrameStore(tmp_path / "store")
+    paths = write_images(tmp_path / "images", value=10)
+    store.pack(paths)
+    first = store.data_path
+    size = first.stat().st_size
+
+    write_images(tmp_path / "images", value=20)
+    store.pack(paths, compact_ratio=None)
+    assert store.dead_bytes == size
+    assert values(store) == [20, 21, 22, 23]
+
+    assert store.compact() == size
+    assert store.dead_bytes == 0
+    assert values(store) == [20, 21, 22, 23]
+    assert not first.exists()
+    assert values(FrameStore(tmp_path / "store")) == [20, 21, 22, 23]
+
+
+def test_pack_compacts_once_dead_bytes_pass_the_ratio(tmp_path: pathlib.Path) -> None:
+    store = FrameStore(tmp_path / "store")
+    paths = write_images(tmp_path / "images", value=10)
+    store.pack(paths)
+
+    write_images(tmp_path / "images", value=20)
+    store.pack(paths[:1])
+    # one of five frames in the data file is dead, below the default ratio
+    assert store.dead_bytes > 0
+
+    write_images(tmp_path / "images", value=30)
+    store.pack(paths)
+    # five of nine are, so the pack compacts
+    assert store.dead_bytes == 0
+    assert values(store) == [30, 31, 32, 33]
+
+
+def test_data_of_an_empty_store_is_a_clear_error(tmp_path: pathlib.Path) -> None:
+    store = FrameStore(tmp_path / "store")
+    with pytest.raises(FileNotFoundError, match="No frames packed"):
+        store.data()
+
+    store.pack(write_images(tmp_path / "images", value=10))
+    store.close()
+    store.data_path.write_bytes(b"")
+    with pytest.raises(FileNotFoundError, match="No frames packed"):
+        store[0]
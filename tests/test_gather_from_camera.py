@@ -0,0 +1,68 @@
+import asyncio
+import time
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.analyze import Analyze, StubModel
+from roboflow_gap.gather import GatherFromCamera
+from roboflow_gap.pipeline import Pipeline
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in producing numbered frames at a fixed rate."""
+
+    def __init__(self, fps: float = 100.0):
+        self.fps = fps
+        self.index = 0
+        self.released = False
+
+    def get(self, prop: int) -> float:
+        return self.fps
+
+    def grab(self) -> bool:
+        time.sleep(1 / self.fps)
+        self.index += 1
+        return True
+
+    def read(self) -> t.Tuple[bool, np.ndarray]:
+        self.grab()
+        return True, np.full((24, 32, 3), self.index % 256, dtype=np.uint8)
+
+    def release(self) -> None:
+        self.released = True
+
+
+def test_report_latency_sets_skip() -> None:
+    camera = GatherFromCamera(fps=30, latency_smoothing=1.0, max_skip=10)
+
+    camera.report_latency(0.2)
+    assert camera.skip == 5
+    camera.report_latency(1.0)
+    assert camera.skip == 10
+    camera.report_latency(0.01)
+    assert camera.skip == 0
+
+
+def test_pipeline_reports_analyze_latency_to_camera() -> None:
+    capture = FakeCapture(fps=100)
+    camera = GatherFromCamera(
+        capture_factory=lambda _: capture, max_images=12, latency_smoothing=1.0
+    )
+    pipeline = Pipeline(
+        camera,
+        Analyze(api_key="", model_id="stub/1", model=StubModel(per_image_latency=0.05)),
+        queue_size=1,
+    )
+
+    async def collect() -> t.List[t.Any]:
+        return [x async for x in pipeline.stream()]
+
+    items = asyncio.run(collect())
+
+    assert len(items) == 12
+    # about 50ms of inference per frame at 100fps, so about 4 frames are skipped between reads
+    assert 0.05 <= camera.latency < 0.5
+    assert camera.skip >= 4
+    assert items[-1].context["skipped"] > 0
+    assert capture.released
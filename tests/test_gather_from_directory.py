@@ -0,0 +1,51 @@
+import asyncio
+import pathlib
+import threading
+import time
+import typing as t
+
+import pytest
+
+from roboflow_gap.gather import GatherFromDirectory, Manifest, gather_from_directory
+
+
+def gather_paths(gatherer: GatherFromDirectory) -> t.List[str]:
+    async def collect() -> t.List[str]:
+        return [x.context["path"].name async for x in gatherer.run()]
+
+    return asyncio.run(collect())
+
+
+def test_scanning_runs_off_the_event_loop(
+    image_dir: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    threads: t.Set[int] = set()
+    scan_paths = gather_from_directory.scan_paths
+
+    def recording_scan_paths(*args: t.Any, **kwargs: t.Any) -> t.Iterator[pathlib.Path]:
+        for path in scan_paths(*args, **kwargs):
+            threads.add(threading.get_ident())
+            yield path
+
+    monkeypatch.setattr(gather_from_directory, "scan_paths", recording_scan_paths)
+    manifest = Manifest(tmp_path / "manifest.db")
+    done = image_dir / "0.png"
+    manifest.mark(done, "done", *gather_from_directory.stat_signature(done))
+
+    names = gather_paths(GatherFromDirectory(directories=image_dir, manifest=manifest, prefetch=2))
+    manifest.close()
+
+    assert names == [f"{x}.png" for x in range(1, 10)]
+    assert threads and threading.get_ident() not in threads
+
+
+def test_manifest_checkpoints_on_time_without_new_writes(tmp_path: pathlib.Path) -> None:
+    manifest = Manifest(tmp_path / "manifest.db", checkpoint_seconds=0.05)
+    manifest.mark("a.png", "pending", 1, 1)
+
+    deadline = time.monotonic() + 5
+    while not manifest.counts() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert manifest.counts() == {"pending": 1}
+    manifest.close()
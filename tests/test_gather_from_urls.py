@@ -0,0 +1,123 @@
+import asyncio
+import collections
+import http.server
+import threading
+import typing as t
+
+import cv2
+import numpy as np
+import pytest
+
+from roboflow_gap.gather import GatherFromUrls
+from roboflow_gap.models.image_data import ImageData
+
+pytest.importorskip("aiohttp")
+
+IMAGE: bytes = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes()
+
+
+class ImageServer:
+    """Local HTTP server with a url per behaviour, counting requests per path."""
+
+    def __init__(self):
+        self.hits: t.Counter[str] = collections.Counter()
+        self.conditional: t.List[str] = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                server.hits[self.path] += 1
+                if self.headers.get("If-None-Match"):
+                    server.conditional.append(self.path)
+                if self.path == "/image.png":
+                    if self.headers.get("If-None-Match") == '"v1"':
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    self.send_body(IMAGE, etag='"v1"')
+                elif self.path == "/flaky.png" and server.hits[self.path] <= 2:
+                    self.send_error(503)
+                elif self.path == "/flaky.png":
+                    self.send_body(IMAGE)
+                elif self.path == "/broken.png":
+                    self.send_body(b"not an image", etag='"broken"')
+                else:
+                    self.send_error(404)
+
+            def send_body(self, body: bytes, etag: t.Optional[str] = None) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: t.Any) -> None:  # noqa: A002
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+
+@pytest.fixture()
+def server() -> t.Iterator[ImageServer]:
+    server = ImageServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def poll_twice(gatherer: GatherFromUrls) -> t.List[t.List[ImageData]]:
+    async def run() -> t.List[t.List[ImageData]]:
+        async with gatherer.build_session() as session:
+            return [[x async for x in gatherer.poll(session)] for _ in range(2)]
+
+    return asyncio.run(run())
+
+
+def test_unchanged_url_costs_a_304(server: ImageServer) -> None:
+    gatherer = GatherFromUrls(urls=server.url("/image.png"))
+
+    first, second = poll_twice(gatherer)
+
+    assert len(first) == 1
+    assert first[0].error is None
+    assert first[0].get_original().shape == (8, 8, 3)
+    assert second == []
+    assert server.conditional == ["/image.png"]
+    assert gatherer.stats.not_modified == 1
+
+
+def test_error_statuses_are_retried_only_when_transient(server: ImageServer) -> None:
+    gatherer = GatherFromUrls(
+        urls=[server.url("/missing.png"), server.url("/flaky.png")], retries=3, backoff=0.01
+    )
+
+    first, _ = poll_twice(gatherer)
+    results = {x.context["url"].rsplit("/", 1)[-1]: x for x in first}
+
+    assert "404" in results["missing.png"].error
+    assert results["missing.png"].context["attempts"] == 1
+    assert results["flaky.png"].error is None
+    assert results["flaky.png"].context["attempts"] == 3
+    # the 404 is not retried, the 503s are, and every poll asks again
+    assert server.hits["/missing.png"] == 2
+    assert server.hits["/flaky.png"] == 4
+    assert gatherer.stats.retries == 2
+
+
+def test_state_is_only_kept_for_bodies_that_decode(server: ImageServer) -> None:
+    gatherer = GatherFromUrls(urls=server.url("/broken.png"), retries=0)
+
+    first, second = poll_twice(gatherer)
+
+    # the undecodable body is reported again instead of being skipped as unchanged
+    assert first[0].error is not None
+    assert second[0].error is not None
+    assert server.conditional == []
@@ -0,0 +1,43 @@
+import asyncio
+import pathlib
+
+import numpy as np
+import pytest
+
+from roboflow_gap.gather import GatherFromVideo
+
+
+@pytest.fixture()
+def video_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Two seconds of 30fps video with a keyframe every 5 frames."""
+    av = pytest.importorskip("av")
+    path = tmp_path / "video.mp4"
+    with av.open(str(path), mode="w") as container:
+        # a keyframe every 5 frames, and none on scene changes
+        stream = container.add_stream(
+            "mpeg4", rate=30, options={"g": "5", "sc_threshold": "1000000000"}
+        )
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        for index in range(60):
+            image = np.full((48, 64, 3), index * 4, dtype=np.uint8)
+            frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+            container.mux(stream.encode(frame))
+        container.mux(stream.encode())
+    return path
+
+
+def gather_indexes(gatherer: GatherFromVideo) -> list:
+    async def collect() -> list:
+        return [x.context["frame_index"] async for x in gatherer.run()]
+
+    return asyncio.run(collect())
+
+
+def test_keyframes_follow_target_fps(video_path: pathlib.Path) -> None:
+    every = gather_indexes(GatherFromVideo(path=video_path, keyframes_only=True))
+    sampled = gather_indexes(GatherFromVideo(path=video_path, keyframes_only=True, target_fps=3))
+
+    assert every == list(range(0, 60, 5))
+    # 3fps of a 30fps video is one frame in 10
+    assert sampled == list(range(0, 60, 10))
+    assert sampled == gather_indexes(GatherFromVideo(path=video_path, target_fps=3))
@@ -0,0 +1,21 @@
+import asyncio
+import os
+import pathlib
+
+import pytest
+
+import roboflow_gap
+from roboflow_gap.bench.bench import BenchConfig, bench_import, check_budgets
+
+
+def test_import_stays_light_and_within_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Importing the package and listing gatherers loads no heavy module such as cv2."""
+    # the fresh interpreters import the package from the same tree as this test run
+    source = str(pathlib.Path(roboflow_gap.__file__).parents[1])
+    paths = [source, os.getenv("PYTHONPATH")]
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(x for x in paths if x))
+    config = BenchConfig(import_runs=3)
+    imported = asyncio.run(bench_import(config))
+
+    assert imported["heavy_modules"] == []
+    assert check_budgets({"scenarios": {"import": imported}}, config) == []
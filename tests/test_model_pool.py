@@ -0,0 +1,99 @@
+import asyncio
+import typing as t
+
+import numpy as np
+
+from roboflow_gap.analyze import Analyze, ModelPool, StubModel, load_stub_model
+from roboflow_gap.models.image_data import ImageData
+
+
+def counting_loader() -> t.Tuple[t.Callable[..., StubModel], t.List[str]]:
+    loaded: t.List[str] = []
+
+    def loader(model_id: str, **params: t.Any) -> StubModel:
+        loaded.append(model_id)
+        return load_stub_model(model_id, **params)
+
+    return loader, loaded
+
+
+def test_model_loads_once_per_id_and_params() -> None:
+    loader, loaded = counting_loader()
+    pool = ModelPool(loader=loader, replicas=2)
+
+    first = pool.load("a/1", api_key="x")
+    assert pool.load("a/1", api_key="y") is first
+    pool.load("a/1", num_detections=3)
+
+    # api_key does not select the model, other loader params do
+    assert loaded == ["a/1"] * 4
+    assert len(first.replicas) == 2
+    # every replica was warmed up with one inference
+    assert [x.infer_calls for x in first.replicas] == [1, 1]
+
+
+def test_checkout_hands_out_each_replica_once() -> None:
+    pool = ModelPool(loader=load_stub_model, replicas=2, warmup=False)
+
+    async def run() -> t.Tuple[t.Set[int], int]:
+        held: t.List[t.Any] = []
+        release = asyncio.Event()
+
+        async def use() -> None:
+            async with pool.checkout("a/1") as model:
+                held.append(model)
+                await release.wait()
+
+        tasks = [asyncio.create_task(use()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        # two replicas, so the third caller is still waiting
+        busy = {id(x) for x in held}
+        assert len(held) == 2
+        assert pool.get("a/1").in_use == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        return busy, len(held)
+
+    busy, total = asyncio.run(run())
+    pooled = pool.get("a/1")
+    assert len(busy) == 2
+    assert total == 3
+    assert pooled.in_use == 0
+    assert (pooled.checkouts, pooled.waits) == (3, 1)
+
+
+def test_budget_evicts_least_recently_used_idle_models() -> None:
+    pool = ModelPool(loader=load_stub_model, warmup=False, memory_budget=250, sizer=lambda _: 100)
+
+    async def run() -> None:
+        pool.load("a/1")
+        pool.load("b/1")
+        # using a makes b the least recently used
+        async with pool.checkout("a/1"):
+            pass
+        pool.load("c/1")
+        assert "b/1" not in pool
+        assert {"a/1", "c/1"} <= {x["model_id"] for x in pool.stats()["models"]}
+
+        # a model in use is never evicted, even when it is the least recently used
+        async with pool.checkout("a/1"):
+            pool.load("c/1")
+            pool.load("d/1")
+            assert "a/1" in pool
+            assert "c/1" not in pool
+
+    asyncio.run(run())
+    assert pool.evictions == 2
+
+
+def test_analyze_runs_one_inference_thread_per_replica() -> None:
+    pool = ModelPool(loader=load_stub_model, replicas=3, warmup=False)
+    analyze = Analyze(api_key="", model_id="stub/1", pool=pool)
+    assert analyze.executor.workers == 3
+
+    images = [ImageData(original=np.zeros((16, 16, 3), dtype=np.uint8)) for _ in range(2)]
+    asyncio.run(analyze.analyze_batch(images))
+
+    assert all(x.error is None and len(x.analysis["detections"]) for x in images)
+    assert pool.get("stub/1").checkouts == 1
+
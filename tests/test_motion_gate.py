@@ -0,0 +1,53 @@
+import asyncio
+import typing as t
+import warnings
+
+import numpy as np
+
+from roboflow_gap.analyze import Analyze, MotionGate, StubModel
+from roboflow_gap.analyze.motion_gate import default_tracker
+from roboflow_gap.models.image_data import ImageData
+
+
+class CountingTracker:
+    """Tracker wrapper counting the detections it is given."""
+
+    def __init__(self):
+        self.tracker = default_tracker()
+        self.updates = 0
+
+    def update_with_detections(self, detections: t.Any) -> t.Any:
+        self.updates += 1
+        return self.tracker.update_with_detections(detections)
+
+
+def test_default_tracker_does_not_warn() -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        default_tracker()
+
+
+def test_gated_frames_carry_tracked_detections_without_tracking() -> None:
+    trackers: t.List[CountingTracker] = []
+
+    def tracker_factory() -> CountingTracker:
+        trackers.append(CountingTracker())
+        return trackers[-1]
+
+    gate = MotionGate(max_skip=10, refresh_seconds=None, tracker_factory=tracker_factory)
+    analyze = Analyze(
+        api_key="", model_id="stub/1", model=StubModel(num_detections=2), motion_gate=gate
+    )
+    images = [ImageData(original=np.zeros((32, 32, 3), dtype=np.uint8)) for _ in range(4)]
+
+    asyncio.run(analyze.analyze_batch(images))
+
+    assert (gate.analyzed, gate.skipped) == (1, 3)
+    # only the analyzed frame went through the tracker
+    assert trackers[0].updates == 1
+    tracked = images[0].analysis["tracked"]
+    for image_data in images[1:]:
+        assert image_data.context["motion_skipped"]
+        carried = image_data.analysis["detections"]
+        assert carried is not tracked
+        assert carried.tracker_id.tolist() == tracked.tracker_id.tolist()
@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+
+from roboflow_gap.analyze import Analyze, NearDuplicateIndex, Preprocess, ResultCache, StubModel
+from roboflow_gap.analyze.tiling import Tiler
+from roboflow_gap.models.image_data import ImageData
+
+
+def frame(value: int, shape: tuple = (64, 96, 3)) -> ImageData:
+    return ImageData(original=np.full(shape, value, dtype=np.uint8), context={"digest": "same"})
+
+
+def test_near_duplicates_are_not_cached() -> None:
+    cache = ResultCache()
+    analyze = Analyze(
+        api_key="",
+        model_id="stub/1",
+        model=StubModel(),
+        cache=cache,
+        dedup=NearDuplicateIndex(max_distance=64),
+    )
+    first = ImageData(original=np.zeros((32, 32, 3), np.uint8), context={"digest": "first"})
+    second = ImageData(original=np.ones((32, 32, 3), np.uint8), context={"digest": "second"})
+
+    asyncio.run(analyze.analyze_batch([first, second]))
+
+    assert second.context.get("duplicate")
+    assert len(cache.get_many([analyze.get_cache_key(first)])) == 1
+    assert not cache.get_many([analyze.get_cache_key(second)])
+
+
+def test_cache_key_covers_preprocess_decode_and_tiling() -> None:
+    analyze = Analyze(api_key="", model_id="stub/1", model=StubModel())
+    plain = frame(0)
+    keys = {analyze.get_cache_key(plain)}
+
+    letterboxed = Preprocess(size=(32, 32)).preprocess_image(frame(0))
+    resized = Preprocess(size=(32, 32), mode="resize").preprocess_image(frame(0))
+    reduced = frame(0)
+    reduced.context["decode_scale"] = 2
+    keys |= {analyze.get_cache_key(x) for x in (letterboxed, resized, reduced)}
+    analyze.tiler = Tiler(tile_size=(32, 32))
+    keys.add(analyze.get_cache_key(plain))
+
+    assert len(keys) == 5
@@ -0,0 +1,83 @@
+import asyncio
+import datetime
+import json
+import pathlib
+import time
+import typing as t
+
+import numpy as np
+import pytest
+import supervision as sv
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.pipeline import Pipeline
+from roboflow_gap.process import ResultsSink
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_pipeline_sink_file_is_readable(
+    tmp_path: pathlib.Path, stub_pipeline: t.Callable[..., Pipeline], output_format: str
+) -> None:
+    pa = pytest.importorskip("pyarrow")
+    path = tmp_path / f"results.{output_format}"
+    sink = ResultsSink(path=path, format=output_format, flush_rows=5)
+    pipeline = stub_pipeline(sink, num_detections=3)
+
+    asyncio.run(pipeline.run())
+
+    if output_format == "parquet":
+        table = pytest.importorskip("pyarrow.parquet").read_table(path)
+    else:
+        with pa.ipc.open_stream(str(path)) as reader:
+            table = reader.read_all()
+    assert table.num_rows == 10 * 3
+    assert sink.rows_written == table.num_rows
+
+
+def detected_image(date: datetime.datetime) -> ImageData:
+    detections = sv.Detections(
+        xyxy=np.array([[1, 2, 3, 4]], dtype=np.float32),
+        confidence=np.array([0.9], dtype=np.float32),
+        class_id=np.array([0]),
+    )
+    return ImageData(
+        original=None,
+        date_started=date,
+        context={"path": "a.png"},
+        analysis={"detections": detections},
+    )
+
+
+def test_timestamps_are_utc(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # naive dates from get_now are UTC, whatever the local timezone is
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    sink = ResultsSink(path=tmp_path / "results.jsonl")
+
+    async def run() -> None:
+        await sink.process(detected_image(datetime.datetime(2024, 1, 1)))
+        await sink.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    row = json.loads((tmp_path / "results.jsonl").read_text())
+    assert row["timestamp"] == 1704067200.0
+
+
+def test_buffered_rows_flush_on_time_without_new_items(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "results.jsonl"
+    sink = ResultsSink(path=path, flush_rows=1000, flush_seconds=0.1)
+
+    async def run() -> int:
+        await sink.process(detected_image(datetime.datetime(2024, 1, 1)))
+        await asyncio.sleep(0.4)
+        written = sink.rows_written
+        await sink.close()
+        return written
+
+    assert asyncio.run(run()) == 1
+    assert len(path.read_text().splitlines()) == 1
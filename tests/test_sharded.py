@@ -0,0 +1,159 @@
+import asyncio
+import os
+import pathlib
+import signal
+import time
+import typing as t
+
+import numpy as np
+import pytest
+
+from roboflow_gap.analyze import ShardedAnalyze, StubModel, load_stub_model
+from roboflow_gap.analyze.sharded import WorkerCrashedError
+from roboflow_gap.models.image_data import ImageData
+
+# workers are spawned, so loaders and models must be importable from this module
+
+
+def load_slowly_once_marked(model_id: str, marker: str, **params: t.Any) -> StubModel:
+    """Load a StubModel, taking two seconds once the marker file exists."""
+    if os.path.exists(marker):
+        time.sleep(2.0)
+    return load_stub_model(model_id, **params)
+
+
+class HungryModel(StubModel):
+    """A StubModel allocating nbytes on every inference."""
+
+    def __init__(self, nbytes: int, **params: t.Any):
+        super().__init__(**params)
+        self.nbytes = nbytes
+
+    def infer(self, image: t.Any, **params: t.Any) -> t.Any:
+        np.ones(self.nbytes, dtype=np.uint8)
+        return super().infer(image=image, **params)
+
+
+def load_hungry_model(model_id: str, nbytes: int, **params: t.Any) -> HungryModel:
+    params.pop("api_key", None)
+    return HungryModel(nbytes=nbytes, **params)
+
+
+def images(count: int) -> t.List[ImageData]:
+    return [ImageData(original=np.zeros((16, 16, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+def wait_for(condition: t.Callable[[], bool], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def worker_pids(analyzer: ShardedAnalyze) -> t.Dict[int, t.Optional[int]]:
+    return {x["worker_id"]: x["pid"] for x in analyzer.stats()["workers"]}
+
+
+def test_crashed_worker_is_restarted_and_its_batch_retried() -> None:
+    analyzer = ShardedAnalyze(
+        api_key="",
+        model_id="stub/1",
+        workers=1,
+        loader=load_stub_model,
+        loader_params={"latency": 1.0},
+        warmup_shape=None,
+    )
+
+    async def run() -> t.List[ImageData]:
+        batch = asyncio.ensure_future(analyzer.analyze_batch(images(2)))
+        # kill the worker while it holds the batch
+        await asyncio.to_thread(wait_for, lambda: analyzer.stats()["workers"][0]["in_flight"])
+        (pid,) = worker_pids(analyzer).values()
+        os.kill(pid, signal.SIGKILL)
+        return await batch
+
+    with analyzer:
+        (first,) = worker_pids(analyzer)
+        results = asyncio.run(run())
+
+        assert all(x.error is None and len(x.analysis["detections"]) for x in results)
+        assert analyzer.restarts == 1
+        assert first not in worker_pids(analyzer)
+        assert analyzer.alive == 1
+
+
+def test_batches_go_to_ready_workers_while_replacement_loads(tmp_path: pathlib.Path) -> None:
+    marker = tmp_path / "slow"
+    analyzer = ShardedAnalyze(
+        api_key="",
+        model_id="stub/1",
+        workers=2,
+        loader=load_slowly_once_marked,
+        loader_params={"marker": str(marker)},
+        warmup_shape=None,
+    )
+
+    with analyzer:
+        marker.touch()
+        killed, survivor = worker_pids(analyzer).items()
+        os.kill(killed[1], signal.SIGKILL)
+        wait_for(lambda: len(worker_pids(analyzer)) == 2 and killed[0] not in worker_pids(analyzer))
+
+        async def run() -> t.List[ImageData]:
+            batches = [analyzer.analyze_batch(images(2)) for _ in range(4)]
+            return [x for batch in await asyncio.gather(*batches) for x in batch]
+
+        results = asyncio.run(run())
+        stats = {x["worker_id"]: x for x in analyzer.stats()["workers"]}
+
+        assert all(x.error is None for x in results)
+        # the replacement was still loading, so the survivor analyzed every batch
+        replacement = next(x for x in stats.values() if x["worker_id"] != survivor[0])
+        assert not replacement["ready"]
+        assert replacement["done"] == 0
+        assert stats[survivor[0]]["done"] == 4
+
+
+def test_memory_limit_fails_allocations_not_the_worker() -> None:
+    pytest.importorskip("resource")
+    analyzer = ShardedAnalyze(
+        api_key="",
+        model_id="stub/1",
+        workers=1,
+        loader=load_hungry_model,
+        loader_params={"nbytes": 8 << 30},
+        memory_limit=4 << 30,
+        warmup_shape=None,
+    )
+
+    with analyzer:
+        (result,) = asyncio.run(analyzer.analyze_batch(images(1)))
+
+        assert "MemoryError" in result.error
+        assert analyzer.restarts == 0
+        assert analyzer.alive == 1
+
+
+def test_no_workers_left_fails_batches() -> None:
+    analyzer = ShardedAnalyze(
+        api_key="",
+        model_id="stub/1",
+        workers=1,
+        loader=load_stub_model,
+        loader_params={"latency": 1.0},
+        warmup_shape=None,
+        max_restarts=0,
+    )
+
+    async def run() -> ImageData:
+        batch = asyncio.ensure_future(analyzer.analyze_batch(images(1)))
+        await asyncio.to_thread(wait_for, lambda: analyzer.stats()["workers"][0]["in_flight"])
+        (pid,) = worker_pids(analyzer).values()
+        os.kill(pid, signal.SIGKILL)
+        (result,) = await batch
+        return result
+
+    with analyzer:
+        result = asyncio.run(run())
+
+    assert isinstance(result.error_exc, WorkerCrashedError)
@@ -0,0 +1,51 @@
+import asyncio
+import pathlib
+import sqlite3
+import typing as t
+
+import numpy as np
+import supervision as sv
+
+from roboflow_gap.models.image_data import ImageData
+from roboflow_gap.pipeline import Pipeline
+from roboflow_gap.process import DetectionStore, StoreDetections
+
+
+def test_pipeline_stores_every_detection(
+    image_dir: pathlib.Path, tmp_path: pathlib.Path, stub_pipeline: t.Callable[..., Pipeline]
+) -> None:
+    store = DetectionStore(tmp_path / "detections.db")
+    stage = StoreDetections(store=store, flush_rows=7)
+    pipeline = stub_pipeline(stage, num_detections=2)
+
+    asyncio.run(pipeline.run())
+
+    assert stage.rows_written == store.count() == 10 * 2
+    first = str(image_dir / "0.png")
+    assert store.count(sources=[first]) == 2
+    assert {x.source for x in store.query(sources=[first])} == {first}
+    assert store.classes() == {0: "object"}
+    store.close()
+    # close sampled the indexes, so the planner has statistics for them
+    with sqlite3.connect(tmp_path / "detections.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+
+
+def test_buffered_rows_are_stored_on_time_without_new_items(tmp_path: pathlib.Path) -> None:
+    store = DetectionStore(tmp_path / "detections.db")
+    stage = StoreDetections(store=store, flush_seconds=0.1)
+    detections = sv.Detections(
+        xyxy=np.array([[1, 2, 3, 4]], dtype=np.float32),
+        confidence=np.array([0.9], dtype=np.float32),
+        class_id=np.array([0]),
+    )
+
+    async def run() -> int:
+        await stage.process(ImageData(original=None, analysis={"detections": detections}))
+        await asyncio.sleep(0.4)
+        stored = store.count()
+        await stage.close()
+        return stored
+
+    assert asyncio.run(run()) == 1
+    store.close()